@@ -0,0 +1,291 @@
+"""
+Benchmarks du pipeline de réservation de booking_app, sans affichage (QT_QPA_PLATFORM=offscreen).
+
+Génère des tableaux de réservations synthétiques (1k/10k/100k lignes par défaut) et mesure
+l'import (import_csv, load_excel_into_table), le tri (SortHeaderView.sort_column), le filtrage,
+l'annuler/rétablir, la recherche dans un dossier (SearchThread) et les exports.
+
+    python bench_booking.py                                   # 1k, 10k et 100k lignes
+    python bench_booking.py --sizes 1000 10000 --repeat 5 --output bench/avant.json
+    python bench_booking.py --compare bench/avant.json bench/apres.json
+
+Les résultats (JSON) portent la médiane et toutes les mesures de chaque opération par taille ;
+--compare signale les opérations plus lentes que le seuil et sort en erreur s'il y en a.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+SEARCH_FILES = 4  # Fichiers du dossier parcouru par SearchThread
+REGRESSION_THRESHOLD = 0.10  # Écart de médiane signalé par --compare
+
+CITIES = ["Paris", "Lyon", "Marseille", "Toulouse", "Nantes", "Lille", "Rennes", "Bordeaux", "Nancy", "Dijon"]
+VENUES = ["Le Trabendo", "La Cigale", "Le Sonic", "Le Ferrailleur", "La Péniche", "Le Bikini", "L'Aéronef"]
+STATUSES = ["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"]
+FORMULES = ["Solo", "Duo", "Trio", "Full Band"]
+
+
+def synthetic_sheet(rows, seed=0):
+    """Tableau de réservations reproductible : mêmes colonnes qu'un export de tableur de booking."""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    records = []
+    for i in range(rows):
+        city = rng.choice(CITIES)
+        records.append({
+            "Nom": f"{rng.choice(VENUES)} {i}",
+            "Contact": f"Contact {rng.randrange(rows)}",
+            "Adresse": f"{rng.randint(1, 200)} rue de la Musique",
+            "Ville": city,
+            "Code postal": f"{rng.randint(1, 95):02d}{rng.randint(0, 999):03d}",
+            "Email": f"prog{i}@{city.lower()}.example",
+            "Téléphone": f"06{rng.randint(0, 99999999):08d}",
+            "Date": (start + timedelta(days=rng.randrange(730))).strftime("%d/%m/%Y"),
+            "Statut": rng.choice(STATUSES),
+            "Cachet": f"{rng.randint(2, 60) * 50}",
+            "Formule": rng.choice(FORMULES),
+        })
+    return pd.DataFrame(records, dtype=str)
+
+
+def measure(function, repeat, setup=None):
+    """Durées (ms) de `repeat` appels de `function`, `setup` étant exécuté hors chronomètre avant chacun."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def silence_dialogs(workdir):
+    """
+    Les boîtes modales bloqueraient un banc d'essai sans écran : elles répondent d'elles-mêmes,
+    et les demandes de fichier d'export renvoient un chemin dans `workdir`.
+    """
+    from PyQt5.QtWidgets import QFileDialog, QMessageBox
+
+    for name in ("information", "warning", "critical"):
+        setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.Ok))
+    QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.No)
+    QFileDialog.getSaveFileName = staticmethod(
+        lambda parent=None, caption="", directory="", *args, **kwargs:
+        (os.path.join(workdir, os.path.basename(directory) or "export.pdf"), ""))
+
+
+class BookingBench:
+    """Une fenêtre BookingApp hors écran et les opérations mesurées dessus."""
+
+    def __init__(self, workdir, repeat):
+        self.workdir = workdir
+        self.repeat = repeat
+        self.results = []
+
+        import booking_app
+        from PyQt5.QtWidgets import QApplication
+
+        self.booking_app = booking_app
+        booking_app.register_tile_scheme()
+        self.qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+        silence_dialogs(workdir)
+        self.window = booking_app.BookingApp()
+
+    def record(self, operation, rows, samples):
+        result = {
+            "operation": operation,
+            "rows": rows,
+            "median_ms": statistics.median(samples),
+            "min_ms": min(samples),
+            "samples_ms": samples,
+        }
+        self.results.append(result)
+        print(f"{operation:<22} {rows:>8} lignes  médiane {result['median_ms']:>10.1f} ms  min {result['min_ms']:>10.1f} ms")
+
+    def run_size(self, rows):
+        window, repeat = self.window, self.repeat
+        sheet = synthetic_sheet(rows)
+        csv_path = os.path.join(self.workdir, f"reservations_{rows}.csv")
+        sheet.to_csv(csv_path, index=False)
+
+        def load():
+            window.load_excel_into_table(sheet.copy())
+            self.qt_app.processEvents()
+
+        # 📥 Import
+        self.record("import_csv", rows, measure(lambda: window.import_csv(csv_path), repeat))
+        self.record("load_excel_into_table", rows, measure(load, repeat))
+
+        # ↕️ Tri (sens alterné pour que chaque passe déplace réellement les lignes)
+        header = window.header_view
+        columns = {name: header.schema.index(name) for name in ("Statut", "Date", "Cachet", "Nom")}
+        for name, column in columns.items():
+            if column is None:
+                continue
+            orders = iter([self.booking_app.Qt.AscendingOrder, self.booking_app.Qt.DescendingOrder] * repeat)
+            self.record(f"sort_{name.lower()}", rows,
+                        measure(lambda: header.sort_column(column, next(orders)), repeat))
+
+        # 🔎 Filtrage : recherche texte, puis critères combinés sur le stockage par colonnes
+        def search(text):
+            window.search_bar.blockSignals(True)
+            window.search_bar.setText(text)
+            window.search_bar.blockSignals(False)
+            window.apply_filters()
+
+        self.record("filter_text", rows, measure(lambda: search("lyon"), repeat, setup=window.reset_filters))
+        criteria = {"statut": {"Let's Go", "Full"}, "lieu": "rue",
+                    "date": (date(2025, 3, 1), date(2025, 9, 30)), "cachet": (500, 2000)}
+
+        def filter_criteria():
+            window.filter_criteria.update(criteria)
+            window.apply_filters()
+
+        self.record("filter_criteria", rows, measure(filter_criteria, repeat, setup=window.reset_filters))
+        window.reset_filters()
+
+        # ↩️ Annuler / rétablir : modifications de cellules puis suppression de lignes
+        edits = min(rows, 200)
+        nom = columns["Nom"]
+
+        def edit_cells():
+            for row in range(edits):
+                old = window.table.item(row, nom).text()
+                window.record(self.booking_app.CellEditCommand(row, nom, old, old + " *"))
+                window.write_cell(row, nom, old + " *")
+
+        def undo_all():
+            for _ in range(edits):
+                window.undo()
+
+        self.record("undo_cell_edits", rows, measure(undo_all, repeat, setup=edit_cells))
+        delete = list(range(0, rows, max(1, rows // 100)))
+        self.record("undo_delete_rows", rows,
+                    measure(window.undo, repeat, setup=lambda: window.delete_rows(delete)))
+
+        # 🗂️ Recherche dans un dossier de tableurs
+        folder = os.path.join(self.workdir, f"dossier_{rows}")
+        os.makedirs(folder, exist_ok=True)
+        for index in range(SEARCH_FILES):
+            synthetic_sheet(max(1, rows // SEARCH_FILES), seed=index + 1).to_csv(
+                os.path.join(folder, f"tableur_{index}.csv"), index=False)
+        self.record("folder_search", rows,
+                    measure(lambda: self.booking_app.SearchThread("Cigale", folder).run(), repeat))
+
+        # 📤 Exports
+        headers, snapshot_rows, _ = window.table_snapshot()
+        exports = {
+            "export_csv": lambda: window.export_csv(os.path.join(self.workdir, "export.csv")),
+            "export_excel": lambda: self.booking_app.ExcelExportThread(
+                os.path.join(self.workdir, "export.xlsx"), headers, snapshot_rows).run(),
+            "export_pdf": window.export_pdf if rows <= 10000 else None,  # Une ligne de texte par réservation
+            "save_project": lambda: self.booking_app.write_file_atomic(
+                os.path.join(self.workdir, "projet.baloon"),
+                self.booking_app.serialize_table("projet.baloon", headers, snapshot_rows)),
+        }
+        for name, export in exports.items():
+            if export is None:
+                continue
+            try:
+                self.record(name, rows, measure(export, repeat))
+            except ImportError as e:  # Dépendance de l'export (reportlab, openpyxl…) non installée
+                print(f"{name:<22} {rows:>8} lignes  ignoré : {e}")
+
+    def close(self):
+        self.window.close_journal()
+        self.window.hide()
+
+
+def environment():
+    """Contexte des mesures, pour ne comparer que ce qui est comparable."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qt_platform": os.environ.get("QT_QPA_PLATFORM"),
+    }
+
+
+def compare(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """Affiche l'évolution des médianes ; retourne le nombre d'opérations ralenties au-delà du seuil."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["operation"], r["rows"]): r for r in json.load(f)["results"]}
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    for result in current:
+        before = baseline.get((result["operation"], result["rows"]))
+        if before is None:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠️ plus lent"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  ✅ plus rapide"
+        print(f"{result['operation']:<22} {result['rows']:>8} lignes  "
+              f"{before['median_ms']:>10.1f} → {result['median_ms']:>10.1f} ms  (×{ratio:.2f}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks hors écran du pipeline de réservation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Nombres de lignes")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Mesures par opération")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON (bench/<date>.json par défaut)")
+    parser.add_argument("--compare", nargs=2, metavar=("AVANT", "APRES"), help="Compare deux fichiers de résultats")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Écart signalé (0.10 = 10 %%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        return 1 if compare(*args.compare, threshold=args.threshold) else 0
+
+    output = os.path.abspath(args.output or os.path.join(
+        REPO_DIR, "bench", f"booking_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+
+    # booking_app crée logs/, cache/ et config/ dans le dossier courant : on travaille dans un dossier jetable
+    with tempfile.TemporaryDirectory(prefix="booking_bench_") as workdir:
+        os.chdir(workdir)
+        sys.path.insert(0, REPO_DIR)
+        bench = BookingBench(workdir, args.repeat)
+        try:
+            for rows in args.sizes:
+                bench.run_size(rows)
+        finally:
+            bench.close()
+            os.chdir(REPO_DIR)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "repeat": args.repeat, "results": bench.results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Banc d'essai du géocodage et du routage de booking_app contre des serveurs locaux.
+
+Des serveurs HTTP de substitution imitent Nominatim (/search) et OSRM (/route/v1/…) avec une
+latence et un taux d'échec réglables : les mesures sont reproductibles et ne sollicitent pas
+les services publics. Sont mesurés :
+
+- le débit de safe_geocode et de MapGeocodeWorker, et le taux de réponses servies par le cache ;
+- le débit de MapManager.get_route, calculate_route_details et RouteWorker, et le cache des tronçons ;
+- la latence de bout en bout de create_itinerary pour des tournées de 5 à 200 étapes.
+
+    python bench_network.py
+    python bench_network.py --geocode-latency 0.2 --route-latency 0.05 --failure-rate 0.1 --tours 5 50 200
+    python bench_booking.py --compare bench/reseau_avant.json bench/reseau_apres.json
+
+Les résultats ont la même forme que ceux de bench_booking.py ; son option --compare s'applique
+(lignes = nombre d'adresses ou d'étapes).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from bench_booking import REPO_DIR, environment, silence_dialogs
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+DEFAULT_TOURS = (5, 20, 50, 100, 200)
+DEFAULT_ADDRESSES = 200
+DEFAULT_GEOCODE_LATENCY = 0.05  # Secondes par requête (Nominatim public : ~0,3 s et 1 requête/s)
+DEFAULT_ROUTE_LATENCY = 0.03
+ITINERARY_TIMEOUT = 120  # Secondes avant d'abandonner une mesure de create_itinerary
+FRANCE_BOUNDS = ((42.5, 50.9), (-4.5, 7.5))  # (lat min, lat max), (lon min, lon max)
+
+
+class StubServer:
+    """
+    Serveur HTTP local (un thread par requête) qui répond après `latency` ± `jitter` secondes
+    et échoue (HTTP 503) avec la probabilité `failure_rate`. Compte les requêtes reçues.
+    """
+
+    def __init__(self, respond, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0):
+        self.respond = respond  # (chemin, paramètres) → objet JSON, ou None pour une 404
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, *args):
+                pass  # Pas de trace par requête pendant les mesures
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = self.failures = 0
+
+    def handle(self, request):
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        time.sleep(delay)
+
+        url = urlsplit(request.path)
+        body = None if failed else self.respond(unquote(url.path), parse_qs(url.query))
+        status = 503 if failed else (200 if body is not None else 404)
+        payload = json.dumps(body if body is not None else {"error": "indisponible"}).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+
+def point_for(text):
+    """Coordonnées stables en France pour une adresse (même adresse → même point)."""
+    rng = random.Random(text)
+    (lat_min, lat_max), (lon_min, lon_max) = FRANCE_BOUNDS
+    return rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)
+
+
+def nominatim_response(path, params):
+    if not path.endswith("/search"):
+        return None
+    query = params.get("q", [""])[0]
+    lat, lon = point_for(query)
+    return [{"place_id": len(query), "lat": f"{lat:.6f}", "lon": f"{lon:.6f}",
+             "display_name": query, "boundingbox": [f"{lat:.6f}", f"{lat:.6f}", f"{lon:.6f}", f"{lon:.6f}"]}]
+
+
+def osrm_response(encode_polyline, haversine_km):
+    """Réponse OSRM : tracé à quelques points intermédiaires, distance routière ≈ 1,3 × vol d'oiseau."""
+    def respond(path, params):
+        if "/route/v1/" not in path:
+            return None
+        coordinates = path.rsplit("/", 1)[-1].split(";")
+        (lon1, lat1), (lon2, lat2) = (map(float, pair.split(",")) for pair in coordinates[:2])
+        steps = 20
+        points = [(lat1 + (lat2 - lat1) * i / steps + 0.01 * math.sin(i), lon1 + (lon2 - lon1) * i / steps)
+                  for i in range(steps + 1)]
+        distance = haversine_km((lat1, lon1), (lat2, lon2)) * 1300
+        return {"code": "Ok", "routes": [{"geometry": encode_polyline(points),
+                                          "distance": distance, "duration": distance / 20}]}
+    return respond
+
+
+class NetworkBench:
+    """BookingApp hors écran branchée sur les serveurs de substitution."""
+
+    def __init__(self, workdir, args):
+        self.args = args
+        self.results = []
+
+        self.nominatim = StubServer(nominatim_response, args.geocode_latency, args.jitter,
+                                    args.failure_rate, seed=1).start()
+        os.environ["BOOKING_NOMINATIM_URL"] = self.nominatim.url
+
+        import booking_app
+        from PyQt5.QtWidgets import QApplication
+
+        self.osrm = StubServer(osrm_response(booking_app.encode_polyline, booking_app.haversine_km),
+                               args.route_latency, args.jitter, args.failure_rate, seed=2).start()
+        os.environ["BOOKING_OSRM_URL"] = self.osrm.url
+
+        # Tuiles : serveur local qui répond 404, et pas de préchargement (il tournerait en fond
+        # pendant les mesures suivantes et téléchargerait des tuiles OpenStreetMap)
+        self.tiles = StubServer(lambda path, params: None).start()
+        booking_app.config["tile_url"] = self.tiles.url + "/{z}/{x}/{y}.png"
+        booking_app.config["tile_prefetch_max"] = 0
+
+        self.booking_app = booking_app
+        booking_app.register_tile_scheme()
+        self.qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+        silence_dialogs(workdir)
+        self.window = booking_app.BookingApp()
+        self.window.ensure_map()  # Carte créée d'emblée : les mesures n'incluent pas son initialisation
+
+    def record(self, operation, rows, samples, **extra):
+        result = {"operation": operation, "rows": rows, "median_ms": statistics.median(samples),
+                  "min_ms": min(samples), "samples_ms": samples, **extra}
+        self.results.append(result)
+        details = "  ".join(f"{key} {value:.2f}" if isinstance(value, float) else f"{key} {value}"
+                            for key, value in extra.items())
+        print(f"{operation:<24} {rows:>5}  médiane {result['median_ms']:>10.1f} ms  {details}")
+
+    def addresses(self, count, seed=0):
+        rng = random.Random(seed)
+        cities = ["Paris", "Lyon", "Marseille", "Nantes", "Lille", "Rennes", "Bordeaux", "Dijon"]
+        return [{"contact": f"Lieu {i}", "adresse": f"{rng.randint(1, 200)} rue de la Scène {i}",
+                 "ville": rng.choice(cities), "code postal": f"{rng.randint(10000, 95999)}", "pays": "France",
+                 "status": "Nouveau"} for i in range(count)]
+
+    def run_geocoding(self):
+        window, count = self.window, self.args.addresses
+        contacts = self.addresses(count)
+        queries = [window.build_search_query(contact) for contact in contacts]
+        self.booking_app.geocode_cache.clear()
+
+        # Deux passes sur les mêmes adresses : à froid (réseau), puis servies par le cache
+        for phase in ("froid", "cache"):
+            self.nominatim.reset_counters()
+            hits = sum(query[0] in self.booking_app.geocode_cache for query in queries if query)
+            started = time.perf_counter()
+            found = sum(window.safe_geocode(query) is not None for query in queries)
+            elapsed = time.perf_counter() - started
+            self.record(f"safe_geocode_{phase}", count, [elapsed * 1000],
+                        per_second=count / elapsed, cache_hit_rate=hits / count, found=found,
+                        requests=self.nominatim.requests, failures=self.nominatim.failures)
+
+        # MapGeocodeWorker sur de nouvelles adresses (exécuté dans ce thread : même travail, sans attente)
+        contacts = self.addresses(count, seed=1)
+        self.nominatim.reset_counters()
+        worker = self.booking_app.MapGeocodeWorker(contacts, window.ensure_geocoder(), window)
+        started = time.perf_counter()
+        worker.run()
+        elapsed = time.perf_counter() - started
+        self.record("map_geocode_worker", count, [elapsed * 1000], per_second=count / elapsed,
+                    requests=self.nominatim.requests, failures=self.nominatim.failures)
+
+    def tour(self, stops, seed):
+        rng = random.Random(seed)
+        (lat_min, lat_max), (lon_min, lon_max) = FRANCE_BOUNDS
+        return [(rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)) for _ in range(stops)]
+
+    def run_routing(self, stops):
+        window = self.window
+        manager = window.map_manager
+        points = self.tour(stops, seed=stops)
+        legs = len(points) - 1
+
+        # Calcul séquentiel (calculate_route_details), à froid puis depuis le cache des tronçons
+        manager.route_cache.clear()
+        for phase in ("froid", "cache"):
+            self.osrm.reset_counters()
+            started = time.perf_counter()
+            window.calculate_route_details(points)
+            elapsed = time.perf_counter() - started
+            # Tronçons servis sans requête (les estimations en cache sont redemandées tant qu'OSRM répond)
+            self.record(f"route_details_{phase}", stops, [elapsed * 1000], legs_per_second=legs / elapsed,
+                        cache_hit_rate=max(legs - self.osrm.requests, 0) / legs, requests=self.osrm.requests,
+                        failures=self.osrm.failures)
+
+        # Tronçons en parallèle (RouteWorker), cache vidé
+        manager.route_cache.clear()
+        self.osrm.reset_counters()
+        max_workers = self.booking_app.config.get("routing", {}).get("max_workers", 4)
+        worker = self.booking_app.RouteWorker(manager, points, max_workers=max_workers)
+        started = time.perf_counter()
+        worker.run()
+        elapsed = time.perf_counter() - started
+        self.record("route_worker", stops, [elapsed * 1000], legs_per_second=legs / elapsed,
+                    requests=self.osrm.requests, failures=self.osrm.failures)
+
+    def run_itinerary(self, stops, repeat):
+        """create_itinerary de bout en bout : du clic au tracé final (boucle d'événements Qt comprise)."""
+        window = self.window
+        points = self.tour(stops, seed=1000 + stops)
+        window.clear_map_table()
+        for i, (lat, lon) in enumerate(points):
+            window.map_manager.add_contact_to_table(f"Étape {i + 1}", f"Adresse {i + 1}", "Let's Go", lat, lon)
+
+        samples = []
+        timeouts = 0
+        self.osrm.reset_counters()
+        for _ in range(repeat):
+            self.reset_map()
+            started = time.perf_counter()
+            deadline = started + self.args.timeout
+            window.create_itinerary()
+            while window.route_worker is not None and time.perf_counter() < deadline:
+                self.qt_app.processEvents()
+                time.sleep(0.001)
+            if window.route_worker is not None:
+                # Calcul resté bloqué : mesure en échec, le calcul est annulé avant la suivante
+                window.cancel_itinerary()
+                timeouts += 1
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+
+        if not samples:
+            print(f"{'create_itinerary':<24} {stops:>5}  ❌ aucune mesure terminée en {self.args.timeout} s")
+            return
+        self.record("create_itinerary", stops, samples, timeouts=timeouts,
+                    requests=self.osrm.requests, failures=self.osrm.failures)
+
+    def reset_map(self):
+        """Carte sans itinéraire entre deux mesures : marqueurs et tracés ne s'accumulent pas."""
+        window, manager = self.window, self.window.map_manager
+        # Un calcul annulé (mesure en échec) ne doit pas tourner pendant la mesure suivante
+        for worker in list(window.retired_route_workers):
+            worker.wait(int(self.args.timeout * 1000))
+        window.clear_route_markers()
+        if manager.route_layer is not None:
+            manager.remove_layer(manager.map, manager.route_layer)
+            manager.route_layer = None
+        manager.routes = []
+        manager.route_cache.clear()
+
+    def close(self):
+        self.window.close_journal()
+        self.window.hide()
+        self.nominatim.stop()
+        self.osrm.stop()
+        self.tiles.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai géocodage / routage avec serveurs locaux.")
+    parser.add_argument("--addresses", type=int, default=DEFAULT_ADDRESSES, help="Adresses à géocoder")
+    parser.add_argument("--tours", type=int, nargs="+", default=list(DEFAULT_TOURS), help="Étapes par tournée")
+    parser.add_argument("--repeat", type=int, default=3, help="Mesures de create_itinerary par tournée")
+    parser.add_argument("--timeout", type=float, default=ITINERARY_TIMEOUT,
+                        help="Secondes avant d'abandonner une mesure de create_itinerary")
+    parser.add_argument("--geocode-latency", type=float, default=DEFAULT_GEOCODE_LATENCY, help="Secondes")
+    parser.add_argument("--route-latency", type=float, default=DEFAULT_ROUTE_LATENCY, help="Secondes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variation aléatoire de la latence (secondes)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Part des requêtes en échec (HTTP 503)")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON (bench/<date>.json par défaut)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        REPO_DIR, "bench", f"reseau_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+
+    # Routage OSRM avec repli sur l'estimation locale, comme dans l'application
+    os.environ.setdefault("BOOKING_ROUTER", "auto")
+    with tempfile.TemporaryDirectory(prefix="booking_bench_") as workdir:
+        os.chdir(workdir)
+        sys.path.insert(0, REPO_DIR)
+        bench = NetworkBench(workdir, args)
+        try:
+            bench.run_geocoding()
+            for stops in args.tours:
+                bench.run_routing(stops)
+                bench.run_itinerary(stops, args.repeat)
+        finally:
+            bench.close()
+            os.chdir(REPO_DIR)
+
+    settings = {key: getattr(args, key) for key in ("geocode_latency", "route_latency", "jitter", "failure_rate")}
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "settings": settings, "results": bench.results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
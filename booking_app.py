@@ -2,71 +2,343 @@ import sys
 import os
 os.environ["QT_LOGGING_RULES"] = "qt.qpa.fonts.warning=false"
 import time
+STARTUP_CLOCK = time.perf_counter()  # Référence du rapport de démarrage (voir startup_mark)
 import logging
 import json
 import io
+import base64
 import traceback
 import requests
 import difflib
-import qrcode
 import pytz
 import numpy as np
 import pandas as pd
-import chardet
-import re 
-
-from datetime import datetime
+import re
+import math
+import unicodedata
+import hashlib
+import tempfile
+import sqlite3
+import threading
+import cProfile
+
+from abc import ABC, abstractmethod
+from collections import namedtuple, deque, Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
 from typing import Any, Optional
+from urllib.parse import urlsplit
 from zipfile import BadZipFile
 from pandas.errors import EmptyDataError, ParserError
-from openpyxl import load_workbook
-from PIL import Image
-from functools import partial
+from functools import partial, lru_cache, wraps
 
 # PyQt5
 from PyQt5 import QtCore
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPoint, QUrl, QTimer, QPropertyAnimation
-from PyQt5.QtGui import QKeySequence, QFontDatabase, QFont, QIcon, QColor
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPoint, QUrl, QTimer, QPropertyAnimation, QBuffer, QIODevice, QDate, QEvent, QPersistentModelIndex
+from PyQt5.QtGui import QKeySequence, QFontDatabase, QFont, QIcon, QColor, QBrush, QPalette, QTextCharFormat
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+# QtWebEngine doit être importé avant la création de QApplication : seule la vue est différée
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineProfile
+from PyQt5.QtWebEngineCore import QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QTableWidget,
     QTableWidgetItem, QFileDialog, QMessageBox, QPushButton, QMenu,
     QAction, QFormLayout, QHeaderView, QLabel, QTabWidget, QToolBar,
     QShortcut, QComboBox, QLineEdit, QListWidget, QListWidgetItem,
     QProgressBar, QWidget, QCalendarWidget, QTextEdit, QProgressDialog,
-    QAbstractItemView, QInputDialog, QSplitter, QGraphicsOpacityEffect, QDialog, QSizePolicy
+    QAbstractItemView, QInputDialog, QSplitter, QGraphicsOpacityEffect, QDialog, QSizePolicy,
+    QDateEdit, QDoubleSpinBox, QDialogButtonBox, QStyledItemDelegate, QStyle, QStyleOptionComboBox,
+    QStyleOptionViewItem
 )
 
-# ReportLab (PDF)
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-
-# Cartographie & Géolocalisation
-import folium
-from folium.plugins import MarkerCluster
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-from geopy.exc import GeocoderTimedOut
+# ReportLab (PDF), qrcode, openpyxl, chardet, folium et geopy sont importés au premier usage
+# (export, onglet Carte, géocodage) : le tableau est utilisable sans attendre leur chargement.
 
 
 # Configuration
 CONFIG_FILE = "config/settings.json"
 GEOCODE_CACHE_FILE = "cache/geocode_cache.json"
+TILE_CACHE_DIR = "cache/tiles"
+RECOVERY_FILE = "cache/recovery.json"
+PROJECT_EXTENSION = ".baloon"
+PROJECT_VERSION = 1
+
+# Valeurs proposées dans les colonnes Statut et Formule (la première est la valeur par défaut)
+STATUS_CHOICES = ["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"]
+FORMULE_CHOICES = ["Solo", "Duo", "Trio", "Full Band"]
+
+# 🎨 Couleurs de ligne par statut (fond, texte)
+STATUS_COLORS = {
+    "Nouveau": ("#f7f7f7", "black"),  # Blanc
+    "Mail envoyé": ("#8ee9f0", "black"),  # Bleu clair
+    "Échange Tel.": ("#e0b4f2", "black"),  # Violet
+    "Full": ("#fd9595", "black"),  # Rouge clair
+    "Laisse tomber": ("#000000", "white"),  # Noir avec texte blanc
+    "Let's Go": ("#23db6f", "black"),  # Vert
+}
 
 # Configuration globale du logging
 
 LOG_FILE = "logs/booking_app.log"
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+LOG_BUFFER_SIZE = 2000  # Derniers enregistrements gardés en mémoire (diagnostic depuis l'application)
+
 logging.basicConfig(
     filename=LOG_FILE,
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format=LOG_FORMAT
 )
 
+
+class RingBufferHandler(logging.Handler):
+    """
+    Garde en mémoire les derniers enregistrements, sans les formater : le message n'est
+    construit qu'à la lecture (`lines`), par exemple pour joindre un journal à un rapport.
+    """
+
+    def __init__(self, capacity=LOG_BUFFER_SIZE):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def lines(self, level=logging.NOTSET):
+        """Enregistrements en mémoire de niveau >= `level`, formatés."""
+        return [self.format(record) for record in list(self.records) if record.levelno >= level]
+
+
+# 🪵 Un logger par sous-système, réglable séparément (clé « log_levels » de la configuration).
+# Les messages utilisent le formatage paresseux de logging (« %s ») : un appel debug()
+# désactivé se limite à une comparaison de niveau.
+log = logging.getLogger("booking")
+log_table = logging.getLogger("booking.table")
+log_io = logging.getLogger("booking.io")
+log_map = logging.getLogger("booking.map")
+log_geocode = logging.getLogger("booking.geocode")
+log_route = logging.getLogger("booking.route")
+log_ui = logging.getLogger("booking.ui")
+log_perf = logging.getLogger("booking.perf")
+log_buffer = RingBufferHandler()
+log.addHandler(log_buffer)
+
+
+def configure_logging(settings):
+    """
+    Applique les niveaux de la configuration, ex. {"log_level": "INFO",
+    "log_levels": {"geocode": "DEBUG"}, "log_console": true}.
+    """
+    log.setLevel(settings.get("log_level", "INFO"))
+    for subsystem, level in settings.get("log_levels", {}).items():
+        logging.getLogger(f"booking.{subsystem}").setLevel(level)
+    if settings.get("log_console") and not any(type(h) is logging.StreamHandler for h in log.handlers):
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(LOG_FORMAT))
+        log.addHandler(console)
+
+# ⏱️ Rapport de démarrage : temps écoulé depuis le lancement à chaque étape
+STARTUP_TIMINGS = []
+
+
+def startup_mark(step):
+    """Note le temps écoulé (ms) depuis le chargement du module à l'étape `step`."""
+    STARTUP_TIMINGS.append((step, (time.perf_counter() - STARTUP_CLOCK) * 1000))
+
+
+def startup_report():
+    """Résumé des étapes du démarrage, ex. « imports 180 ms → fenêtre 420 ms → tableau interactif 460 ms »."""
+    return " → ".join(f"{step} {elapsed:.0f} ms" for step, elapsed in STARTUP_TIMINGS)
+
+
+startup_mark("imports")
+
+
+# ⏱️ Durées des opérations coûteuses (import, tri, filtre, géocodage, routage, carte, exports)
+PERF_SAMPLES = 500  # Durées gardées par opération pour les percentiles
+
+
+class PerfStats:
+    """
+    Durées en millisecondes par opération : les PERF_SAMPLES dernières mesures servent aux
+    percentiles, le nombre d'appels et le cumul portent sur toute la session.
+    """
+
+    def __init__(self, capacity=PERF_SAMPLES):
+        self.capacity = capacity
+        self.samples = {}
+        self.counts = Counter()
+        self.totals = Counter()
+        self.lock = threading.Lock()  # Géocodage, routage et exports mesurés depuis des threads
+
+    def record(self, name, elapsed_ms):
+        with self.lock:
+            self.samples.setdefault(name, deque(maxlen=self.capacity)).append(elapsed_ms)
+            self.counts[name] += 1
+            self.totals[name] += elapsed_ms
+
+    def summary(self):
+        """{opération: {count, p50, p95, max, total_ms}}, trié par nom d'opération."""
+        with self.lock:
+            snapshot = {name: np.array(values) for name, values in self.samples.items()}
+            counts, totals = dict(self.counts), dict(self.totals)
+        return {
+            name: {
+                "count": counts[name],
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(values.max()),
+                "total_ms": totals[name],
+            }
+            for name, values in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.totals.clear()
+
+    def to_json(self):
+        return json.dumps({"generated": datetime.now().isoformat(timespec="seconds"),
+                           "operations": self.summary()}, indent=2, ensure_ascii=False)
+
+
+perf_stats = PerfStats()
+
+
+# 🔬 Profilage à la demande des prochaines opérations (menu « Profiler » ou BOOKING_PROFILE=N)
+PROFILE_DIR = "logs/profiles"
+PROFILE_ENV = "BOOKING_PROFILE"
+PROFILE_SAMPLE_INTERVAL = 0.005  # Secondes entre deux échantillons de pile
+
+
+class ProfileCapture:
+    """Une opération profilée : cProfile sur son thread et échantillonnage périodique de sa pile."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = datetime.now()
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stop_sampling = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def sample(self):
+        """Relève la pile du thread profilé (racine d'abord) jusqu'à la fin de l'opération."""
+        while not self.stop_sampling.wait(self.profiler.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def finish(self, elapsed_ms):
+        """Arrête la capture et écrit .prof, .folded et .json sous PROFILE_DIR."""
+        self.profile.disable()
+        self.stop_sampling.set()
+        self.sampler.join()
+        try:
+            os.makedirs(self.profiler.directory, exist_ok=True)
+            base = os.path.join(self.profiler.directory, f"{self.started.strftime('%Y%m%d_%H%M%S_%f')}_{self.name}")
+            self.profile.dump_stats(base + ".prof")
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.items())
+            context = self.profiler.context() if self.profiler.context else {}
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump({"operation": self.name, "started": self.started.isoformat(timespec="milliseconds"),
+                           "elapsed_ms": elapsed_ms, "samples": sum(self.stacks.values()), **context},
+                          f, indent=2, ensure_ascii=False)
+            log_perf.info("🔬 Profil de %s (%.0f ms) écrit dans %s.prof", self.name, elapsed_ms, base)
+        except Exception:
+            log_perf.exception("Échec de l'écriture du profil de %s", self.name)
+        finally:
+            self.profiler.release()
+
+
+class OperationProfiler:
+    """
+    Profile les `remaining` prochaines opérations mesurées par `timed`, une à la fois.
+
+    `context` (optionnel) renvoie les informations jointes à chaque profil, par exemple la
+    taille du tableau. Désarmé, `begin` se limite à une comparaison.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, interval=PROFILE_SAMPLE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.remaining = 0
+        self.active = False
+        self.context = None
+        self.lock = threading.Lock()
+
+    def arm(self, count):
+        with self.lock:
+            self.remaining = max(0, int(count))
+        log_perf.info("🔬 Profilage des %d prochaines opérations (%s)", self.remaining, self.directory)
+
+    def disarm(self):
+        with self.lock:
+            self.remaining = 0
+
+    def begin(self, name):
+        """Démarre une capture si le profilage est armé et qu'aucune autre n'est en cours."""
+        if self.remaining <= 0:
+            return None
+        with self.lock:
+            if self.remaining <= 0 or self.active:
+                return None
+            self.remaining -= 1
+            self.active = True
+        return ProfileCapture(self, name)
+
+    def release(self):
+        with self.lock:
+            self.active = False
+
+
+profiler = OperationProfiler()
+if os.environ.get(PROFILE_ENV):
+    try:
+        profiler.arm(int(os.environ[PROFILE_ENV]))
+    except ValueError:
+        log_perf.warning("%s doit être un nombre d'opérations, reçu %r", PROFILE_ENV, os.environ[PROFILE_ENV])
+
+
+@contextmanager
+def timed(name):
+    """Mesure le bloc et l'ajoute à `perf_stats` sous `name` (exceptions comprises) ; le profile si demandé."""
+    capture = profiler.begin(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        perf_stats.record(name, elapsed_ms)
+        if capture is not None:
+            capture.finish(elapsed_ms)
+
+
+def timed_call(name):
+    """Décorateur : chaque appel de la fonction est mesuré sous `name`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 def load_config():
     try:
         with open(CONFIG_FILE, 'r') as f:
@@ -96,7 +368,136 @@ def save_geocode_cache(cache):
     with open(GEOCODE_CACHE_FILE, "w") as f:
         json.dump(cache, f)
 
+def write_project(path, headers, rows, state=None):
+    """
+    Écrit un projet BALOON (base SQLite) : une ligne par réservation dans l'ordre affiché.
+
+    Chaque colonne du tableau est gardée telle qu'affichée (c0, c1…) ; la date (ISO),
+    le cachet (REAL), le statut et la formule sont aussi stockés typés pour être requêtables.
+    L'état de la carte et de l'itinéraire est rangé dans `meta`.
+    """
+    def column_values(name):
+        return [row[headers.index(name)] for row in rows] if name in headers else [None] * len(rows)
+
+    dates = parse_date_column(column_values("Date")) if "Date" in headers else [None] * len(rows)
+    cachets = parse_cachet_column(column_values("Cachet")) if "Cachet" in headers else [None] * len(rows)
+    typed = zip(
+        (None if pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d") for value in dates),
+        (None if value is None or np.isnan(value) else float(value) for value in cachets),
+        column_values("Statut"),
+        column_values("Formule"),
+    )
+
+    cell_columns = [f"c{col}" for col in range(len(headers))]
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")  # Fichier temporaire : write_file_atomic s'occupe de la sûreté
+        conn.execute("PRAGMA synchronous=OFF")
+        with conn:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE columns (position INTEGER PRIMARY KEY, header TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE bookings (position INTEGER PRIMARY KEY, date_value TEXT, cachet_value REAL, "
+                "statut TEXT, formule TEXT" + "".join(f", {name} TEXT" for name in cell_columns) + ")"
+            )
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("version", str(PROJECT_VERSION)),
+                ("state", json.dumps(state or {}, ensure_ascii=False)),
+            ])
+            conn.executemany("INSERT INTO columns VALUES (?, ?)", enumerate(headers))
+            placeholders = ", ".join("?" * (5 + len(cell_columns)))
+            conn.executemany(
+                f"INSERT INTO bookings VALUES ({placeholders})",
+                ((position, *types, *values) for position, (types, values) in enumerate(zip(typed, rows)))
+            )
+    finally:
+        conn.close()
+
+
+def read_project(path):
+    """Relit un projet BALOON : (en-têtes, lignes dans l'ordre affiché, état carte/itinéraire)."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if int(meta.get("version", 0)) > PROJECT_VERSION:
+            raise ValueError("Projet créé par une version plus récente de l'application.")
+        headers = [header for _, header in conn.execute("SELECT position, header FROM columns ORDER BY position")]
+        cell_columns = ", ".join(f"c{col}" for col in range(len(headers))) or "NULL"
+        rows = [list(row) for row in conn.execute(f"SELECT {cell_columns} FROM bookings ORDER BY position")]
+        if not headers:
+            rows = []
+        return headers, rows, json.loads(meta.get("state") or "{}")
+    finally:
+        conn.close()
+
+
+def serialize_project(headers, rows, state=None):
+    """Contenu d'un projet BALOON en octets (écrit dans un fichier temporaire, puis relu)."""
+    fd, temp_path = tempfile.mkstemp(suffix=PROJECT_EXTENSION)
+    os.close(fd)
+    os.unlink(temp_path)  # SQLite crée lui-même le fichier
+    try:
+        write_project(temp_path, headers, rows, state)
+        with open(temp_path, "rb") as f:
+            return f.read()
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def serialize_table(path, headers, rows, state=None):
+    """Contenu d'un fichier de tableau selon son extension (.baloon, .csv, .xlsx ou .json), en octets."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == PROJECT_EXTENSION:
+        return serialize_project(headers, rows, state)
+    if extension == ".json":
+        return json.dumps(rows, ensure_ascii=False).encode("utf-8")  # Même format que `load_table_data`
+
+    df = pd.DataFrame(rows, columns=headers)
+    if extension == ".xlsx":
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False, engine="openpyxl")
+        return buffer.getvalue()
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def write_file_atomic(path, data):
+    """Écrit dans un fichier temporaire du même dossier puis le renomme : jamais de fichier à moitié écrit."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".~", suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def read_table_file(path, headers=None):
+    """Relit un fichier écrit par `serialize_table` : (en-têtes, lignes de chaînes)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == PROJECT_EXTENSION:
+        headers, rows, _ = read_project(path)
+        return headers, rows
+    if extension == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        return list(headers or []), [[str(value) for value in row] for row in rows]
+
+    if extension == ".xlsx":
+        df = pd.read_excel(path, dtype=str, engine="openpyxl")
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = df.fillna("")
+    return [str(column) for column in df.columns], df.values.tolist()
+
+
 config = load_config()
+configure_logging(config)
 geocode_cache = load_geocode_cache()
 
 
@@ -139,7 +540,7 @@ class SearchThread(QThread):
                             break  # Évite les doublons par ligne
                 
             except Exception as e:
-                print(f"❌ Erreur lors du traitement de {file}: {e}")
+                log_io.error("❌ Erreur lors du traitement de %s: %s", file, e)
             
             self.progress.emit(int((i + 1) / total_files * 100))  # Mise à jour de la progression
         
@@ -155,7 +556,7 @@ class SearchThread(QThread):
                     on_bad_lines='skip', encoding=encoding, sep=None, engine="python"
                 )
             except Exception as e:
-                print(f"⚠️ Erreur de chargement CSV ({encoding}) pour {file_path}: {e}")
+                log_io.warning("⚠️ Erreur de chargement CSV (%s) pour %s: %s", encoding, file_path, e)
         return None
 
     def load_excel(self, file_path):
@@ -163,7 +564,7 @@ class SearchThread(QThread):
         try:
             return pd.read_excel(file_path, dtype=str, engine="openpyxl")
         except Exception as e:
-            print(f"⚠️ Erreur de chargement Excel pour {file_path}: {e}")
+            log_io.warning("⚠️ Erreur de chargement Excel pour %s: %s", file_path, e)
         return None
 
 class SearchTab(QWidget):
@@ -278,18 +679,611 @@ class SearchTab(QWidget):
             QMessageBox.information(self, "Info", f"Ouvrez la ligne {line_number} manuellement.")
 
 
+# 🧱 Tuiles de fond de carte servies en local via le schéma tiles://
+TILE_SCHEME = b"tiles"
+TILE_URL_TEMPLATE = "tiles://osm/{z}/{x}/{y}.png"
+TILE_ATTRIBUTION = "&copy; Contributeurs OpenStreetMap"
+TILE_USER_AGENT = "BALOON-booking_app/1.0"
+
+
+def register_tile_scheme():
+    """Déclare le schéma tiles:// auprès de QtWebEngine (doit être appelé avant la création de QApplication)."""
+    scheme = QWebEngineUrlScheme(TILE_SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(QWebEngineUrlScheme.SecureScheme
+                    | QWebEngineUrlScheme.LocalAccessAllowed
+                    | QWebEngineUrlScheme.CorsEnabled)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+def create_base_map(location=(46.2276, 2.2137), zoom_start=6):
+    """Crée une carte folium dont le fond OpenStreetMap passe par le cache de tuiles local."""
+    import folium
+    m = folium.Map(location=list(location), zoom_start=zoom_start, tiles=None)
+    folium.TileLayer(tiles=TILE_URL_TEMPLATE, attr=TILE_ATTRIBUTION, name="OpenStreetMap", max_zoom=19).add_to(m)
+    return m
+
+
+class TileCache:
+    """Stockage disque des tuiles au format z/x/y, partagé entre le proxy tiles:// et le préchargement."""
+
+    def __init__(self, root=TILE_CACHE_DIR, url_template=None):
+        self.root = root
+        self.url_template = url_template or config.get("tile_url", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+
+    def path(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.png")
+
+    def source_url(self, z, x, y):
+        return self.url_template.format(z=z, x=x, y=y)
+
+    def get(self, z, x, y):
+        """Retourne les octets de la tuile si elle est déjà en cache, sinon None."""
+        try:
+            with open(self.path(z, x, y), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, z, x, y, data):
+        """Écrit une tuile de manière atomique (fichier temporaire puis renommage)."""
+        path = self.path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Nom temporaire unique : le préchargement et le proxy tiles:// peuvent écrire la même tuile en même temps
+        fd, tmp_path = tempfile.mkstemp(prefix=".~", suffix=".png", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def contains(self, z, x, y):
+        return os.path.exists(self.path(z, x, y))
+
+    @staticmethod
+    def tile_xy(lat, lon, zoom):
+        """Convertit des coordonnées WGS84 en indices de tuile (x, y) pour un niveau de zoom."""
+        lat = max(min(lat, 85.0511), -85.0511)
+        n = 2 ** zoom
+        x = int((lon + 180.0) / 360.0 * n)
+        lat_rad = math.radians(lat)
+        y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    def tiles_for_bbox(self, south, west, north, east, zooms):
+        """Génère les tuiles (z, x, y) couvrant une emprise pour chaque niveau de zoom demandé."""
+        for z in zooms:
+            x0, y0 = self.tile_xy(north, west, z)
+            x1, y1 = self.tile_xy(south, east, z)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    yield z, x, y
+
+
+class TileSchemeHandler(QWebEngineUrlSchemeHandler):
+    """Proxy tiles:// : sert les tuiles depuis le disque et ne télécharge que les tuiles manquantes."""
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.network = QNetworkAccessManager(self)
+
+    def requestStarted(self, job):
+        try:
+            z, x, y = job.requestUrl().path().strip("/").rsplit(".", 1)[0].split("/")
+            z, x, y = int(z), int(x), int(y)
+        except ValueError:
+            job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+            return
+
+        data = self.cache.get(z, x, y)
+        if data is not None:
+            self.reply_tile(job, data)
+            return
+
+        # 🌐 Tuile absente du cache : téléchargement asynchrone puis mise en cache
+        request = QNetworkRequest(QUrl(self.cache.source_url(z, x, y)))
+        request.setRawHeader(b"User-Agent", TILE_USER_AGENT.encode())
+        reply = self.network.get(request)
+        reply.finished.connect(partial(self.on_tile_downloaded, reply, job, (z, x, y)))
+
+    def on_tile_downloaded(self, reply, job, tile):
+        data = bytes(reply.readAll()) if reply.error() == QNetworkReply.NoError else None
+        reply.deleteLater()
+        if data:
+            self.cache.put(*tile, data)
+        try:
+            if data:
+                self.reply_tile(job, data)
+            else:
+                job.fail(QWebEngineUrlRequestJob.RequestFailed)
+        except RuntimeError:
+            pass  # La page a été rechargée entre-temps : la requête n'existe plus
+
+    def reply_tile(self, job, data):
+        buffer = QBuffer(job)
+        buffer.setData(data)
+        buffer.open(QIODevice.ReadOnly)
+        job.reply(b"image/png", buffer)
+
+
+class TilePrefetchThread(QThread):
+    """Précharge en arrière-plan les tuiles d'une emprise pour consulter la carte hors connexion."""
+    progress = pyqtSignal(int)
+    finished_prefetch = pyqtSignal(int)  # Nombre de tuiles téléchargées
+
+    def __init__(self, cache, bbox, zooms, max_tiles=1500):
+        super().__init__()
+        self.cache = cache
+        self.bbox = bbox
+        self.zooms = zooms
+        self.max_tiles = max_tiles
+
+    def run(self):
+        missing = [tile for tile in self.cache.tiles_for_bbox(*self.bbox, self.zooms)
+                   if not self.cache.contains(*tile)][:self.max_tiles]
+        downloaded = 0
+        session = requests.Session()
+        session.headers["User-Agent"] = TILE_USER_AGENT
+
+        for i, (z, x, y) in enumerate(missing):
+            if self.isInterruptionRequested():
+                break
+            try:
+                response = session.get(self.cache.source_url(z, x, y), timeout=10)
+                if response.ok and response.content:
+                    self.cache.put(z, x, y, response.content)
+                    downloaded += 1
+            except requests.RequestException as e:
+                log_map.warning("Préchargement de la tuile %s/%s/%s impossible : %s", z, x, y, e)
+                break  # Pas de réseau : inutile d'insister
+            self.progress.emit(int((i + 1) / len(missing) * 100))
+
+        self.finished_prefetch.emit(downloaded)
+
+
+# 🌍 Mode « grand volume » : au-delà de ce seuil, les lieux sont rendus sur un canevas unique
+HIGH_VOLUME_THRESHOLD = 300
+
+
+def template_json(data):
+    """
+    Sérialise des données en JSON insérable dans un gabarit folium : le script rendu est
+    relu par Jinja, donc les séquences « {{ », « {% » et « {# » des chaînes sont échappées.
+    """
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return re.sub(r"\{(?=[{%#])", lambda _: "\\u007b", text)
+
+
+def pack_array(values, dtype):
+    """Encode un tableau numérique en base64 (little-endian) pour l'embarquer dans la page."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode("ascii")
+
+
+def precompute_clusters(lats, lons, min_zoom=0, max_zoom=16, radius=60):
+    """
+    Regroupe les points sur une grille de `radius` pixels pour chaque niveau de zoom (façon Supercluster).
+
+    :return: Dictionnaire {zoom: (lat des centres, lon des centres, effectifs)}. Les niveaux où
+             les groupes ne contiennent presque plus qu'un point sont omis : la page affiche alors les points.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+
+    # Projection Web Mercator normalisée sur [0, 1]
+    x = (lons + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(np.clip(lats, -85.0511, 85.0511)))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+
+    levels = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        cells = 256 * 2 ** zoom / radius
+        gx = np.floor(x * cells).astype(np.int64)
+        gy = np.floor(y * cells).astype(np.int64)
+        keys = gx * (int(cells) + 1) + gy
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if counts.max() <= 1 or len(counts) > 0.8 * len(lats):
+            break  # Presque plus de regroupements : autant afficher les points eux-mêmes
+        levels[zoom] = (
+            np.bincount(inverse, weights=lats) / counts,
+            np.bincount(inverse, weights=lons) / counts,
+            counts,
+        )
+    return levels
+
+
+def macro_element(name, template, **attributes):
+    """
+    Crée une couche folium (MacroElement) rendue par le gabarit Jinja `template`.
+    branca et jinja2 ne sont importés qu'ici, au premier affichage d'une couche.
+    """
+    element = macro_element_class(name, template)()
+    element._name = name
+    for key, value in attributes.items():
+        setattr(element, key, value)
+    return element
+
+
+@lru_cache(maxsize=None)
+def macro_element_class(name, template):
+    """Classe MacroElement compilée une seule fois par gabarit."""
+    from branca.element import MacroElement
+    from jinja2 import Template
+    return type(name, (MacroElement,), {"_template": Template(template)})
+
+
+# Couche Leaflet embarquant tous les lieux sous forme de tableaux typés (base64) et
+# les dessinant sur un canevas, avec des regroupements précalculés par niveau de zoom.
+CANVAS_CLUSTER_TEMPLATE = """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var data = {{ this.payload }};
+            function decode(b64, Type) {
+                var bin = atob(b64), bytes = new Uint8Array(bin.length);
+                for (var i = 0; i < bin.length; i++) { bytes[i] = bin.charCodeAt(i); }
+                return new Type(bytes.buffer);
+            }
+            var coords = decode(data.coords, Float32Array);
+            var status = decode(data.status, Uint8Array);
+            var levels = {};
+            Object.keys(data.levels).forEach(function(z) {
+                levels[z] = {c: decode(data.levels[z].c, Float32Array), n: decode(data.levels[z].n, Uint32Array)};
+            });
+            var renderer = L.canvas({padding: 0.5});
+            var layer = L.layerGroup().addTo(map);
+
+            function drawPoints() {
+                for (var i = 0; i < status.length; i++) {
+                    L.circleMarker([coords[2 * i], coords[2 * i + 1]], {
+                        renderer: renderer, radius: 5, weight: 1, color: "#555555",
+                        fillColor: data.palette[status[i]] || "#607d8b", fillOpacity: 0.9
+                    }).on("click", (function(i) {
+                        return function(e) { L.popup().setLatLng(e.latlng).setContent(data.names[i]).openOn(map); };
+                    })(i)).addTo(layer);
+                }
+            }
+            function drawClusters(level) {
+                for (var i = 0; i < level.n.length; i++) {
+                    var latlng = [level.c[2 * i], level.c[2 * i + 1]], count = level.n[i];
+                    L.circleMarker(latlng, {
+                        renderer: renderer, radius: 6 + 4 * Math.log10(count), weight: 2,
+                        color: "#ffffff", fillColor: count > 1 ? "#0078d7" : "#607d8b", fillOpacity: 0.8
+                    }).bindTooltip(count + " lieu(x)").on("click", function(e) {
+                        map.setView(e.latlng, map.getZoom() + 2);
+                    }).addTo(layer);
+                }
+            }
+            function redraw() {
+                layer.clearLayers();
+                var level = levels[map.getZoom()];
+                if (level) { drawClusters(level); } else { drawPoints(); }
+            }
+            map.on("zoomend", redraw);
+            redraw();
+        })();
+        {% endmacro %}
+"""
+
+
+def canvas_cluster_layer(venues, min_zoom=0, max_zoom=16):
+    """Couche canevas « grand volume » pour `venues` (dictionnaires name/status/lat/lon)."""
+    statuses = list(STATUS_COLORS)  # Même palette que les lignes du tableau
+    lats = np.array([v["lat"] for v in venues], dtype=np.float64)
+    lons = np.array([v["lon"] for v in venues], dtype=np.float64)
+
+    levels = {}
+    for zoom, (clat, clon, counts) in precompute_clusters(lats, lons, min_zoom, max_zoom).items():
+        levels[zoom] = {"c": pack_array(np.column_stack([clat, clon]).ravel(), "<f4"),
+                        "n": pack_array(counts, "<u4")}
+
+    payload = template_json({
+        "coords": pack_array(np.column_stack([lats, lons]).ravel(), "<f4"),
+        "status": pack_array([statuses.index(v["status"]) if v.get("status") in STATUS_COLORS else 255
+                              for v in venues], "u1"),
+        "names": [v.get("name", "") for v in venues],
+        "palette": [background for background, _ in STATUS_COLORS.values()],
+        "levels": levels,
+    })
+    return macro_element("CanvasClusterLayer", CANVAS_CLUSTER_TEMPLATE, payload=payload)
+
+
+# 🛣️ Géométries d'itinéraire : stockage en polyline encodée et simplification selon le zoom
+ROUTE_SIMPLIFY_ZOOMS = (6, 9, 12, 15)  # Un tracé simplifié par tranche de zoom
+ROUTE_TOLERANCE_PX = 1.5
+ROUTE_MAX_ZOOM = 19  # Zoom maximal du fond de carte, servi par la dernière tranche
+
+
+def encode_polyline(points, precision=5):
+    """Encode une liste de [lat, lon] au format « Encoded Polyline » (celui d'OSRM et de Google)."""
+    factor = 10 ** precision
+    output = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                output.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            output.append(chr(delta + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(output)
+
+
+def decode_polyline(encoded, precision=5):
+    """Décode une polyline encodée en liste de [lat, lon]."""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append([lat / factor, lon / factor])
+    return points
+
+
+def simplify_polyline(points, tolerance):
+    """
+    Simplifie un tracé par l'algorithme de Douglas-Peucker (version itérative).
+
+    :param points: Liste de [lat, lon].
+    :param tolerance: Écart maximal toléré, en degrés de latitude.
+    :return: Liste de [lat, lon] conservant le premier et le dernier point.
+    """
+    if len(points) < 3:
+        return [list(p) for p in points]
+
+    pts = np.asarray(points, dtype=np.float64)
+    # Repère local approximativement isotrope : longitude corrigée par cos(latitude)
+    xy = np.column_stack([pts[:, 1] * math.cos(math.radians(pts[:, 0].mean())), pts[:, 0]])
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last <= first + 1:
+            continue
+        segment = xy[last] - xy[first]
+        relative = xy[first + 1:last] - xy[first]
+        length = math.hypot(segment[0], segment[1])
+        if length == 0:
+            distances = np.hypot(relative[:, 0], relative[:, 1])
+        else:
+            distances = np.abs(segment[0] * relative[:, 1] - segment[1] * relative[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return pts[keep].tolist()
+
+
+def route_tolerance(zoom, latitude, pixels=ROUTE_TOLERANCE_PX):
+    """Convertit une tolérance en pixels écran au zoom donné en degrés de latitude."""
+    meters_per_pixel = 156543.03 * math.cos(math.radians(latitude)) / 2 ** zoom
+    return pixels * meters_per_pixel / 111320.0
+
+
+# Couche Leaflet d'itinéraire : chaque tronçon est embarqué en polyline encodée, simplifiée
+# pour chaque tranche de zoom, et la page choisit la version adaptée au zoom courant.
+ENCODED_ROUTE_TEMPLATE = """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var data = {{ this.payload }};
+            function decode(str) {
+                var index = 0, lat = 0, lng = 0, out = [];
+                while (index < str.length) {
+                    var deltas = [];
+                    for (var k = 0; k < 2; k++) {
+                        var b, shift = 0, result = 0;
+                        do { b = str.charCodeAt(index++) - 63; result |= (b & 0x1f) << shift; shift += 5; } while (b >= 0x20);
+                        deltas.push((result & 1) ? ~(result >> 1) : (result >> 1));
+                    }
+                    lat += deltas[0]; lng += deltas[1];
+                    out.push([lat / 1e5, lng / 1e5]);
+                }
+                return out;
+            }
+            var decoded = {};
+            var line = L.polyline([], {color: data.color, weight: data.weight, opacity: 0.7}).addTo(map);
+            function redraw() {
+                var zoom = map.getZoom(), band = data.bands[0];
+                data.bands.forEach(function(z) { if (z <= zoom) { band = z; } });
+                if (!decoded[band]) { decoded[band] = data.legs[band].map(decode); }
+                line.setLatLngs(decoded[band]);
+            }
+            map.on("zoomend", redraw);
+            redraw();
+        })();
+        {% endmacro %}
+"""
+
+
+def encoded_route_layer(encoded_legs, color="blue", weight=5, bands=ROUTE_SIMPLIFY_ZOOMS, max_zoom=ROUTE_MAX_ZOOM):
+    """
+    Couche d'itinéraire pour des tronçons en polylines encodées. Une tranche est affichée
+    jusqu'au zoom précédant la suivante (jusqu'à `max_zoom` pour la dernière) : elle est
+    simplifiée à la tolérance de ce zoom le plus fort, pour rester sous ROUTE_TOLERANCE_PX.
+    """
+    bands = sorted(bands)
+    legs = {}
+    for zoom, next_band in zip(bands, bands[1:] + [max_zoom + 1]):
+        legs[zoom] = []
+        for encoded in encoded_legs:
+            points = decode_polyline(encoded)
+            if not points:
+                continue
+            latitude = sum(p[0] for p in points) / len(points)
+            tolerance = route_tolerance(next_band - 1, latitude)
+            legs[zoom].append(encode_polyline(simplify_polyline(points, tolerance)))
+
+    payload = template_json({"bands": bands, "legs": legs, "color": color, "weight": weight})
+    return macro_element("EncodedRouteLayer", ENCODED_ROUTE_TEMPLATE, payload=payload)
+
+
+# 🚗 Moteurs de routage : OSRM (public ou auto-hébergé) ou estimation locale hors connexion
+RouteLeg = namedtuple("RouteLeg", ["geometry", "duration", "distance", "estimated"])
+
+
+def haversine_km(start, end):
+    """Distance orthodromique en kilomètres entre deux points (lat, lon)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (start[0], start[1], end[0], end[1]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+
+class OSRMRouter:
+    """
+    Calcule les tronçons via l'API HTTP d'un serveur OSRM.
+
+    Après un échec de connexion (serveur injoignable ou délai dépassé), le serveur n'est plus
+    interrogé pendant `retry_after` secondes : les tronçons suivants échouent aussitôt au lieu
+    d'attendre chacun le délai complet.
+    """
+
+    def __init__(self, base_url="http://router.project-osrm.org", profile="driving", timeout=10, retry_after=60):
+        self.base_url = base_url.rstrip("/")
+        self.profile = profile
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.offline_until = 0.0  # time.monotonic() avant lequel le serveur n'est pas réinterrogé
+        self.session = requests.Session()
+
+    @property
+    def online(self):
+        return time.monotonic() >= self.offline_until
+
+    def route(self, start, end):
+        if not self.online:
+            return None
+        # OSRM attend l'ordre : longitude, latitude.
+        url = (f"{self.base_url}/route/v1/{self.profile}/{start[1]},{start[0]};{end[1]},{end[0]}"
+               "?overview=full&geometries=polyline")
+        try:
+            data = self.session.get(url, timeout=self.timeout).json()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.offline_until = time.monotonic() + self.retry_after
+            log_route.warning("🔌 OSRM injoignable (%s) : pas de nouvel essai avant %s s. %s",
+                              self.base_url, self.retry_after, e)
+            return None
+        except (requests.RequestException, ValueError) as e:
+            log_route.error("Erreur lors de la récupération de l'itinéraire depuis OSRM (%s) : %s", self.base_url, e)
+            return None
+        if not data or not data.get("routes"):
+            return None
+        route = data["routes"][0]
+        return RouteLeg(route["geometry"], route["duration"], route["distance"], False)
+
+
+class HaversineRouter:
+    """
+    Estimation hors connexion : distance à vol d'oiseau multipliée par un facteur de détour,
+    durée déduite d'une vitesse moyenne qui dépend de la longueur du tronçon.
+    """
+
+    def __init__(self, detour_factor=1.3, speeds_kmh=((20, 45), (80, 70), (None, 100))):
+        self.detour_factor = detour_factor
+        self.speeds_kmh = speeds_kmh  # (distance max en km ou None, vitesse moyenne en km/h)
+
+    def route(self, start, end):
+        distance_km = haversine_km(start, end) * self.detour_factor
+        speed = next(speed for limit, speed in self.speeds_kmh if limit is None or distance_km <= limit)
+        geometry = encode_polyline([start, end])
+        return RouteLeg(geometry, distance_km / speed * 3600, distance_km * 1000, True)
+
+
+class FallbackRouter:
+    """Interroge le moteur principal et se replie sur l'estimation locale en cas d'échec (hors ligne)."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    @property
+    def online(self):
+        """Vrai si le moteur principal peut être interrogé (hors pause après un échec de connexion)."""
+        return getattr(self.primary, "online", True)
+
+    def route(self, start, end):
+        return self.primary.route(start, end) or self.fallback.route(start, end)
+
+
+def create_router(settings=None):
+    """
+    Construit le moteur de routage à partir de la section « routing » de la configuration.
+
+    Les variables d'environnement BOOKING_ROUTER (osrm, haversine ou auto) et BOOKING_OSRM_URL
+    sont prioritaires, ce qui permet de pointer vers un OSRM local ou de travailler hors ligne.
+    """
+    settings = dict(settings if settings is not None else config.get("routing", {}))
+    backend = os.environ.get("BOOKING_ROUTER", settings.get("backend", "auto"))
+    base_url = os.environ.get("BOOKING_OSRM_URL", settings.get("osrm_url", "http://router.project-osrm.org"))
+
+    estimator = HaversineRouter(
+        detour_factor=settings.get("detour_factor", 1.3),
+        speeds_kmh=tuple(tuple(band) for band in settings.get("speeds_kmh", ((20, 45), (80, 70), (None, 100)))),
+    )
+    if backend == "haversine":
+        return estimator
+    osrm = OSRMRouter(base_url, profile=settings.get("profile", "driving"), timeout=settings.get("timeout", 10),
+                      retry_after=settings.get("retry_after", 60))
+    if backend == "osrm":
+        return osrm
+    return FallbackRouter(osrm, estimator)
+
+
+def create_geocoder(settings=None):
+    """
+    Construit le géocodeur Nominatim à partir de la section « geocoding » de la configuration.
+
+    La variable d'environnement BOOKING_NOMINATIM_URL est prioritaire (Nominatim local, banc d'essai).
+    """
+    from geopy.geocoders import Nominatim
+
+    settings = dict(settings if settings is not None else config.get("geocoding", {}))
+    url = urlsplit(os.environ.get("BOOKING_NOMINATIM_URL",
+                                  settings.get("nominatim_url", "https://nominatim.openstreetmap.org")))
+    return Nominatim(user_agent="booking_app", timeout=settings.get("timeout", 5),
+                     domain=url.netloc + url.path.rstrip("/"), scheme=url.scheme)
+
+
 class MapManager:
     def __init__(self, map_view, parent=None):  # ✅ Correction ici
         self.map_view = map_view
         self.parent = parent  # ✅ Assigne le parent correctement
-        self.map = folium.Map(location=[46.2276, 2.2137], zoom_start=6, tiles="OpenStreetMap")
+        self.map = create_base_map()
+        from folium.plugins import MarkerCluster
         self.marker_cluster = MarkerCluster().add_to(self.map)
         self.markers = {}  # Dictionnaire pour gérer les marqueurs individuellement
+        self.router = create_router()
+        self.route_cache = {}  # (départ, arrivée) → RouteLeg
+        self.routes = []  # Tronçons de l'itinéraire affiché, en polylines encodées
+        self.route_layer = None
 
-    def add_marker(self, name, lat, lon, category="Itinéraire"):
-        """Ajoute un marqueur sur la carte."""
-        print(f"📍 Ajout du marqueur : {name} [{lat}, {lon}]")  # Debug
+    def add_marker(self, name, lat, lon, category="Itinéraire", refresh=True):
+        """Ajoute un marqueur sur la carte (refresh=False pour regrouper plusieurs ajouts avant un seul rendu)."""
+        log_map.debug("📍 Ajout du marqueur : %s [%s, %s]", name, lat, lon)
 
+        import folium
         marker = folium.Marker(
             location=[lat, lon],
             popup=name,
@@ -300,14 +1294,15 @@ class MapManager:
         marker.add_to(self.map)  # ✅ Utilisation correcte de `self.map`
 
         # 🔄 Forcer la mise à jour de la carte via `BookingApp`
-        if self.parent and hasattr(self.parent, "update_map_display"):
+        if refresh and self.parent and hasattr(self.parent, "update_map_display"):
             self.parent.update_map_display()
+        return marker
 
 
     def add_contact_to_table(self, contact_name, address, status, lat, lon):
         """Ajoute un contact dans le tableau de l'onglet 'Map'."""
         if not self.parent or not hasattr(self.parent, "map_table"):
-            print("⚠️ Erreur : map_table n'existe pas dans BookingApp.")  # ✅ Debug
+            log_map.error("⚠️ map_table n'existe pas dans BookingApp.")
             return
 
         row_count = self.parent.map_table.rowCount()
@@ -317,39 +1312,33 @@ class MapManager:
         self.parent.map_table.setItem(row_count, 2, QTableWidgetItem(status))
         self.parent.map_table.setItem(row_count, 3, QTableWidgetItem(f"{lat}, {lon}"))  # ✅ Ajout des coordonnées
 
-        print(f"📋 Contact ajouté au tableau : {contact_name} - {address} [{lat}, {lon}]")  # ✅ Debug
+        log_map.debug("📋 Contact ajouté au tableau : %s - %s [%s, %s]", contact_name, address, lat, lon)
 
+    @timed_call("route")
     def get_route(self, start, end):
 
         """
-        Récupère l'itinéraire entre deux points via l'API publique d'OSRM.
+        Récupère l'itinéraire entre deux points via le moteur de routage configuré (OSRM ou estimation locale).
 
         :param start: Tuple (lat, lon) du point de départ.
         :param end: Tuple (lat, lon) du point d'arrivée.
-        :return: Tuple contenant (geometry: liste de paires [lat, lon], duration en secondes, distance en mètres)
+        :return: Tuple contenant (geometry: polyline encodée, duration en secondes, distance en mètres)
                  ou (None, None, None) en cas d'erreur.
         """
-        try:
-            # OSRM attend l'ordre : longitude, latitude.
-            start_lon_lat = f"{start[1]},{start[0]}"
-            end_lon_lat = f"{end[1]},{end[0]}"
-            url = f"http://router.project-osrm.org/route/v1/driving/{start_lon_lat};{end_lon_lat}?overview=full&geometries=geojson"
-            response = requests.get(url)
-            data = response.json()
-            if data and data.get("routes"):
-                route = data["routes"][0]
-                geometry = route["geometry"]["coordinates"]
-                duration = route["duration"]  # en secondes
-                distance = route["distance"]  # en mètres
-                # Convertir les coordonnées de [lon, lat] à [lat, lon]
-                converted_geometry = [[coord[1], coord[0]] for coord in geometry]
-                return converted_geometry, duration, distance
-        except Exception as e:
-            logging.error(f"Erreur lors de la récupération de l'itinéraire depuis OSRM : {e}")
-        return None, None, None
+        key = (round(start[0], 5), round(start[1], 5), round(end[0], 5), round(end[1], 5))
+        leg = self.route_cache.get(key)
+        # Une estimation en cache sert tant qu'OSRM est en pause ; elle est recalculée dès qu'il peut être réinterrogé
+        if leg is None or (leg.estimated and getattr(self.router, "online", False)):
+            leg = self.router.route(start, end)
+            if leg is None:
+                log_route.warning("Aucun itinéraire trouvé entre %s et %s", start, end)
+                return None, None, None
+            self.route_cache[key] = leg
+
+        return leg.geometry, leg.duration, leg.distance
 
 
-    def add_route_to_map(self, m: folium.Map, points: list) -> float:
+    def add_route_to_map(self, m, points: list) -> float:
 
         """
         Ajoute sur la carte folium une ligne reliant les points d'itinéraire
@@ -361,21 +1350,38 @@ class MapManager:
         """
         total_duration = 0
         if len(points) < 2:
-            logging.info("Nombre insuffisant de points pour calculer l'itinéraire")
+            log_route.info("Nombre insuffisant de points pour calculer l'itinéraire")
             return total_duration
 
         # Itère sur chaque paire de points consécutifs
+        encoded_legs = []
         for i in range(len(points) - 1):
             start = points[i]
             end = points[i + 1]
             geometry, duration, distance = self.get_route(start, end)
             if geometry:
-                folium.PolyLine(geometry, color="blue", weight=5, opacity=0.7).add_to(m)  # ✅ Correction
+                encoded_legs.append(geometry)
                 total_duration += duration
             else:
-                logging.warning(f"Impossible de récupérer l'itinéraire entre {start} et {end}")
+                log_route.warning("Impossible de récupérer l'itinéraire entre %s et %s", start, end)
+
+        self.show_route(m, encoded_legs)
         return total_duration / 60  # Convertir les secondes en minutes
 
+    def show_route(self, m, encoded_legs):
+        """Remplace l'itinéraire affiché par une couche unique de tronçons encodés et simplifiés par zoom."""
+        if self.route_layer is not None:
+            self.remove_layer(m, self.route_layer)
+        self.routes = list(encoded_legs)
+        self.route_layer = encoded_route_layer(self.routes)
+        self.route_layer.add_to(m)
+
+    def remove_layer(self, m, layer):
+        """Retire une couche de la carte, y compris le script déjà rendu lors d'une sauvegarde précédente."""
+        name = layer.get_name()
+        m._children.pop(name, None)
+        m.get_root().script._children.pop(name, None)
+
     def remove_marker(self, contact_name):
         """Supprime un marqueur spécifique de la carte."""
         if contact_name in self.markers:
@@ -383,25 +1389,6 @@ class MapManager:
             del self.markers[contact_name]
             self.update_map()
 
-    def send_selected_contacts_to_map(self, contacts):
-        """Ajoute plusieurs contacts sur la carte via MapManager et les met dans le tableau."""
-        print(f"✅ Contacts reçus pour la carte : {contacts}")  # ✅ Debug
-
-        for contact_data in contacts:
-            contact_name = contact_data.get("contact", "Inconnu")
-            address = contact_data.get("address", "Adresse inconnue")
-            status = contact_data.get("status", "Statut inconnu")
-
-            location = self.parent.safe_geocode([address]) if self.parent else None  # ✅ Vérification ajoutée
-
-            if location:
-                lat, lon = location["lat"], location["lon"]
-                print(f"📍 Ajout du marqueur : {contact_name} ({status}) [{lat}, {lon}]")  # ✅ Debug
-                self.add_marker(contact_name, lat, lon, status)
-                self.add_contact_to_table(contact_name, address, status, lat, lon)  # ✅ Ajout au tableau
-            else:
-                print(f"⚠️ Impossible de géolocaliser : {address}")  # ✅ Debug
-
     def toggle_marker_visibility(self, contact_name, visible):
         """Affiche ou masque un marqueur spécifique."""
         if contact_name in self.markers:
@@ -420,9 +1407,10 @@ class MapManager:
                 self.marker_cluster.remove_child(marker)
         self.update_map()
 
+    @timed_call("map_render")
     def update_map(self):
         """Met à jour l'affichage de la carte sans la réinitialiser."""
-        print("🔄 Mise à jour de la carte...")  # ✅ Debug
+        log_map.debug("🔄 Mise à jour de la carte...")
 
         # Sauvegarder la carte actuelle dans un fichier temporaire
         map_path = "cache/map.html"
@@ -430,7 +1418,7 @@ class MapManager:
 
         self.map.save(map_path)  # ✅ Enregistrement simplifié
 
-        print(f"✅ Carte enregistrée dans {map_path}")  # ✅ Debug
+        log_map.debug("✅ Carte enregistrée dans %s", map_path)
 
         # Charger la carte mise à jour dans QWebEngineView
         local_url = QUrl.fromLocalFile(os.path.abspath(map_path))
@@ -438,7 +1426,12 @@ class MapManager:
 
     def send_selected_contacts_to_map(self, contacts):
         """Ajoute plusieurs contacts sur la carte via MapManager et les met dans le tableau."""
-        print(f"✅ Contacts reçus pour la carte : {contacts}")  # ✅ Debug
+        log_map.info("✅ Contacts reçus pour la carte : %d", len(contacts))
+
+        # 🌍 Beaucoup de lieux : rendu compact sur canevas plutôt qu'un marqueur folium par lieu
+        if len(contacts) >= HIGH_VOLUME_THRESHOLD:
+            self.show_high_volume(contacts)
+            return
 
         for contact_data in contacts:
             contact_name = contact_data.get("contact", "Inconnu")
@@ -449,24 +1442,51 @@ class MapManager:
 
             if location:
                 lat, lon = location["lat"], location["lon"]
-                print(f"📍 Ajout du marqueur : {contact_name} ({status}) [{lat}, {lon}]")  # ✅ Debug
+                log_map.debug("📍 Ajout du marqueur : %s (%s) [%s, %s]", contact_name, status, lat, lon)
                 self.add_marker(contact_name, lat, lon, status)
                 self.add_contact_to_table(contact_name, address, status, lat, lon)  # ✅ Ajout au tableau
             else:
-                print(f"⚠️ Impossible de géolocaliser : {address}")  # ✅ Debug
+                log_geocode.warning("⚠️ Impossible de géolocaliser : %s", address)
 
         # Mettre à jour la carte une seule fois après avoir ajouté tous les marqueurs
         self.update_map()
 
+    def show_high_volume(self, contacts):
+        """Affiche un grand nombre de lieux en une seule couche canevas avec regroupements précalculés."""
+        venues = []
+        for contact_data in contacts:
+            lat, lon = contact_data.get("lat"), contact_data.get("lon")
+            if lat is None or lon is None:
+                location = self.parent.safe_geocode([contact_data.get("address", "")]) if self.parent else None
+                if not location:
+                    continue
+                lat, lon = location["lat"], location["lon"]
+            venues.append({
+                "name": contact_data.get("contact", "Inconnu"),
+                "status": contact_data.get("status", ""),
+                "lat": lat,
+                "lon": lon,
+            })
+
+        # Une seule couche « grand volume » à la fois sur la carte
+        if getattr(self, "bulk_layer", None) is not None:
+            self.remove_layer(self.map, self.bulk_layer)
+        self.bulk_layer = canvas_cluster_layer(venues)
+        self.bulk_layer.add_to(self.map)
+
+        log_map.info("🌍 Mode grand volume : %d lieux affichés sur %d demandés.", len(venues), len(contacts))
+        self.update_map()
+
 class MapGeocodeWorker(QThread):
     progress = pyqtSignal(int)
     finished = pyqtSignal(list)
     error = pyqtSignal(str)
 
-    def __init__(self, contacts, geocoder):
+    def __init__(self, contacts, geocoder, app):
         super().__init__()
         self.contacts = contacts
         self.geocoder = geocoder
+        self.app = app  # BookingApp : construction des requêtes et géocodage avec cache
         self.cache = {}
 
     def run(self):
@@ -475,8 +1495,8 @@ class MapGeocodeWorker(QThread):
         results = []
 
         for i, row in enumerate(self.contacts):
-            possible_queries = self.build_search_query(row)
-            location = self.safe_geocode(possible_queries)
+            possible_queries = self.app.build_search_query(row)
+            location = self.app.safe_geocode(possible_queries)
             coordinates = f"{location['lat']}, {location['lon']}" if location else "Non trouvé"
 
             results.append({
@@ -491,6 +1511,49 @@ class MapGeocodeWorker(QThread):
 
         self.finished.emit(results)
 
+class RouteWorker(QThread):
+    """Calcule les tronçons d'une tournée en parallèle, hors du thread de l'interface, avec annulation."""
+    leg_ready = pyqtSignal(int, object)  # Index du tronçon, (geometry, duration, distance)
+    progress = pyqtSignal(int)
+    finished_route = pyqtSignal(list)  # Tronçons dans l'ordre de la tournée (None si échec)
+
+    def __init__(self, map_manager, points, max_workers=4):
+        super().__init__()
+        self.map_manager = map_manager
+        self.points = points
+        self.max_workers = max_workers
+
+    POLL_INTERVAL = 0.1  # Secondes entre deux vérifications d'annulation pendant l'attente d'un tronçon
+
+    def run(self):
+        legs = list(zip(self.points[:-1], self.points[1:]))
+        results = [None] * len(legs)
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {pool.submit(self.map_manager.get_route, start, end): i for i, (start, end) in enumerate(legs)}
+            pending = set(futures)
+            # Attente par courtes tranches : une annulation n'attend pas la fin d'une requête OSRM
+            while pending and not self.isInterruptionRequested():
+                completed, pending = wait(pending, timeout=self.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    index = futures[future]
+                    try:
+                        geometry, duration, distance = future.result()
+                    except Exception as e:
+                        log_route.error("❌ Tronçon %s non calculé : %s", index + 1, e)
+                        geometry = None
+                    if geometry:
+                        results[index] = (geometry, duration, distance)
+                        self.leg_ready.emit(index, results[index])
+                if completed:
+                    self.progress.emit(int((len(legs) - len(pending)) / len(legs) * 100))
+        finally:
+            # En cas d'annulation, les tronçons pas encore démarrés sont abandonnés
+            pool.shutdown(wait=False, cancel_futures=True)
+            # Fin toujours signalée (échec ou annulation compris) pour que l'interface se débloque
+            self.finished_route.emit(results)
+
+
 class ExcelLoaderThread(QThread):
     """Thread pour charger un fichier Excel sans bloquer l'UI."""
     finished = pyqtSignal(object)  # Signal pour renvoyer le DataFrame
@@ -509,103 +1572,1049 @@ class ExcelLoaderThread(QThread):
             self.finished.emit(None)
             logging.error(f"Erreur Excel : {e}")
 
+def normalize_text(value):
+    """Texte en minuscules et sans accents, pour que « echange » trouve « Échange Tel. »."""
+    text = unicodedata.normalize("NFKD", str(value).casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y")
+LOCATION_HEADERS = ("lieu", "ville", "adresse", "code postal", "cp", "departement", "region", "pays", "salle")
+
+
+def date_formats():
+    """Formats de date acceptés, celui de la configuration en premier."""
+    configured = config.get("date_format", "%Y-%m-%d")
+    return (configured,) + tuple(fmt for fmt in DATE_FORMATS if fmt != configured)
+
+
+def parse_date_text(value):
+    """Convertit une date saisie dans l'un des formats connus, ou retourne None."""
+    value = str(value).strip()
+    for fmt in date_formats():
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date_column(values):
+    """Version vectorisée de parse_date_text : tableau datetime64 (NaT si illisible)."""
+    texts = pd.Series(values, dtype=object).astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=texts.index, dtype="datetime64[ns]")
+    for fmt in date_formats():
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(texts[missing], format=fmt, errors="coerce")
+    return parsed.to_numpy(copy=True)
+
+
+def parse_cachet_column(values):
+    """Montants de cachet en float (« 1 200,50 € » → 1200.5), NaN si illisible."""
+    texts = pd.Series(values, dtype=object).astype(str)
+    texts = texts.str.replace(r"[€\s\u00a0]", "", regex=True).str.replace(",", ".", regex=False)
+    return pd.to_numeric(texts, errors="coerce").to_numpy(dtype=float, copy=True)
+
+
+class TableMirror(ABC):
+    """
+    Base des vues dérivées du tableau (index de recherche, stockage par colonnes).
+
+    Les éditions de cellules ne marquent que leur ligne à recalculer ; insertions et
+    suppressions de lignes/colonnes ou un changement d'en-têtes invalident toute la vue,
+    reconstruite à la lecture suivante (sauf si la vue redéfinit rows_inserted / rows_removed).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.dirty = set()
+        self.stale = True
+
+        model = table.model()
+        for signal in (model.rowsMoved, model.columnsInserted, model.columnsRemoved, model.modelReset):
+            signal.connect(self.invalidate)
+        model.rowsInserted.connect(lambda parent, first, last: self.rows_inserted(first, last))
+        model.rowsRemoved.connect(lambda parent, first, last: self.rows_removed(first, last))
+        model.headerDataChanged.connect(
+            lambda orientation, first, last: orientation == Qt.Horizontal and self.invalidate())
+        table.itemChanged.connect(lambda item: self.invalidate_row(item.row()))
+
+    def invalidate(self, *args):
+        """Invalide toute la vue (structure du tableau modifiée)."""
+        self.stale = True
+
+    def rows_inserted(self, first, last):
+        """Lignes `first` à `last` insérées : par défaut, toute la vue est invalidée."""
+        self.invalidate()
+
+    def rows_removed(self, first, last):
+        """Lignes `first` à `last` supprimées : par défaut, toute la vue est invalidée."""
+        self.invalidate()
+
+    def invalidate_row(self, row):
+        """Marque une ligne dont le contenu a changé."""
+        if not self.stale:
+            self.dirty.add(row)
+
+    def cell_text(self, row, col):
+        """Valeur d'une cellule (Statut et Formule compris : ce sont de simples éléments texte)."""
+        item = self.table.item(row, col)
+        return item.text() if item else ""
+
+    def refresh(self):
+        """Recalcule ce qui doit l'être : toute la vue si elle est invalide, sinon les lignes marquées."""
+        if self.stale:
+            self.rebuild()
+            self.stale = False
+        else:
+            rows = sorted(row for row in self.dirty if row < self.table.rowCount())
+            if rows:
+                self.update_rows(rows)
+        self.dirty.clear()
+
+    @abstractmethod
+    def rebuild(self):
+        """Recalcule toute la vue à partir du tableau."""
+
+    @abstractmethod
+    def update_rows(self, rows):
+        """Recalcule les lignes logiques `rows` (triées), sans changement de structure."""
+
+
+class RowTextIndex(TableMirror):
+    """Index de recherche : le texte normalisé de chaque ligne logique du tableau."""
+
+    def __init__(self, table):
+        self.rows = []
+        self.last_needle = None
+        self.last_matches = None
+        super().__init__(table)
+
+    def invalidate(self, *args):
+        super().invalidate()
+        self.last_matches = None
+
+    def invalidate_row(self, row):
+        super().invalidate_row(row)
+        self.last_matches = None
+
+    def row_text(self, row):
+        """Texte normalisé d'une ligne (une cellule par ligne de texte)."""
+        return normalize_text("\n".join(self.cell_text(row, col) for col in range(self.table.columnCount())))
+
+    def rebuild(self):
+        self.rows = [self.row_text(row) for row in range(self.table.rowCount())]
+
+    def update_rows(self, rows):
+        for row in rows:
+            self.rows[row] = self.row_text(row)
+
+    def matches(self, query):
+        """Liste de booléens (une entrée par ligne logique) : la ligne contient-elle la recherche ?"""
+        self.refresh()
+        needle = normalize_text(query.strip())
+        if not needle:
+            result = [True] * len(self.rows)
+        elif self.last_matches is not None and self.last_needle and self.last_needle in needle:
+            # La recherche s'est précisée : seules les lignes déjà retenues peuvent encore correspondre
+            result = [matched and needle in text for matched, text in zip(self.last_matches, self.rows)]
+        else:
+            result = [needle in text for text in self.rows]
+
+        self.last_needle = needle
+        self.last_matches = result
+        return result
+
+
+class ColumnStore(TableMirror):
+    """
+    Copie du tableau colonne par colonne (DataFrame indexé par ligne logique).
+
+    Colonnes dérivées tenues à jour avec le reste : dates (datetime64), cachets (float)
+    et texte normalisé des colonnes de lieu. Les filtres s'y évaluent en masques numpy.
+    """
+
+    def __init__(self, table):
+        self.headers = []
+        self.frame = pd.DataFrame()
+        self.dates = np.array([], dtype="datetime64[ns]")
+        self.cachets = np.array([], dtype=float)
+        self.places = pd.Series([], dtype=object)
+        super().__init__(table)
+
+    def column(self, name):
+        """Index de la colonne portant cet en-tête, ou None."""
+        return self.headers.index(name) if name in self.headers else None
+
+    def location_columns(self):
+        """Colonnes décrivant le lieu (ville, adresse…) ; à défaut, toutes les colonnes importées."""
+        normalized = [normalize_text(header) for header in self.headers]
+        columns = [col for col, header in enumerate(normalized) if header in LOCATION_HEADERS]
+        if not columns:
+            fixed = {"Date", "Statut", "Cachet", "Formule"}
+            columns = [col for col, header in enumerate(self.headers) if header not in fixed]
+        return columns
+
+    def rows(self, logical_rows):
+        """Valeurs (listes de chaînes) des lignes logiques demandées, dans l'ordre donné."""
+        self.refresh()
+        logical_rows = list(logical_rows)
+        if not logical_rows:
+            return []
+        return self.frame.take(logical_rows).to_numpy(dtype=object).tolist()
+
+    def place_text(self, values):
+        return normalize_text(" ".join(str(values[col]) for col in self.location_columns()))
+
+    def rebuild(self):
+        self.headers = [
+            (self.table.horizontalHeaderItem(col).text().strip() if self.table.horizontalHeaderItem(col) else "")
+            for col in range(self.table.columnCount())
+        ]
+        data = [[self.cell_text(row, col) for col in range(len(self.headers))]
+                for row in range(self.table.rowCount())]
+        self.frame = pd.DataFrame(data, columns=range(len(self.headers)), dtype=object)
+
+        date_col, cachet_col = self.column("Date"), self.column("Cachet")
+        rows = len(self.frame)
+        self.dates = (parse_date_column(self.frame[date_col]) if date_col is not None
+                      else np.full(rows, np.datetime64("NaT"), dtype="datetime64[ns]"))
+        self.cachets = (parse_cachet_column(self.frame[cachet_col]) if cachet_col is not None
+                        else np.full(rows, np.nan))
+        location_columns = self.location_columns()
+        if location_columns:
+            joined = self.frame[location_columns].astype(str).agg(" ".join, axis=1)
+            self.places = joined.map(normalize_text)
+        else:
+            self.places = pd.Series([""] * rows, dtype=object)
+
+    def update_rows(self, rows):
+        date_col, cachet_col = self.column("Date"), self.column("Cachet")
+        for row in rows:
+            values = [self.cell_text(row, col) for col in range(len(self.headers))]
+            self.frame.iloc[row] = values
+            if date_col is not None:
+                parsed = parse_date_text(values[date_col])
+                self.dates[row] = np.datetime64(parsed) if parsed else np.datetime64("NaT")
+            if cachet_col is not None:
+                self.cachets[row] = parse_cachet_column([values[cachet_col]])[0]
+            self.places.iat[row] = self.place_text(values)
+
+    def mask(self, criteria):
+        """
+        Masque booléen (une entrée par ligne logique) combinant tous les critères actifs.
+
+        :param criteria: dict avec, au choix, "statut" et "formule" (ensembles de valeurs),
+                         "date" (début, fin), "cachet" (min, max) et "lieu" (texte).
+        """
+        self.refresh()
+        mask = np.ones(len(self.frame), dtype=bool)
+
+        statut_col, formule_col = self.column("Statut"), self.column("Formule")
+        if criteria.get("statut") and statut_col is not None:
+            statuts = self.frame[statut_col].replace("", "Nouveau")
+            mask &= statuts.isin(criteria["statut"]).to_numpy()
+        if criteria.get("formule") and formule_col is not None:
+            mask &= self.frame[formule_col].isin(criteria["formule"]).to_numpy()
+
+        start, end = criteria.get("date") or (None, None)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(start, "ns")
+        if end is not None:
+            mask &= self.dates <= np.datetime64(end, "ns")
+
+        low, high = criteria.get("cachet") or (None, None)
+        if low is not None:
+            mask &= self.cachets >= low
+        if high is not None:
+            mask &= self.cachets <= high
+
+        if criteria.get("lieu"):
+            needle = normalize_text(criteria["lieu"].strip())
+            mask &= self.places.str.contains(needle, regex=False).to_numpy(dtype=bool)
+
+        return mask
+
+
+class DateIndex(TableMirror):
+    """
+    Index jour → lignes logiques de la colonne Date, quel que soit le format saisi
+    (dd/MM/yyyy du calendrier, format de la configuration, ISO…).
+
+    Tenu à jour ligne par ligne au fil des éditions : trouver les réservations d'un jour
+    ou d'un mois ne parcourt plus le tableau.
+    """
+
+    def __init__(self, table, schema):
+        self.schema = schema
+        self.rows_by_day = {}
+        self.day_by_row = {}
+        super().__init__(table)
+
+    def rebuild(self):
+        self.rows_by_day, self.day_by_row = {}, {}
+        date_col = self.schema.index("Date")
+        if date_col is None:
+            return
+        parsed = parse_date_column([self.cell_text(row, date_col) for row in range(self.table.rowCount())])
+        for row in np.flatnonzero(~np.isnat(parsed)):
+            self.add(int(row), pd.Timestamp(parsed[row]).date())
+
+    def update_rows(self, rows):
+        date_col = self.schema.index("Date")
+        for row in rows:
+            self.remove(row)
+            parsed = parse_date_text(self.cell_text(row, date_col)) if date_col is not None else None
+            if parsed:
+                self.add(row, parsed.date())
+
+    def add(self, row, day):
+        self.day_by_row[row] = day
+        self.rows_by_day.setdefault(day, set()).add(row)
+
+    def remove(self, row):
+        day = self.day_by_row.pop(row, None)
+        if day is not None:
+            rows = self.rows_by_day[day]
+            rows.discard(row)
+            if not rows:
+                del self.rows_by_day[day]
+
+    def rows_on(self, day):
+        """Lignes logiques réservées ce jour-là (datetime.date), par ordre croissant."""
+        self.refresh()
+        return sorted(self.rows_by_day.get(day, ()))
+
+    def month(self, year, month):
+        """(jour, nombre de réservations) pour chaque jour réservé du mois."""
+        self.refresh()
+        day = datetime(year, month, 1).date()
+        booked = []
+        while day.month == month:
+            if day in self.rows_by_day:
+                booked.append((day, len(self.rows_by_day[day])))
+            day += timedelta(days=1)
+        return booked
+
+
+class BookingStats(TableMirror):
+    """
+    Agrégats du tableau tenus à jour au fil des éditions : nombre de lignes par Statut,
+    par Formule et par mois, totaux et moyennes de cachet, entonnoir Nouveau → Let's Go.
+
+    La contribution de chaque ligne est mémorisée : une édition retire l'ancienne et
+    ajoute la nouvelle, une suppression retire celles des lignes supprimées, sans repasser
+    sur les autres lignes.
+    """
+
+    # Étapes de l'entonnoir et statuts qui les composent. Les étapes sont cumulées : chacune
+    # compte aussi les lignes allées plus loin, si bien que les effectifs ne croissent jamais
+    # d'une étape à la suivante. « Full » et « Laisse tomber » sont des sorties, atteintes aussi
+    # bien après un mail qu'après un appel : elles ne comptent que parmi les contactés.
+    FUNNEL = (
+        ("Prospects", set(STATUS_CHOICES)),
+        ("Contactés", set(STATUS_CHOICES) - {"Nouveau"}),
+        ("En discussion", {"Échange Tel.", "Let's Go"}),
+        ("Let's Go", {"Let's Go"}),
+    )
+
+    def __init__(self, table, schema):
+        self.schema = schema
+        self.contributions = []  # Contribution de chaque ligne logique (None : pas encore calculée)
+        self.reset()
+        super().__init__(table)
+
+    def reset(self):
+        self.by_status = Counter()
+        self.by_formule = Counter()
+        self.by_month = Counter()
+        self.cachet_total = 0.0
+        self.cachet_count = 0
+        self.confirmed_total = 0.0  # Cachets des lignes « Let's Go »
+
+    def row_contribution(self, row):
+        """(statut, formule, mois « AAAA-MM » ou None, cachet ou None) d'une ligne."""
+        def value(name):
+            col = self.schema.index(name)
+            return self.cell_text(row, col).strip() if col is not None else ""
+
+        parsed = parse_date_text(value("Date")) if value("Date") else None
+        cachet = parse_cachet_column([value("Cachet")])[0] if value("Cachet") else np.nan
+        return (value("Statut") or STATUS_CHOICES[0], value("Formule"),
+                parsed.strftime("%Y-%m") if parsed else None,
+                None if np.isnan(cachet) else float(cachet))
+
+    def apply(self, contribution, sign):
+        status, formule, month, cachet = contribution
+        self.by_status[status] += sign
+        if formule:
+            self.by_formule[formule] += sign
+        if month:
+            self.by_month[month] += sign
+        if cachet is not None:
+            self.cachet_total += sign * cachet
+            self.cachet_count += sign
+            if status == "Let's Go":
+                self.confirmed_total += sign * cachet
+
+    def rebuild(self):
+        self.reset()
+        self.contributions = [self.row_contribution(row) for row in range(self.table.rowCount())]
+        for contribution in self.contributions:
+            self.apply(contribution, 1)
+
+    def update_rows(self, rows):
+        for row in rows:
+            if self.contributions[row] is not None:
+                self.apply(self.contributions[row], -1)
+            self.contributions[row] = self.row_contribution(row)
+            self.apply(self.contributions[row], 1)
+
+    def rows_inserted(self, first, last):
+        if self.stale:
+            return
+        count = last - first + 1
+        self.contributions[first:first] = [None] * count
+        self.dirty = {row + count if row >= first else row for row in self.dirty}
+        self.dirty.update(range(first, last + 1))
+
+    def rows_removed(self, first, last):
+        if self.stale:
+            return
+        for contribution in self.contributions[first:last + 1]:
+            if contribution is not None:
+                self.apply(contribution, -1)
+        del self.contributions[first:last + 1]
+        count = last - first + 1
+        self.dirty = {row - count if row > last else row for row in self.dirty if not first <= row <= last}
+
+    def summary(self):
+        """Instantané des agrégats, prêt à afficher."""
+        self.refresh()
+        total = len(self.contributions)
+        funnel = [(label, sum(self.by_status[status] for status in statuses))
+                  for label, statuses in self.FUNNEL]
+        return {
+            "total": total,
+            "by_status": [(status, self.by_status[status]) for status in STATUS_CHOICES]
+                         + [(status, count) for status, count in self.by_status.items()
+                            if status not in STATUS_CHOICES and count],
+            "by_formule": [(formule, count) for formule, count in sorted(self.by_formule.items()) if count],
+            "by_month": [(month, count) for month, count in sorted(self.by_month.items()) if count],
+            "cachet_total": self.cachet_total,
+            "cachet_average": self.cachet_total / self.cachet_count if self.cachet_count else 0.0,
+            "confirmed_total": self.confirmed_total,
+            "funnel": funnel,
+            "conversion": self.by_status["Let's Go"] / total if total else 0.0,
+        }
+
+
+class CellEditCommand:
+    """Modification d'une cellule : seules l'ancienne et la nouvelle valeur sont gardées."""
+
+    def __init__(self, row, col, old, new):
+        self.row, self.col = row, col
+        self.old, self.new = old, new
+        self.timestamp = time.monotonic()
+
+    def undo(self, app):
+        app.write_cell(self.row, self.col, self.old)
+
+    def redo(self, app):
+        app.write_cell(self.row, self.col, self.new)
+
+    def merge(self, other, window):
+        """Absorbe une modification rapprochée de la même cellule (une seule entrée d'historique)."""
+        if (isinstance(other, CellEditCommand) and (other.row, other.col) == (self.row, self.col)
+                and other.timestamp - self.timestamp <= window):
+            self.new = other.new
+            self.timestamp = other.timestamp
+            return True
+        return False
+
+    def cost(self):
+        return 64 + sys.getsizeof(self.old) + sys.getsizeof(self.new)
+
+    def journal_records(self, forward=True):
+        return [["c", self.row, self.col, self.new if forward else self.old]]
+
+
+class RowsCommand:
+    """Insertion ou suppression de lignes : seules les lignes concernées sont copiées."""
+
+    def __init__(self, kind, rows):
+        """
+        :param kind: "insert" ou "delete".
+        :param rows: Liste de (ligne, valeurs) par ordre de ligne croissant.
+        """
+        self.kind = kind
+        self.rows = rows
+
+    def undo(self, app):
+        if self.kind == "insert":
+            app.remove_rows([row for row, _ in self.rows])
+        else:
+            app.insert_rows(self.rows)
+
+    def redo(self, app):
+        if self.kind == "insert":
+            app.insert_rows(self.rows)
+        else:
+            app.remove_rows([row for row, _ in self.rows])
+
+    def merge(self, other, window):
+        return False
+
+    def cost(self):
+        return 64 + sum(sys.getsizeof(value) for _, values in self.rows for value in values)
+
+    def journal_records(self, forward=True):
+        if (self.kind == "insert") == forward:
+            return [["i", row, values] for row, values in self.rows]
+        return [["d", [row for row, _ in self.rows]]]
+
+
+class CompositeCommand:
+    """Plusieurs commandes annulées et rétablies d'un seul coup (collage, par exemple)."""
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def undo(self, app):
+        for command in reversed(self.commands):
+            command.undo(app)
+
+    def redo(self, app):
+        for command in self.commands:
+            command.redo(app)
+
+    def merge(self, other, window):
+        return False
+
+    def cost(self):
+        return sum(command.cost() for command in self.commands)
+
+    def journal_records(self, forward=True):
+        commands = self.commands if forward else reversed(self.commands)
+        return [record for command in commands for record in command.journal_records(forward)]
+
+
+class UndoStack:
+    """
+    Historique annuler/rétablir à base de commandes (différences de cellules ou de lignes).
+
+    Borné en nombre d'entrées et en mémoire : les plus anciennes sont oubliées en premier.
+    Les modifications successives d'une même cellule dans `merge_window` secondes sont fusionnées.
+    """
+
+    def __init__(self, max_depth=500, max_bytes=4 * 1024 * 1024, merge_window=1.0):
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.merge_window = merge_window
+        self.undo_commands = deque()
+        self.redo_commands = []
+        self.size = 0
+
+    def __len__(self):
+        return len(self.undo_commands)
+
+    def can_undo(self):
+        return bool(self.undo_commands)
+
+    def can_redo(self):
+        return bool(self.redo_commands)
+
+    def push(self, command):
+        """Ajoute une commande déjà appliquée au tableau (vide la pile « rétablir »)."""
+        self.size -= sum(redo.cost() for redo in self.redo_commands)
+        self.redo_commands.clear()
+
+        last = self.undo_commands[-1] if self.undo_commands else None
+        if last is not None:
+            previous_cost = last.cost()
+            if last.merge(command, self.merge_window):
+                self.size += last.cost() - previous_cost
+                return
+
+        self.undo_commands.append(command)
+        self.size += command.cost()
+        self.trim()
+
+    def trim(self):
+        while self.undo_commands and (len(self.undo_commands) > self.max_depth or
+                                      (self.size > self.max_bytes and len(self.undo_commands) > 1)):
+            self.size -= self.undo_commands.popleft().cost()
+
+    def undo(self, app):
+        command = self.undo_commands.pop()
+        command.undo(app)
+        self.redo_commands.append(command)
+        return command
+
+    def redo(self, app):
+        command = self.redo_commands.pop()
+        command.redo(app)
+        self.undo_commands.append(command)
+        return command
+
+    def clear(self):
+        self.undo_commands.clear()
+        self.redo_commands.clear()
+        self.size = 0
+
+
+class EditJournal:
+    """
+    Journal des éditions du tableau, à côté du fichier ouvert (une ligne JSON par modification).
+
+    La première ligne décrit la base : fichier, en-têtes et, si l'affichage était trié,
+    la ligne logique de chaque ligne du fichier. Viennent ensuite les opérations :
+    ["c", ligne, colonne, valeur], ["i", ligne, valeurs] et ["d", [lignes]].
+    Le journal n'est qu'ajouté ; les fsync sont groupés par `sync()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self.pending = 0
+
+    @staticmethod
+    def path_for(file_path):
+        directory, name = os.path.split(os.path.abspath(file_path))
+        return os.path.join(directory, f".{name}.journal")
+
+    @staticmethod
+    def base_line(base, headers, order=None):
+        if order is not None and list(order) == list(range(len(order))):
+            order = None  # Ordre du fichier = ordre logique : inutile de le stocker
+        record = {"base": base, "headers": headers, "order": list(order) if order is not None else None}
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def start(self, base, headers, order=None):
+        """Recommence le journal sur une nouvelle base (fichier qui vient d'être écrit ou ouvert)."""
+        self.close()
+        write_file_atomic(self.path, self.base_line(base, headers, order))
+        self.handle = open(self.path, "ab")
+
+    def resume(self):
+        """Reprend un journal existant (après récupération) en ajoutant à sa suite."""
+        self.close()
+        self.handle = open(self.path, "ab")
+
+    def append(self, records):
+        if self.handle is None or not records:
+            return
+        self.handle.write(b"".join(
+            (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            for record in records))
+        self.pending += len(records)
+
+    def offset(self):
+        return self.handle.tell() if self.handle else 0
+
+    def sync(self):
+        """Pousse les écritures en attente jusqu'au disque (un seul fsync pour tout le lot)."""
+        if self.handle is None or not self.pending:
+            return
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.pending = 0
+
+    def checkpoint(self, offset, base, headers, order=None):
+        """Le fichier contient tout jusqu'à `offset` : ne garde que la nouvelle base et la suite du journal."""
+        if self.handle is None:
+            return
+        self.handle.flush()
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        self.handle.close()
+        write_file_atomic(self.path, self.base_line(base, headers, order) + tail)
+        self.handle = open(self.path, "ab")
+        self.pending = 0
+
+    def close(self, discard=False):
+        if self.handle is not None:
+            self.sync()
+            self.handle.close()
+            self.handle = None
+        if discard and os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def read(path):
+        """Relit un journal : (base, opérations). Une dernière ligne tronquée par un crash est ignorée."""
+        base, operations = None, []
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except (ValueError, UnicodeDecodeError):
+                    break
+                if base is None:
+                    base = record
+                else:
+                    operations.append(record)
+        return base, operations
+
+
+class AutosaveThread(QThread):
+    """Sérialise et écrit un instantané du tableau sans bloquer l'interface."""
+    saved = pyqtSignal(int, str, bool)  # révision sauvegardée, empreinte du contenu, fichier réécrit ?
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, headers, rows, revision, last_digest=None, state=None):
+        super().__init__()
+        self.path = path
+        self.headers = headers
+        self.rows = rows
+        self.state = state
+        self.revision = revision
+        self.last_digest = last_digest
+
+    def run(self):
+        try:
+            data = serialize_table(self.path, self.headers, self.rows, self.state)
+            digest = hashlib.sha1(data).hexdigest()
+            written = digest != self.last_digest  # Contenu identique au dernier fichier écrit : rien à faire
+            if written:
+                write_file_atomic(self.path, data)
+            self.saved.emit(self.revision, digest, written)
+        except Exception as e:
+            log_io.error("Erreur sauvegarde automatique (%s) : %s", self.path, e)
+            self.failed.emit(str(e))
+
+
+class ExcelExportThread(QThread):
+    """
+    Exporte un instantané du tableau en .xlsx avec openpyxl en mode `write_only`.
+
+    Les lignes sont écrites au fil de l'eau (mémoire constante côté classeur), dans un fichier
+    temporaire renommé à la fin : une annulation ou une erreur ne laisse pas de fichier partiel.
+    """
+    progress = pyqtSignal(int)
+    finished_export = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, headers, rows):
+        super().__init__()
+        self.path = path
+        self.headers = headers
+        self.rows = rows
+
+    def typed_cells(self, sheet, values, date, cachet):
+        """Dates et cachets lisibles deviennent de vraies dates et nombres Excel."""
+        from openpyxl.cell import WriteOnlyCell
+        cells = list(values)
+        if date is not None:
+            value, stamp = date
+            if not pd.isna(stamp):
+                cell = WriteOnlyCell(sheet, value=pd.Timestamp(stamp).to_pydatetime())
+                cell.number_format = "DD/MM/YYYY"
+                cells[value] = cell
+        if cachet is not None:
+            value, amount = cachet
+            if not np.isnan(amount):
+                cells[value] = float(amount)
+        return cells
+
+    @timed_call("export_excel")
+    def run(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".~", suffix=".xlsx", dir=directory)
+        os.close(fd)
+        try:
+            from openpyxl import Workbook
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Réservations")
+            sheet.append([header or f"Colonne {col + 1}" for col, header in enumerate(self.headers)])
+
+            # 🧮 Conversion vectorisée des colonnes typées, une seule fois pour tout l'export
+            date_col = self.headers.index("Date") if "Date" in self.headers else None
+            cachet_col = self.headers.index("Cachet") if "Cachet" in self.headers else None
+            dates = parse_date_column([values[date_col] for values in self.rows]) if date_col is not None else None
+            cachets = parse_cachet_column([values[cachet_col] for values in self.rows]) if cachet_col is not None else None
+
+            total = max(len(self.rows), 1)
+            step = max(total // 100, 1)
+            for index, values in enumerate(self.rows):
+                if self.isInterruptionRequested():
+                    return
+                date = (date_col, dates[index]) if dates is not None else None
+                cachet = (cachet_col, cachets[index]) if cachets is not None else None
+                sheet.append(self.typed_cells(sheet, values, date, cachet))
+                if index % step == 0:
+                    self.progress.emit(int(index * 100 / total))
+
+            workbook.save(temp_path)
+            os.replace(temp_path, self.path)
+            self.progress.emit(100)
+            self.finished_export.emit(self.path)
+        except Exception as e:
+            log_io.exception("Erreur export Excel (%s)", self.path)
+            self.failed.emit(str(e))
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+
+class BookingItemDelegate(QStyledItemDelegate):
+    """
+    Délégué du tableau des lieux : Statut et Formule sont dessinés comme des listes déroulantes,
+    une Date vide comme un bouton « + ».
+
+    Aucun widget par ligne : un vrai QComboBox n'est créé que pour la cellule en cours
+    d'édition, et le « + » demande simplement le calendrier (`date_requested`).
+
+    Les couleurs de statut sont lues au dessin dans une palette calculée une fois : elles
+    remplacent BackgroundRole/ForegroundRole de toute la ligne sans rien écrire dans les
+    éléments, si bien qu'un tri ou un changement de statut ne recolore aucune cellule.
+    """
+    date_requested = pyqtSignal(int, int)
+
+    def __init__(self, schema, parent=None):
+        super().__init__(parent)
+        self.schema = schema
+        self.status_brushes = {
+            status: (QBrush(QColor(background)), QColor(foreground))
+            for status, (background, foreground) in STATUS_COLORS.items()
+        }
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        statut_col = self.schema.index("Statut")
+        if statut_col is None:
+            return
+        status = index.sibling(index.row(), statut_col).data(Qt.DisplayRole) or STATUS_CHOICES[0]
+        brushes = self.status_brushes.get(status)
+        if brushes:
+            option.backgroundBrush, foreground = brushes
+            option.palette.setColor(QPalette.Text, foreground)
+
+    def choices(self, index):
+        """Valeurs proposées pour la cellule, ou None si ce n'est pas une liste déroulante."""
+        if index.column() == self.schema.index("Statut"):
+            return STATUS_CHOICES
+        if index.column() == self.schema.index("Formule"):
+            return FORMULE_CHOICES
+        return None
+
+    def is_date_button(self, index):
+        return index.column() == self.schema.index("Date") and not index.data(Qt.DisplayRole)
+
+    def paint(self, painter, option, index):
+        if self.is_date_button(index):
+            hovered = option.state & QStyle.State_MouseOver
+            font = QFont(option.font)
+            font.setPixelSize(16)
+            font.setBold(True)
+            painter.save()
+            painter.fillRect(option.rect.adjusted(1, 1, -1, -1), QColor("#005a9e" if hovered else "#0078d7"))
+            painter.setFont(font)
+            painter.setPen(QColor("white"))
+            painter.drawText(option.rect, Qt.AlignCenter, "+")
+            painter.restore()
+            return
+
+        choices = self.choices(index)
+        if choices is None:
+            super().paint(painter, option, index)
+            return
+
+        # Fond de la cellule (sélection, couleur de ligne), puis le cadre et le texte de la liste
+        view_option = QStyleOptionViewItem(option)
+        self.initStyleOption(view_option, index)
+        view_option.text = ""
+        widget = view_option.widget
+        style = widget.style() if widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, view_option, painter, widget)
+
+        combo_option = QStyleOptionComboBox()
+        combo_option.rect = option.rect.adjusted(2, 2, -2, -2)
+        combo_option.state = option.state | QStyle.State_Enabled
+        combo_option.palette = option.palette
+        combo_option.fontMetrics = option.fontMetrics
+        combo_option.currentText = index.data(Qt.DisplayRole) or choices[0]
+        style.drawComplexControl(QStyle.CC_ComboBox, combo_option, painter, widget)
+        style.drawControl(QStyle.CE_ComboBoxLabel, combo_option, painter, widget)
+
+    def editorEvent(self, event, model, option, index):
+        """Un clic ouvre directement le calendrier ou la liste déroulante de la cellule."""
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and not event.modifiers()):
+            if self.is_date_button(index):
+                self.date_requested.emit(index.row(), index.column())
+                return True
+            view = self.parent()
+            if self.choices(index) is not None and isinstance(view, QAbstractItemView):
+                view.edit(index)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    def createEditor(self, parent, option, index):
+        choices = self.choices(index)
+        if choices is None:
+            return super().createEditor(parent, option, index)
+        editor = QComboBox(parent)
+        editor.addItems(choices)
+        editor.activated.connect(lambda _: self.commit_and_close(editor))
+        QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+    def setEditorData(self, editor, index):
+        if isinstance(editor, QComboBox):
+            editor.setCurrentText(index.data(Qt.DisplayRole) or self.choices(index)[0])
+        else:
+            super().setEditorData(editor, index)
+
+    def setModelData(self, editor, model, index):
+        if isinstance(editor, QComboBox):
+            model.setData(index, editor.currentText())
+        else:
+            super().setModelData(editor, model, index)
+
+
+class TableSchema:
+    """
+    Correspondance en-tête → index de colonne, calculée une fois puis gardée en cache.
+
+    Recalculée seulement quand les en-têtes changent (libellés, ajout ou suppression de
+    colonnes) : les recherches de colonne faites à chaque ligne ne parcourent plus les en-têtes.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.columns = None
+
+        model = table.model()
+        for signal in (model.columnsInserted, model.columnsRemoved, model.columnsMoved, model.modelReset):
+            signal.connect(self.invalidate)
+        model.headerDataChanged.connect(
+            lambda orientation, first, last: orientation == Qt.Horizontal and self.invalidate())
+
+    def invalidate(self, *args):
+        self.columns = None
+
+    def index(self, name):
+        """Index de la première colonne portant cet en-tête (casse et espaces ignorés), ou None."""
+        if self.columns is None:
+            self.columns = {}
+            for col in range(self.table.columnCount()):
+                header = self.table.horizontalHeaderItem(col)
+                if header:
+                    self.columns.setdefault(header.text().strip().lower(), col)
+        return self.columns.get(name.strip().lower())
+
+
 class SortHeaderView(QHeaderView):
-    """Permet le tri des colonnes avec prise en charge des QComboBox."""
+    """Permet le tri des colonnes (statut, cachet, date ou texte)."""
     def __init__(self, orientation, table, parent=None):
         super().__init__(orientation, parent)
         self.table = table
+        self.schema = TableSchema(table)  # 🏷️ Index des colonnes, partagé avec BookingApp
         self.setSectionsClickable(True)
         self.setHighlightSections(True)
         self.setDefaultAlignment(Qt.AlignCenter)
 
     def store_initial_order(self):
-        """Stocke l'ordre initial des lignes et vérifie la présence des QComboBox avant le tri."""
+        """Stocke l'ordre initial des lignes (statut, ligne) avant le tri."""
         self.stored_order = []
         statut_col = self.get_statut_column_index()
-
         if statut_col is None:
-            print("⚠️ Impossible de stocker l'ordre initial : colonne 'Statut' introuvable.")
             return
-
-        print("🔄 Stockage de l’ordre initial...")
-
         for row in range(self.table.rowCount()):
-            widget = self.table.cellWidget(row, statut_col)
-            item = self.table.item(row, statut_col)
-
-            if widget is None:
-                print(f"❌ Problème : `cellWidget()` retourne `None` pour la ligne {row}, colonne {statut_col} !")
-            elif isinstance(widget, QComboBox):
-                value = widget.currentText().strip()
-                print(f"✅ Ligne {row} : QComboBox détectée avec valeur '{value}'")
-            elif item and item.text():
-                value = item.text().strip()
-                print(f"⚠️ Ligne {row} : Texte trouvé au lieu d'une QComboBox -> '{value}'")
-            else:
-                value = "Nouveau"
-                print(f"❌ Ligne {row} : Aucune donnée détectée. Assignation par défaut : 'Nouveau'.")
+            self.stored_order.append((self.sort_value(row, statut_col) or "Nouveau", row))
 
-            self.stored_order.append((value, row))
+    def visual_order(self):
+        """Retourne les lignes logiques dans l'ordre où elles sont affichées."""
+        vertical = self.table.verticalHeader()
+        return [vertical.logicalIndex(visual) for visual in range(self.table.rowCount())]
 
-        print(f"📌 [BookingApp] Ordre initial stocké : {self.stored_order}")
+    def apply_row_order(self, row_order):
+        """
+        Affiche les lignes dans l'ordre demandé en déplaçant les sections de l'en-tête vertical.
 
-    def reorder_rows(self, row_order):
-        """Réorganise les lignes du tableau après un tri."""
+        Les lignes logiques et leurs QTableWidgetItem ne bougent pas : seule la
+        correspondance visuel → logique change, et seules les lignes mal placées sont déplacées.
+        La permutation se fait par échanges (swapSections, à coût constant) et non par
+        moveSection, qui décale toutes les sections intermédiaires : le tri reste linéaire.
+        """
         if not row_order:
-            print("⚠️ Aucune ligne à réordonner, annulation du tri.")
-            return  
-
-        self.table.setSortingEnabled(False)  
+            return
 
-        new_data = []
-        for row in row_order:
-            row_data = []
-            for col in range(self.table.columnCount()):
-                widget = self.table.cellWidget(row, col)
-                item = self.table.item(row, col)
+        vertical = self.table.verticalHeader()
+        # sectionMoved déclencherait une mise en page de la vue à chaque déplacement :
+        # on le coupe pendant la permutation puis on relance une seule mise en page.
+        self.table.setUpdatesEnabled(False)
+        vertical.blockSignals(True)
+        try:
+            # Les positions avant `visual` sont définitives : la ligne attendue est forcément plus loin
+            for visual, logical in enumerate(row_order):
+                current = vertical.visualIndex(logical)
+                if current != visual:
+                    vertical.swapSections(current, visual)
+        finally:
+            vertical.blockSignals(False)
+            self.table.setUpdatesEnabled(True)
+        self.table.doItemsLayout()
+        self.table.viewport().update()
+
+    def sort_value(self, row, column):
+        """Texte d'une cellule, sans espaces superflus."""
+        item = self.table.item(row, column)
+        return item.text().strip() if item else ""
+
+    def column_sort_key(self, column):
+        """Construit la clé de tri adaptée au contenu de la colonne (statut, cachet, date ou texte)."""
+        header = self.table.horizontalHeaderItem(column)
+        name = header.text().strip().lower() if header else ""
+
+        if column == self.get_statut_column_index():
+            statut_order = {
+                "Nouveau": 0, "Mail envoyé": 1, "Échange Tel.": 2,
+                "Full": 3, "Laisse tomber": 4, "Let's Go": 5
+            }
+            return lambda row: statut_order.get(self.sort_value(row, column) or "Nouveau", 99)
 
-                if isinstance(widget, QComboBox):
-                    row_data.append(("QComboBox", widget.currentText()))  
-                elif item:
-                    row_data.append(("QTableWidgetItem", item.text()))
-                else:
-                    row_data.append(("Empty", ""))
+        if name == "cachet":
+            def cachet_key(row):
+                try:
+                    return (0, float(self.sort_value(row, column).replace(",", ".").replace("€", "")))
+                except ValueError:
+                    return (1, 0.0)  # Valeurs non numériques en fin de liste
+            return cachet_key
 
-            new_data.append(row_data)
+        if name == "date":
+            def date_key(row):
+                parsed = parse_date_text(self.sort_value(row, column))
+                return (0, parsed) if parsed else (1, datetime.min)  # Dates vides ou illisibles en fin de liste
+            return date_key
 
-        self.table.setRowCount(0)  
-        for row_data in new_data:
-            row_index = self.table.rowCount()
-            self.table.insertRow(row_index)
-            for col, (cell_type, value) in enumerate(row_data):
-                if cell_type == "QComboBox":
-                    combobox = QComboBox()
-                    combobox.addItems(["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-                    combobox.setCurrentText(value)
-                    combobox.currentIndexChanged.connect(lambda _, r=row_index, c=col, cb=combobox: self.update_status_value(r, c, cb))
-                    self.table.setCellWidget(row_index, col, combobox)
-                elif cell_type == "QTableWidgetItem":
-                    self.table.setItem(row_index, col, QTableWidgetItem(value))
+        return lambda row: self.sort_value(row, column).lower()
 
-        QApplication.processEvents()  
-        self.table.setSortingEnabled(True) 
+    def sort_by(self, criteria):
+        """
+        Tri stable multi-critères, appliqué comme une permutation de l'affichage.
 
+        :param criteria: Liste de (colonne, ordre) du critère principal au critère secondaire.
+        """
+        row_order = self.visual_order()
+        # Tris stables successifs, du critère le moins important au plus important
+        for column, order in reversed(criteria):
+            key = self.column_sort_key(column)
+            keys = {row: key(row) for row in row_order}
+            row_order.sort(key=keys.__getitem__, reverse=(order == Qt.DescendingOrder))
+        self.apply_row_order(row_order)
 
     def get_statut_column_index(self):
-        """Retourne l'index de la colonne 'Statut' en déléguant à BookingApp si possible."""
-        parent_app = self.table.parent()
-        if parent_app and hasattr(parent_app, "get_statut_column_index"):
-            index = parent_app.get_statut_column_index()
-            print(f"    ✅ [SortHeaderView] Délégation : Colonne 'Statut' trouvée dans BookingApp : Index {index}")
-            return index
-        # Sinon, parcourir les colonnes de ce header
-        for i in range(self.table.columnCount()):
-            header = self.table.horizontalHeaderItem(i)
-            if header and header.text().strip().lower() == "statut":
-                print(f"    ✅ [SortHeaderView] Colonne 'Statut' trouvée localement : Index {i}")
-                return i
-        print("    ⚠️ [SortHeaderView] Colonne 'Statut' introuvable !")
-        return None
+        """Retourne l'index de la colonne 'Statut'."""
+        return self.schema.index("Statut")
 
     def mousePressEvent(self, event):
         idx = self.logicalIndexAt(event.pos())
@@ -624,82 +2633,36 @@ class SortHeaderView(QHeaderView):
         else:
             super().mousePressEvent(event)
 
+    @timed_call("sort")
     def sort_column(self, column, order):
-        """Trie la colonne 'Statut' après correction des erreurs et vérification des valeurs."""
-        statut_col = self.get_statut_column_index()
-        if statut_col is None:
-            print("⚠️ Impossible de trier : colonne 'Statut' introuvable.")
-            return
-
-        data = []
-        for row in range(self.table.rowCount()):
-            widget = self.table.cellWidget(row, statut_col)
-            if isinstance(widget, QComboBox):
-                value = widget.currentText().strip()  # Récupère la valeur actuelle
-            else:
-                value = "Nouveau"  # Valeur par défaut si problème
-
-            # Définir un ordre de tri personnalisé
-            statut_order = {
-                "Nouveau": 0, "Mail envoyé": 1, "Échange Tel.": 2,
-                "Full": 3, "Laisse tomber": 4, "Let's Go": 5
-            }
-            priority = statut_order.get(value, 99)
-            data.append((priority, row))
+        """
+        Trie une colonne sans reconstruire le tableau (le statut suit `statut_order`).
 
-        # Trier les lignes
-        sorted_rows = sorted(data, key=lambda x: x[0], reverse=(order == Qt.DescendingOrder))
-        row_order = [row for _, row in sorted_rows]
+        Le tri est stable : à valeur égale, l'ordre affiché (glisser-déposer compris) est conservé.
+        """
+        if column is None:
+            log_table.warning("⚠️ Impossible de trier : colonne introuvable.")
+            return
 
-        # Appliquer le nouvel ordre des lignes
-        self.reorder_rows(row_order)
+        self.sort_by([(column, order)])
+        self.setSortIndicator(column, order)
 
 
     def debug_column_index(self):
         """ Vérifie si la colonne 'Statut' a bien un index cohérent. """
         statut_col = self.get_statut_column_index()
-        print(f"🔍 Vérification colonne 'Statut' -> Index détecté : {statut_col}")
+        log_table.debug("🔍 Vérification colonne 'Statut' -> Index détecté : %s", statut_col)
         if statut_col is None:
-            print("❌ Aucune colonne 'Statut' trouvée. Vérifiez les noms des colonnes !")
+            log_table.warning("❌ Aucune colonne 'Statut' trouvée. Vérifiez les noms des colonnes !")
         else:
-            print(f"✅ Colonne 'Statut' trouvée : Index {statut_col}")
+            log_table.debug("✅ Colonne 'Statut' trouvée : Index %s", statut_col)
 
     def debug_stored_order(self):
         """ Vérifie l'ordre initial stocké avant tri. """
         if hasattr(self, "stored_order"):
-            print(f"📌 Ordre initial stocké : {self.stored_order}")
+            log_table.debug("📌 Ordre initial stocké : %s", self.stored_order)
         else:
-            print("⚠️ Aucun ordre initial stocké. Vérifiez 'store_initial_order()'.")
-
-    def check_statut_integrity(self):
-        """ Vérifie et corrige les cellules de la colonne 'Statut' en ajoutant des QComboBox si elles manquent. """
-        statut_col = self.get_statut_column_index()
-        if statut_col is None:
-            print("⚠️ Impossible de vérifier les QComboBox : colonne 'Statut' introuvable.")
-            return
-
-        print("🔍 Vérification de l’intégrité de la colonne 'Statut'...")
-
-        for row in range(self.table.rowCount()):
-            widget = self.table.cellWidget(row, statut_col)
-            item = self.table.item(row, statut_col)
-
-            if isinstance(widget, QComboBox):
-                print(f"✅ Ligne {row} : QComboBox détectée avec valeur '{widget.currentText()}'")
-            else:
-                print(f"❌ Ligne {row} : Aucune QComboBox détectée ! Forçage de l'ajout...")
-                self.force_combobox(row, statut_col, "Nouveau")
-
-        self.table.update()  # 🔄 Forçage du rafraîchissement
-
-    def force_combobox(self, row, col, value):
-        """ Remplace une cellule texte par une QComboBox contenant les valeurs de statut. """
-        combobox = QComboBox()
-        combobox.addItems(["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-        combobox.setCurrentText(value)
-        combobox.currentIndexChanged.connect(lambda _, r=row, c=col, cb=combobox: self.update_status_value(r, c, cb))
-        self.table.setCellWidget(row, col, combobox)
-        print(f"🛠️ QComboBox forcée en ligne {row}, colonne {col}, valeur '{value}'.")
+            log_table.debug("⚠️ Aucun ordre initial stocké. Vérifiez 'store_initial_order()'.")
 
     def mouseDoubleClickEvent(self, event):
         idx = self.logicalIndexAt(event.pos())
@@ -727,54 +2690,54 @@ class DraggableTableWidget(QTableWidget):
         self.setAcceptDrops(True)
         self.viewport().setAcceptDrops(True)
         self.setDropIndicatorShown(True)
+        # Cellule en cours d'édition → valeur avant l'ouverture de l'éditeur. L'index persistant
+        # suit la cellule si des lignes sont insérées ou supprimées pendant l'édition.
+        self.edit_origins = {}
+
+    def edit(self, index, *args):
+        """Mémorise la valeur d'une cellule quand son éditeur s'ouvre (pour l'historique annuler)."""
+        item = self.item(index.row(), index.column()) if index.isValid() else None
+        before = item.text() if item else ""
+        started = super().edit(index, *args)
+        if index.isValid() and self.state() == QAbstractItemView.EditingState:
+            self.edit_origins[QPersistentModelIndex(index)] = before
+        return started
+
+    def closeEditor(self, editor, hint):
+        """
+        Éditeur fermé : une validation a déjà été traitée (commitData précède la fermeture),
+        une annulation (Échap, valeur inchangée) ne doit pas laisser de valeur d'origine périmée.
+        """
+        super().closeEditor(editor, hint)
+        self.edit_origins.clear()
 
-    def dropEvent(self, event):
-        """Gère le glisser-déposer des lignes tout en conservant les QComboBox."""
-        selected_rows = sorted(set(index.row() for index in self.selectedIndexes()))
-        target_index = self.indexAt(event.pos())
-        target_row = target_index.row() if target_index.isValid() else self.rowCount()
+    def take_edit_origin(self, row, col):
+        """Retire et retourne la valeur d'origine de la cellule en cours d'édition (None si aucune)."""
+        return self.edit_origins.pop(QPersistentModelIndex(self.model().index(row, col)), None)
 
-        if not selected_rows:
+    def dropEvent(self, event):
+        """Déplace les lignes glissées dans l'affichage, sans recréer de cellules."""
+        header_view = self.horizontalHeader()
+        vertical = self.verticalHeader()
+        selected_rows = sorted(set(index.row() for index in self.selectedIndexes()), key=vertical.visualIndex)
+        if not selected_rows or not isinstance(header_view, SortHeaderView):
             return
 
-        # ✅ Stocker les données des cellules, y compris les QComboBox
-        rows_data = []
-        for row in selected_rows:
-            row_data = []
-            for col in range(self.columnCount()):
-                widget = self.cellWidget(row, col)
-                item = self.item(row, col)
-
-                if isinstance(widget, QComboBox):
-                    row_data.append(("QComboBox", widget.currentText()))
-                elif item:
-                    row_data.append(("QTableWidgetItem", item.text()))
-                else:
-                    row_data.append(("Empty", ""))
-
-            rows_data.append(row_data)
-
-        # ✅ Supprimer les lignes sélectionnées
-        for row in reversed(selected_rows):
-            self.removeRow(row)
-
-        # ✅ Réinsérer les lignes déplacées avec les bonnes valeurs
-        for i, row_data in enumerate(rows_data):
-            self.insertRow(target_row + i)
-            for col, (cell_type, value) in enumerate(row_data):
-                if cell_type == "QComboBox":
-                    combobox = QComboBox()
-                    combobox.addItems(["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-                    combobox.setCurrentText(value)
-                    combobox.currentIndexChanged.connect(lambda _, r=target_row + i, c=col, cb=combobox: self.parent().update_status_value(r, c, cb))
-                    self.setCellWidget(target_row + i, col, combobox)
-                elif cell_type == "QTableWidgetItem":
-                    self.setItem(target_row + i, col, QTableWidgetItem(value))
+        target_index = self.indexAt(event.pos())
+        target_visual = vertical.visualIndex(target_index.row()) if target_index.isValid() else self.rowCount()
 
+        # ✅ Nouvel ordre d'affichage : les lignes déplacées sont insérées avant la ligne cible
+        order = header_view.visual_order()
+        moved = set(selected_rows)
+        insert_at = sum(1 for row in order[:target_visual] if row not in moved)
+        remaining = [row for row in order if row not in moved]
+        header_view.apply_row_order(remaining[:insert_at] + selected_rows + remaining[insert_at:])
+
+        # CopyAction : empêche Qt de supprimer les lignes « source » après le dépôt
+        event.setDropAction(Qt.CopyAction)
         event.accept()
 
-        # ✅ Forcer un tri après le glisser-déposer
-        header_view = self.parent().header_view  # 📌 Récupérer `SortHeaderView`
+        # ✅ Forcer un tri après le glisser-déposer (stable : l'ordre choisi est conservé à statut égal)
         statut_col = header_view.get_statut_column_index()
         if statut_col is not None:
             header_view.sort_column(statut_col, Qt.AscendingOrder)
@@ -784,10 +2747,13 @@ class BookingApp(QMainWindow):
     def __init__(self):
         super().__init__()  # ✅ Appel du constructeur parent
         self.current_file = None
-        self.undo_stack = []
-        self.redo_stack = []
-        self.last_values = {}
-        self.row_colors = {}  # ✅ Correction pour éviter AttributeError
+        self.history = UndoStack(
+            max_depth=config.get("undo_max_depth", 500),
+            max_bytes=config.get("undo_max_kb", 4096) * 1024,
+            merge_window=config.get("undo_merge_seconds", 1.0),
+        )
+        self.undo_redo_in_progress = False
+        self.status_sort_pending = False
 
         # 📊 Initialisation du tableau
         self.table = QTableWidget(self)
@@ -802,19 +2768,33 @@ class BookingApp(QMainWindow):
         self.table.horizontalHeader().setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.horizontalHeader().customContextMenuRequested.connect(self.show_header_menu)
 
-        # 📅 Configuration des colonnes dynamiques
-        self.setup_date_column()
-        self.setup_status_column()
-        self.setup_formule_column()  # ✅ Ajout du menu déroulant pour "Formule"
-
         # 🔄 Ajustement automatique des colonnes
         self.adjust_columns()
 
-        # 🗺️ Initialisation de la carte et du gestionnaire de marqueurs
+        # 🔬 Taille du tableau jointe aux profils d'opérations
+        profiler.context = self.profile_context
+
+        # 🚗 Calcul d'itinéraire en arrière-plan
+        self.route_worker = None
+        self.retired_route_workers = set()
+        self.route_markers = []  # Marqueurs des étapes de l'itinéraire en cours
+        self.route_points = []
+        self.route_legs = []
+        self.itinerary_refresh_timer = QTimer(self)
+        self.itinerary_refresh_timer.setSingleShot(True)
+        self.itinerary_refresh_timer.setInterval(100)
+        self.itinerary_refresh_timer.timeout.connect(self.refresh_itinerary_details)
+
+        # 🧱 Cache local des tuiles servi à QtWebEngine via le schéma tiles:// (proxy installé avec la carte)
+        self.tile_cache = TileCache()
+        self.tile_handler = None
+        self.tile_prefetch_thread = None
+
+        # 🗺️ Carte, gestionnaire de marqueurs et géocodeur créés au premier usage (voir ensure_map)
         self.map = None
-        self.map_view = QWebEngineView()
-        self.map_manager = MapManager(self.map_view, parent=self)  # ✅ Passage correct du parent
-        self.map_manager.parent = self
+        self.map_view = None
+        self.map_manager = None
+        self.geocoder = None
         self.marker_cluster = None
 
         # 📌 Initialisation des fonctionnalités principales
@@ -840,9 +2820,6 @@ class BookingApp(QMainWindow):
         # 🔠 Chargement de la police personnalisée (si disponible)
         self.load_custom_font()
 
-        # 🌍 Initialisation du géocodeur avec un timeout pour éviter les blocages
-        self.geocoder = Nominatim(user_agent="booking_app", timeout=5)
-
         # 🛠️ Création de la barre d'outils et des raccourcis clavier pour une meilleure ergonomie
         self.create_toolbar()
         self.create_tabs()
@@ -854,67 +2831,74 @@ class BookingApp(QMainWindow):
         # 📸 Chargement du logo de l'application (fonctionnalité à compléter)
         self.load_logo()
 
-    def populate_table(self):
-        """Remplit le tableau avec des QComboBox et QTableWidgetItem."""
-        for row in range(self.table.rowCount()):
-            combo_box = QComboBox()
-            combo_box.addItems(["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-            self.table.setCellWidget(row, 4, combo_box)
-            print(f"✅ QComboBox ajoutée à la ligne {row}, colonne 4")
+        # ♻️ Récupération d'une session interrompue (journal des éditions) ; le tableau de départ n'a rien à enregistrer
+        self.mark_saved()
+        QTimer.singleShot(0, self.recover_unsaved_work)
 
-            item = QTableWidgetItem("Exemple")
-            self.table.setItem(row, 3, item)
-            print(f"✅ QTableWidgetItem ajouté à la ligne {row}, colonne 3")
+        # ⏱️ Rapport de démarrage une fois la boucle d'événements lancée (tableau interactif)
+        startup_mark("fenêtre")
+        QTimer.singleShot(0, self.report_startup)
 
-    def trigger_sort(self):
-        """Forcer le tri sur la colonne 'Statut' après modification d'un QComboBox."""
-        statut_col = self.get_statut_column_index()
-        if statut_col is not None:
-            self.header_view.sort_column(statut_col, Qt.AscendingOrder)  # Relance le tri immédiatement
+    def report_startup(self):
+        startup_mark("tableau interactif")
+        log_perf.info("⏱️ Démarrage : %s", startup_report())
+        self.statusBar().showMessage(f"Prêt en {STARTUP_TIMINGS[-1][1] / 1000:.2f} s", 5000)
 
-    def verify_table_integrity(self):
-        """Vérifie que chaque cellule a bien son QComboBox ou QTableWidgetItem."""
-        for row in range(self.table.rowCount()):
-            widget = self.table.cellWidget(row, 4)
-            item = self.table.item(row, 3)
+    def ensure_geocoder(self):
+        """Géocodeur Nominatim avec un timeout pour éviter les blocages (geopy importé au premier géocodage)."""
+        if self.geocoder is None:
+            self.geocoder = create_geocoder()
+        return self.geocoder
 
-            if isinstance(widget, QComboBox):
-                print(f"🔍 Ligne {row}, colonne 4 : QComboBox détectée ✅")
-            else:
-                print(f"⚠️ Ligne {row}, colonne 4 : QComboBox manquante ❌")
-
-            if isinstance(item, QTableWidgetItem):
-                print(f"🔍 Ligne {row}, colonne 3 : QTableWidgetItem détecté ✅")
-            else:
-                print(f"⚠️ Ligne {row}, colonne 3 : QTableWidgetItem manquant ❌")
-
-    def add_combobox_to_cell(self, row, col, value="Nouveau"):
-        """Ajoute un QComboBox dans une cellule et met à jour le tri après modification."""
-        combobox = QComboBox()
-        combobox.addItems(["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-        combobox.setCurrentText(value)
-        
-        # Détecte quand la valeur change et relance le tri
-        combobox.currentIndexChanged.connect(lambda: self.trigger_sort())
+    def ensure_map(self):
+        """
+        Crée la pile cartographique au premier affichage de l'onglet Carte ou à la première action
+        qui en a besoin : proxy tiles://, vue QtWebEngine et MapManager (donc folium).
 
-        self.table.setCellWidget(row, col, combobox)
+        Les méthodes qui utilisent map_view / map_manager l'appellent d'abord : ce sont de simples
+        attributs (None tant que la carte n'existe pas), une erreur levée ici n'est donc pas
+        déguisée en attribut manquant comme elle le serait derrière une propriété.
+        """
+        if self.map_manager is not None:
+            return
+        started = time.perf_counter()
+        if self.tile_handler is None:
+            self.tile_handler = TileSchemeHandler(self.tile_cache, self)
+            QWebEngineProfile.defaultProfile().installUrlSchemeHandler(TILE_SCHEME, self.tile_handler)
+        self.map_view = QWebEngineView()
+        self.map_manager = MapManager(self.map_view, parent=self)
+
+        # Remplace l'emplacement réservé de l'onglet Carte s'il est déjà construit
+        placeholder = getattr(self, "map_placeholder", None)
+        if placeholder is not None:
+            self.map_view.setMinimumWidth(self.width() * 3 // 4)  # 3/4 de la largeur de la fenêtre
+            self.map_splitter.replaceWidget(self.map_splitter.indexOf(placeholder), self.map_view)
+            placeholder.deleteLater()
+            self.map_placeholder = None
+        log_map.info("🗺️ Carte initialisée en %.0f ms", (time.perf_counter() - started) * 1000)
+        self.initialize_map()
 
+    def trigger_sort(self):
+        """Forcer le tri sur la colonne 'Statut' après modification d'un statut."""
+        statut_col = self.get_statut_column_index()
+        if statut_col is not None:
+            self.header_view.sort_column(statut_col, Qt.AscendingOrder)  # Relance le tri immédiatement
 
     def debug_column_index(self):
         """ Vérifie si la colonne 'Statut' a bien un index cohérent. """
         statut_col = self.get_statut_column_index()
-        print(f"🔍 Vérification colonne 'Statut' -> Index détecté : {statut_col}")
+        log_table.debug("🔍 Vérification colonne 'Statut' -> Index détecté : %s", statut_col)
         if statut_col is None:
-            print("❌ Aucune colonne 'Statut' trouvée. Vérifiez les noms des colonnes !")
+            log_table.warning("❌ Aucune colonne 'Statut' trouvée. Vérifiez les noms des colonnes !")
         else:
-            print(f"✅ Colonne 'Statut' trouvée : Index {statut_col}")
+            log_table.debug("✅ Colonne 'Statut' trouvée : Index %s", statut_col)
 
     def debug_stored_order(self):
         """ Vérifie l'ordre initial stocké avant tri. """
         if hasattr(self, "stored_order"):
-            print(f"📌 Ordre initial stocké : {self.stored_order}")
+            log_table.debug("📌 Ordre initial stocké : %s", self.stored_order)
         else:
-            print("⚠️ Aucun ordre initial stocké. Vérifiez 'store_initial_order()'.")
+            log_table.debug("⚠️ Aucun ordre initial stocké. Vérifiez 'store_initial_order()'.")
 
     def setupUI(self):
         """
@@ -1006,12 +2990,10 @@ class BookingApp(QMainWindow):
 
     def copy_selection(self):
         """Copie la sélection dans le presse-papiers."""
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        rows = self.get_selected_rows()
+        if not rows:
             return
-        data = "\n".join("\t".join(self.table.item(row, col).text() if self.table.item(row, col) else ""
-                                   for col in range(self.table.columnCount()))
-                         for row in sorted(set(index.row() for index in self.table.selectedIndexes())))
+        data = "\n".join("\t".join(values) for values in self.column_store.rows(rows))
         clipboard = QApplication.clipboard()
         clipboard.setText(data)
 
@@ -1019,28 +3001,207 @@ class BookingApp(QMainWindow):
         """Colle les données du presse-papiers dans le tableau."""
         clipboard = QApplication.clipboard().text()
         rows = clipboard.split("\n")
+        if rows and not rows[-1]:
+            rows.pop()  # Saut de ligne final ajouté par les tableurs
         start_row = self.table.currentRow()
         start_col = self.table.currentColumn()
+
+        # 📋 Un collage = une seule entrée d'historique, limitée aux cellules modifiées
+        commands = []
         for i, row_data in enumerate(rows):
             cols = row_data.split("\t")
             for j, cell_data in enumerate(cols):
-                item = QTableWidgetItem(cell_data)
-                self.table.setItem(start_row + i, start_col + j, item)
+                row, col = start_row + i, start_col + j
+                if row >= self.table.rowCount() or col >= self.table.columnCount():
+                    continue
+                old_value = self.column_store.cell_text(row, col)
+                if old_value != cell_data:
+                    commands.append(CellEditCommand(row, col, old_value, cell_data))
+
+        with self.applying_changes():
+            for command in commands:
+                command.redo(self)
+        if commands:
+            self.record(CompositeCommand(commands))
 
 
     def setup_autosave(self):
-        """Configure un auto-save toutes les 10 minutes."""
+        """Configure la sauvegarde automatique (toutes les 10 minutes par défaut)."""
+        self.revision = 0  # Incrémenté à chaque modification du contenu du tableau
+        self.saved_revision = 0
+        self.saved_digest = None
+        self.autosave_thread = None
+        self.autosave_checkpoint = None
+
+        # 📓 Journal des éditions entre deux sauvegardes (fsync groupés)
+        self.journal = None
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setSingleShot(True)
+        self.journal_timer.setInterval(config.get("journal_sync_ms", 1000))
+        self.journal_timer.timeout.connect(lambda: self.journal and self.journal.sync())
+
         self.autosave_timer = QTimer(self)
         self.autosave_timer.timeout.connect(self.auto_save)
-        self.autosave_timer.start(600000)  # 10 minutes = 600000 ms
+        self.autosave_timer.start(config.get("autosave_interval_s", 600) * 1000)
+
+    def bump_revision(self, *args):
+        """Note une modification du tableau (la prochaine sauvegarde automatique aura lieu)."""
+        self.revision = getattr(self, "revision", 0) + 1
+
+    def on_table_data_changed(self, top_left, bottom_right, roles=()):
+        """Seuls les changements de texte comptent : les couleurs de statut ne modifient pas le fichier."""
+        if not roles or Qt.DisplayRole in roles or Qt.EditRole in roles:
+            self.bump_revision()
+
+    def mark_saved(self, digest=None):
+        """Le fichier sur disque correspond à l'état actuel du tableau."""
+        self.saved_revision = self.revision
+        self.saved_digest = digest
+
+    def table_snapshot(self):
+        """
+        Instantané (en-têtes, lignes dans l'ordre affiché) pris sur `column_store`.
+
+        Les valeurs sont des chaînes immuables : l'instantané ne copie que des références,
+        et reste cohérent pendant que l'utilisateur continue d'éditer.
+        """
+        self.column_store.refresh()
+        values = self.column_store.frame.to_numpy(dtype=object)
+        order = self.visual_rows()
+        rows = values[order].tolist() if order else []
+        return list(self.column_store.headers), rows, order
 
     def auto_save(self):
-        """Sauvegarde automatique du fichier en cours."""
-        if self.current_file:
-            self.save_file()
-            logging.info("💾 Sauvegarde automatique effectuée.")
+        """Sauvegarde automatique du fichier en cours, écrite en arrière-plan et de façon atomique."""
+        if not self.current_file:
+            log_io.warning("⚠️ Aucun fichier ouvert, auto-save ignoré.")
+            return
+        if self.revision == self.saved_revision:
+            return  # Rien n'a changé depuis la dernière sauvegarde
+        if self.autosave_thread is not None and self.autosave_thread.isRunning():
+            return  # L'écriture précédente n'est pas terminée : on réessaiera au prochain tick
+
+        headers, rows, order = self.table_snapshot()
+        # Ce que le fichier contiendra : le journal pourra être raccourci jusqu'ici une fois l'écriture finie
+        self.autosave_checkpoint = (self.current_file, self.journal.offset() if self.journal else 0, headers, order)
+        self.autosave_thread = AutosaveThread(self.current_file, headers, rows, self.revision, self.saved_digest,
+                                              state=self.project_state())
+        self.autosave_thread.saved.connect(self.on_autosave_done)
+        self.autosave_thread.failed.connect(
+            lambda message: self.statusBar().showMessage(f"⚠️ Sauvegarde automatique impossible : {message}", 8000))
+        self.autosave_thread.start()
+
+    def on_autosave_done(self, revision, digest, written):
+        """Enregistre la révision sauvegardée (le tableau a pu changer pendant l'écriture)."""
+        self.saved_revision = revision
+        self.saved_digest = digest
+
+        path, offset, headers, order = self.autosave_checkpoint
+        if self.journal is not None and path == self.current_file:
+            self.journal.checkpoint(offset, path, headers, order)
+
+        if written:
+            log_io.info("💾 Sauvegarde automatique effectuée.")
+            self.statusBar().showMessage("💾 Sauvegarde automatique effectuée.", 3000)
+
+    def start_journal(self):
+        """Démarre le journal du fichier courant, avec le contenu actuel du tableau pour base."""
+        if self.journal is not None:
+            self.journal.close(discard=True)
+        headers, _, order = self.table_snapshot()
+        self.journal = EditJournal(EditJournal.path_for(self.current_file))
+        try:
+            self.journal.start(self.current_file, headers, order)
+            os.makedirs(os.path.dirname(RECOVERY_FILE), exist_ok=True)
+            with open(RECOVERY_FILE, "w", encoding="utf-8") as f:
+                json.dump({"journal": self.journal.path}, f)
+        except OSError as e:
+            log_io.error("Journal des éditions indisponible (%s) : %s", self.journal.path, e)
+            self.journal = None
+
+    def journal_command(self, command, forward=True):
+        """Ajoute au journal les opérations d'une commande (ou de son annulation)."""
+        if self.journal is None:
+            return
+        self.journal.append(command.journal_records(forward))
+        if not self.journal_timer.isActive():
+            self.journal_timer.start()
+
+    def close_journal(self):
+        """Fermeture propre : le journal ne sert plus qu'après un arrêt brutal."""
+        if self.journal is not None:
+            self.journal.close(discard=True)
+            self.journal = None
+        if os.path.exists(RECOVERY_FILE):
+            os.remove(RECOVERY_FILE)
+
+    def recover_unsaved_work(self):
+        """Au démarrage, propose de rejouer le journal laissé par une session interrompue."""
+        try:
+            with open(RECOVERY_FILE, "r", encoding="utf-8") as f:
+                journal_path = json.load(f).get("journal")
+            base, operations = EditJournal.read(journal_path)
+        except (OSError, ValueError, TypeError):
+            return
+
+        if base is None or not operations:
+            EditJournal(journal_path).close(discard=True)
+            os.remove(RECOVERY_FILE)
+            return
+
+        reply = QMessageBox.question(
+            self, "Récupération",
+            f"{len(operations)} modification(s) non enregistrée(s) de « {os.path.basename(base['base'])} » "
+            f"ont été retrouvées.\nVoulez-vous les récupérer ?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            EditJournal(journal_path).close(discard=True)
+            os.remove(RECOVERY_FILE)
+            return
+
+        try:
+            self.replay_journal(base, operations)
+        except Exception as e:
+            log_io.exception("Échec de la récupération du journal %s", journal_path)
+            QMessageBox.critical(self, "Erreur", f"Impossible de récupérer les modifications : {e}")
+            return
+
+        self.journal = EditJournal(journal_path)
+        self.journal.resume()
+        self.statusBar().showMessage(f"♻️ {len(operations)} modification(s) récupérée(s).", 8000)
+
+    def replay_journal(self, base, operations):
+        """Recharge le fichier de base dans l'ordre logique de la session, puis rejoue les opérations."""
+        state = None
+        if base["base"].lower().endswith(PROJECT_EXTENSION):
+            headers, rows, state = read_project(base["base"])
         else:
-            logging.warning("⚠️ Aucun fichier ouvert, auto-save ignoré.")
+            headers, rows = read_table_file(base["base"], base.get("headers"))
+        order = base.get("order") or range(len(rows))
+        logical_rows = [None] * len(rows)
+        for file_row, logical_row in enumerate(order):
+            logical_rows[logical_row] = rows[file_row]
+
+        with self.applying_changes():
+            self.load_rows(headers, logical_rows)
+            self.table.setUpdatesEnabled(False)
+            try:
+                for operation in operations:
+                    if operation[0] == "c":
+                        _, row, col, value = operation
+                        self.write_cell(row, col, value)
+                    elif operation[0] == "i":
+                        self.insert_rows([(operation[1], operation[2])])
+                    elif operation[0] == "d":
+                        self.remove_rows(operation[1])
+            finally:
+                self.table.setUpdatesEnabled(True)
+
+        if state:
+            self.restore_project_state(state)
+        self.current_file = base["base"]
+        self.saved_revision = -1  # Les modifications récupérées restent à sauvegarder
 
     def filter_invalid_fonts(self):
         """Ignore toutes les polices commençant par 'FONTSPRING DEMO'."""
@@ -1052,7 +3213,7 @@ class BookingApp(QMainWindow):
             if os.path.exists(font_path):
                 font_id = database.addApplicationFont(font_path)  # Charger depuis un fichier
                 if font_id == -1:
-                    print(f"⚠️ Échec de chargement de la police {font_path}")
+                    log_ui.warning("⚠️ Échec de chargement de la police %s", font_path)
                 else:
                     database.removeApplicationFont(font_id)  # Supprimer si non utilisée
 
@@ -1081,18 +3242,7 @@ class BookingApp(QMainWindow):
             self.loading_overlay.hide()
             self.loading_overlay.deleteLater()
 
-    def filter_table(self):
-        """Filtre les lignes du tableau en fonction du texte saisi."""
-        search_text = self.search_bar.text().lower()
-        for row in range(self.table.rowCount()):
-            row_match = False
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and search_text in item.text().lower():
-                    row_match = True
-                    break
-            self.table.setRowHidden(row, not row_match)
-
+    @timed_call("import")
     def load_excel_into_table(self, df):
         """Charge un DataFrame Excel dans le QTableWidget et place les colonnes fixes à droite après import."""
 
@@ -1138,18 +3288,13 @@ class BookingApp(QMainWindow):
                 # ✅ Ajouter les colonnes fixes **à droite**
                 fixed_col_index = len(imported_columns)
 
-                # ✅ Ajouter le bouton "+" pour ouvrir le calendrier dans la colonne "Date"
-                self.add_date_button(row_index)
-
-                # ✅ Ajouter la liste déroulante pour "Statut"
-                self.add_status_combobox(row_index)
-
                 # ✅ Insérer la valeur de "Cachet"
                 cachet_item = QTableWidgetItem(str(row.get("Cachet", "")))
                 self.table.setItem(row_index, fixed_col_index + 2, cachet_item)
 
-                # ✅ Ajouter la liste déroulante pour "Formule"
-                self.add_formule_combobox(row_index)
+                # ✅ Statut et Formule par défaut (le délégué les affiche en listes déroulantes,
+                # la Date vide en bouton "+")
+                self.set_default_cells(row_index)
 
         finally:
             self.table.setUpdatesEnabled(True)  # ✅ Réactiver les mises à jour après l'import
@@ -1158,7 +3303,7 @@ class BookingApp(QMainWindow):
         self.adjust_column_sizes()
 
         # ✅ Vérification finale des données insérées
-        print("✅ Données insérées dans le tableau PyQt")
+        log_table.debug("✅ Données insérées dans le tableau PyQt")
         for row in range(self.table.rowCount()):
             for col in range(self.table.columnCount()):
                 item = self.table.item(row, col)
@@ -1195,32 +3340,55 @@ class BookingApp(QMainWindow):
 
     def get_statut_column_index(self):
         """Retourne l'index de la colonne 'Statut'."""
-        for col in range(self.table.columnCount()):
-            header = self.table.horizontalHeaderItem(col)
-            if header:
-                print(f"🔎 [BookingApp] Colonne {col} → {header.text().strip()}")  # ✅ Vérification
-            if header and header.text().strip() == "Statut":
-                print(f"✅ [BookingApp] Colonne 'Statut' trouvée : Index {col}")
-                return col
-        print("⚠️ [BookingApp] Colonne 'Statut' introuvable !")
-        return None
+        return self.header_view.schema.index("Statut")
+
+    def get_cachet_column_index(self):
+        """Retourne l'index de la colonne 'Cachet'."""
+        return self.header_view.schema.index("Cachet")
 
 
     def send_selected_contacts_to_map(self):
         """Récupère les contacts sélectionnés et les envoie à MapManager."""
-        print("✅ Fonction send_selected_contacts_to_map appelée")  # ✅ Debug
+        log_map.debug("✅ Fonction send_selected_contacts_to_map appelée")
         selected_contacts = []
 
-        for row in sorted(set(index.row() for index in self.table.selectedIndexes())):
+        columns = self.table.columnCount()
+        for values in self.column_store.rows(self.get_selected_rows()):
             selected_contacts.append({
-                "contact": self.table.item(row, 0).text() if self.table.item(row, 0) else "Inconnu",
-                "address": self.table.item(row, 1).text() if self.table.item(row, 1) else "Adresse inconnue",
-                "status": self.table.item(row, 2).text() if self.table.item(row, 2) else "Statut inconnu"
+                "contact": (values[0] if columns > 0 else "") or "Inconnu",
+                "address": (values[1] if columns > 1 else "") or "Adresse inconnue",
+                "status": (values[2] if columns > 2 else "") or "Statut inconnu"
             })
 
-        print(f"📌 Contacts sélectionnés : {selected_contacts}")  # ✅ Debug
+        log_map.debug("📌 Contacts sélectionnés : %s", selected_contacts)
+        self.ensure_map()
         self.map_manager.send_selected_contacts_to_map(selected_contacts)  # ✅ Correction ici
 
+    def plot_all_venues(self):
+        """Affiche toute la base de prospects sur la carte en mode grand volume (coordonnées déjà en cache)."""
+        headers = self.get_column_headers()
+        venues = []
+        missing = 0
+
+        for row in range(self.table.rowCount()):
+            row_data = {header: self.get_cell_text(row, col) for col, header in enumerate(headers)}
+            status = row_data.get("Statut", "")
+
+            # Pas d'appel réseau ici : des milliers de requêtes Nominatim gèleraient l'interface
+            location = next((geocode_cache[q] for q in self.build_search_query(row_data) if q in geocode_cache), None)
+            if not location:
+                missing += 1
+                continue
+
+            name = self.detect_address_columns(row_data)["name"] or f"Ligne {row + 1}"
+            venues.append({"contact": name, "status": status, "lat": location["lat"], "lon": location["lon"]})
+
+        self.ensure_map()
+        self.map_manager.show_high_volume(venues)
+        self.tabs.setCurrentWidget(self.map_tab)
+        if missing:
+            self.statusBar().showMessage(f"🌍 {len(venues)} lieux affichés, {missing} sans coordonnées en cache.", 8000)
+
     def save_action(self):
         """
         Exemple de fonction exécutée lors du clic sur "Enregistrer les modifications".
@@ -1251,6 +3419,7 @@ class BookingApp(QMainWindow):
         """
         toolbar = QToolBar("Outils", self)
         self.addToolBar(Qt.TopToolBarArea, toolbar)
+        self.toolbar = toolbar
 
         # Ajout d'une action pour ouvrir un fichier
         open_action = QAction(QIcon("assets/open.png"), "Ouvrir", self)
@@ -1294,10 +3463,94 @@ class BookingApp(QMainWindow):
         export_action.setMenu(export_menu)
         toolbar.addAction(export_action)
 
+        # ⏱️ Panneau développeur : durées mesurées par opération
+        perf_action = QAction("Performances", self)
+        perf_action.setShortcut("Ctrl+Shift+P")
+        perf_action.triggered.connect(self.show_perf_panel)
+        toolbar.addAction(perf_action)
+
+        # 🔬 Profilage des prochaines opérations (profils écrits sous logs/profiles)
+        profile_action = QAction("Profiler", self)
+        profile_action.triggered.connect(self.toggle_profiling)
+        toolbar.addAction(profile_action)
+
+        # 🔎 Filtres statut / formule et filtres avancés
+        self.setup_filters()
+
+
+    def show_perf_panel(self):
+        """Panneau non modal des durées par opération (p50/p95), rafraîchi chaque seconde."""
+        if getattr(self, "perf_dialog", None) is not None:
+            self.perf_dialog.show()
+            self.perf_dialog.raise_()
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Performances")
+        dialog.resize(620, 360)
+        layout = QVBoxLayout(dialog)
+
+        table = QTableWidget(0, 6)
+        table.setHorizontalHeaderLabels(["Opération", "Appels", "p50 (ms)", "p95 (ms)", "Max (ms)", "Total (s)"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(table)
+
+        def refresh():
+            summary = perf_stats.summary()
+            table.setRowCount(len(summary))
+            for row, (name, stats) in enumerate(summary.items()):
+                values = (name, str(stats["count"]), f"{stats['p50']:.1f}", f"{stats['p95']:.1f}",
+                          f"{stats['max']:.1f}", f"{stats['total_ms'] / 1000:.2f}")
+                for col, value in enumerate(values):
+                    table.setItem(row, col, QTableWidgetItem(value))
+
+        def export_json():
+            file_path, _ = QFileDialog.getSaveFileName(
+                dialog, "Exporter les mesures", f"perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                "Fichiers JSON (*.json)")
+            if file_path:
+                write_file_atomic(file_path, perf_stats.to_json().encode("utf-8"))
+
+        def reset():
+            perf_stats.reset()
+            refresh()
+
+        buttons = QHBoxLayout()
+        for label, slot in (("Exporter JSON", export_json), ("Réinitialiser", reset)):
+            button = QPushButton(label)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        timer = QTimer(dialog)
+        timer.setInterval(1000)
+        timer.timeout.connect(lambda: dialog.isVisible() and refresh())
+        timer.start()
+
+        refresh()
+        self.perf_dialog = dialog
+        dialog.show()
+
+    def toggle_profiling(self):
+        """Arme le profilage des N prochaines opérations, ou l'arrête s'il est déjà armé."""
+        if profiler.remaining > 0:
+            profiler.disarm()
+            self.statusBar().showMessage("🔬 Profilage arrêté", 5000)
+            return
+        count, ok = QInputDialog.getInt(self, "Profiler", "Nombre d'opérations à profiler :", 5, 1, 100)
+        if ok:
+            profiler.arm(count)
+            self.statusBar().showMessage(f"🔬 Profilage des {count} prochaines opérations → {PROFILE_DIR}", 5000)
+
+    def profile_context(self):
+        """Informations jointes à chaque profil : taille du tableau et fichier ouvert."""
+        return {"rows": self.table.rowCount(), "columns": self.table.columnCount(), "file": self.current_file}
 
     def cancel_operation(self):
         """Action d'annulation générique."""
-        print("Action annulée !")
+        log_ui.info("Action annulée !")
 
 
     def open_file(self):
@@ -1323,107 +3576,145 @@ class BookingApp(QMainWindow):
         """
         Annule la dernière opération effectuée.
         """
-        if not self.undo_stack:
+        if not self.history.can_undo():
             QMessageBox.information(self, "Annuler", "Aucune opération à annuler.")
             return
-        
+
+        with self.applying_changes():
+            self.journal_command(self.history.undo(self), forward=False)
+
+    def redo(self):
+        """Rétablit la dernière action annulée."""
+        if not self.history.can_redo():
+            QMessageBox.information(self, "Rétablir", "Aucune opération à rétablir.")
+            return
+
+        with self.applying_changes():
+            self.journal_command(self.history.redo(self))
+
+    @contextmanager
+    def applying_changes(self):
+        """
+        Applique un lot de modifications hors historique (annuler/rétablir, collage, journal).
+        Les cellules Statut écrites pendant le lot ne déclenchent qu'un seul tri, à la fin.
+        """
+        if self.undo_redo_in_progress:
+            yield  # 🔁 Lot imbriqué : le lot englobant trie à sa sortie
+            return
         self.undo_redo_in_progress = True
-        last_action = self.undo_stack.pop()
-        self.redo_stack.append(last_action)
-
-        if last_action["type"] == "delete":
-            for row, row_data in reversed(last_action["data"]):  # Restaurer les lignes dans l'ordre
-                self.table.insertRow(row)
-                for col, value in enumerate(row_data):
-                    if col == self.get_date_column_index():  # 📅 Colonne "Date"
-                        self.add_date_button(row)  # ✅ Utilise ta fonction existante
-                    elif col == self.get_statut_column_index():  # 📌 Colonne "Statut"
-                        self.add_status_combobox(row)  # ✅ Utilise ta fonction existante
-                    else:
-                        item = QTableWidgetItem(value)
-                        self.table.setItem(row, col, item)
-
-        elif last_action["type"] == "edit":
-            self.restore_last_values(last_action)
+        self.status_sort_pending = False
+        try:
+            yield
+        finally:
+            self.undo_redo_in_progress = False
+            if self.status_sort_pending:
+                self.status_sort_pending = False
+                self.header_view.sort_column(self.get_statut_column_index(), Qt.AscendingOrder)
 
-        self.undo_redo_in_progress = False
+    def record(self, command):
+        """Ajoute une commande à l'historique et au journal, sauf pendant un annuler/rétablir."""
+        if not self.undo_redo_in_progress:
+            self.journal_command(command)
+            self.history.push(command)
+
+    def read_row(self, row):
+        """Valeurs affichées d'une ligne (Statut et Formule compris), telles que l'historique les conserve."""
+        return [self.column_store.cell_text(row, col) for col in range(self.table.columnCount())]
+
+    def write_cell(self, row, col, value):
+        """Écrit une valeur dans une cellule sans l'ajouter à l'historique (utilisé par annuler/rétablir)."""
+        item = self.table.item(row, col)
+        if item is None:
+            item = QTableWidgetItem()
+            self.table.setItem(row, col, item)
+        item.setText(value)
+
+        if col == self.get_statut_column_index():
+            if self.undo_redo_in_progress:
+                self.status_sort_pending = True  # ⏳ Trié une seule fois en fin de lot (applying_changes)
+            else:
+                self.header_view.sort_column(col, Qt.AscendingOrder)
+
+    def fill_row(self, row, values):
+        """Remplit une ligne déjà insérée (Statut et Formule vides prennent leur valeur par défaut)."""
+        for col, value in enumerate(values):
+            self.table.setItem(row, col, QTableWidgetItem(value))
+        self.set_default_cells(row)
+
+    def set_default_cells(self, row):
+        """Donne à Statut et Formule leur valeur par défaut si la cellule est vide."""
+        for col, choices in ((self.get_statut_column_index(), STATUS_CHOICES),
+                             (self.get_formule_column_index(), FORMULE_CHOICES)):
+            if col is None:
+                continue
+            item = self.table.item(row, col)
+            if item is None:
+                self.table.setItem(row, col, QTableWidgetItem(choices[0]))
+            elif not item.text():
+                item.setText(choices[0])
+
+    def insert_rows(self, rows):
+        """Réinsère des lignes (par ordre croissant) avec leurs valeurs."""
+        for row, values in rows:
+            self.table.insertRow(row)
+            self.fill_row(row, values)
 
+    def remove_rows(self, rows):
+        """Supprime des lignes, de la dernière à la première pour garder les indices valides."""
+        for row in sorted(set(rows), reverse=True):
+            self.table.removeRow(row)
 
-    def redo(self):
-        """Rétablit la dernière action annulée."""
-        if not self.redo_stack:
-            QMessageBox.information(self, "Rétablir", "Aucune opération à rétablir.")
+    def delete_rows(self, rows):
+        """Supprime des lignes en gardant dans l'historique de quoi les restaurer."""
+        rows = sorted(set(rows))
+        if not rows:
             return
-        
-        self.undo_redo_in_progress = True
-        last_action = self.redo_stack.pop()
-        self.undo_stack.append(last_action)
-
-        if last_action["type"] == "delete":
-            for row, row_data in reversed(last_action["data"]):  # Restaurer les lignes dans l'ordre
-                self.table.insertRow(row)
-                for col, value in enumerate(row_data):
-                    if col == self.get_date_column_index():  # 📅 Colonne "Date"
-                        self.add_date_button(row)  # ✅ Restaurer le bouton "+"
-                    elif col == self.get_statut_column_index():  # 📌 Colonne "Statut"
-                        self.add_status_combobox(row)  # ✅ Restaurer le menu déroulant
-                    else:
-                        item = QTableWidgetItem(value)
-                        self.table.setItem(row, col, item)
-
-        elif last_action["type"] == "edit":
-            row, col, old_value, new_value = last_action["data"]
-            self.undo_stack.append({"type": "edit", "data": (row, col, new_value, old_value)})
-            self.table.item(row, col).setText(new_value)
-
-        self.undo_redo_in_progress = False
+        self.record(RowsCommand("delete", [(row, self.read_row(row)) for row in rows]))
+        self.remove_rows(rows)
 
     def delete_selected_rows(self):
         """Supprime les lignes sélectionnées et les enregistre pour annulation."""
-        selected_rows = sorted(set(index.row() for index in self.table.selectedIndexes()), reverse=True)
+        selected_rows = set(index.row() for index in self.table.selectedIndexes())
         if not selected_rows:
             QMessageBox.warning(self, "Suppression", "Aucune ligne sélectionnée.")
             return
 
-        # Stocker les lignes supprimées avant de les retirer
-        deleted_data = []
-        for row in selected_rows:
-            row_data = [self.table.item(row, col).text() if self.table.item(row, col) else "" for col in range(self.table.columnCount())]
-            deleted_data.append((row, row_data))
-
-        # Ajouter à la pile d'annulation
-        self.undo_stack.append({"type": "delete", "data": deleted_data})
-        self.redo_stack.clear()  # On vide la pile de rétablissement
-
-        # Suppression effective des lignes
-        for row in selected_rows:
-            self.table.removeRow(row)
+        self.delete_rows(selected_rows)
 
 
     def update_map_display(self):
         """Met à jour l'affichage de la carte après ajout des marqueurs."""
         map_path = "map.html"
+        self.ensure_map()
 
         # ✅ Sauvegarde de la carte avant de l'afficher
         self.map_manager.map.save(map_path)
 
         # ✅ Vérification que le fichier `map.html` existe bien
         if not os.path.exists(map_path):
-            print("❌ ERREUR : Le fichier map.html n'a pas été trouvé !")
+            log_map.error("❌ Le fichier map.html n'a pas été trouvé !")
             return  # On stoppe ici pour éviter une erreur
 
         # ✅ Affichage de la carte si le fichier existe
         self.map_view.setUrl(QUrl.fromLocalFile(os.path.abspath(map_path)))
-        print("🌍 Carte mise à jour avec les nouveaux marqueurs !")
+        log_map.debug("🌍 Carte mise à jour avec les nouveaux marqueurs !")
 
     def save_map_cache(self):
-        """Sauvegarde la carte en cache pour consultation hors-ligne."""
-        with open("cache/map_offline.html", "w", encoding="utf-8") as f:
-            f.write(self.map_view.page().toHtml())
+        """Sauvegarde la carte et ses tuiles en cache pour consultation hors-ligne."""
+        def write_html(html):
+            os.makedirs("cache", exist_ok=True)
+            with open("cache/map_offline.html", "w", encoding="utf-8") as f:
+                f.write(html)
+
+        # QtWebEngine renvoie le HTML de manière asynchrone
+        self.ensure_map()
+        self.map_view.page().toHtml(write_html)
+        self.prefetch_tiles_for_points([(lat, lon) for _, lat, lon in self.get_displayed_contacts()])
 
     def load_map_cache(self):
         """Charge la carte en cache si aucune connexion Internet."""
         if os.path.exists("cache/map_offline.html"):
+            self.ensure_map()
             with open("cache/map_offline.html", "r", encoding="utf-8") as f:
                 self.map_view.setHtml(f.read())
 
@@ -1435,12 +3726,12 @@ class BookingApp(QMainWindow):
                 with open(qss_path, "r", encoding="utf-8") as style_file:
                     qss_code = style_file.read()
                     self.setStyleSheet(qss_code)
-                    print("✅ QSS activé avec succès !")
+                    log_ui.info("✅ QSS activé avec succès !")
             else:
-                print("🚨 Fichier QSS introuvable à :", qss_path)
+                log_ui.warning("🚨 Fichier QSS introuvable à : %s", qss_path)
                 self.apply_default_stylesheet()
         except Exception as e:
-            print(f"❌ Erreur lors du chargement du QSS : {e}")
+            log_ui.error("❌ Erreur lors du chargement du QSS : %s", e)
             self.apply_default_stylesheet()
 
     def apply_default_stylesheet(self):
@@ -1534,30 +3825,31 @@ class BookingApp(QMainWindow):
 
         return possible_queries
 
+    @timed_call("geocode")
     def safe_geocode(self, queries, retries=3, delay=2):
         """Géolocalise une adresse avec gestion des erreurs."""
         if not queries:
-            print("⚠️ Aucune adresse fournie pour la géolocalisation")  # ✅ Debug
+            log_geocode.warning("⚠️ Aucune adresse fournie pour la géolocalisation")
             return None
 
         for query in queries:
-            print(f"🌍 Tentative de géolocalisation : {query}")  # ✅ Debug
+            log_geocode.debug("🌍 Tentative de géolocalisation : %s", query)
             if query in geocode_cache:
-                print(f"✅ Utilisation du cache pour {query}")  # ✅ Debug
+                log_geocode.debug("✅ Utilisation du cache pour %s", query)
                 return geocode_cache[query]
 
             for attempt in range(retries):
                 try:
-                    location = self.geocoder.geocode(query, exactly_one=True, timeout=10)
+                    location = self.ensure_geocoder().geocode(query, exactly_one=True, timeout=10)
                     if location:
                         result = {"lat": location.latitude, "lon": location.longitude}
                         geocode_cache[query] = result
-                        print(f"📍 Coordonnées trouvées : {result}")  # ✅ Debug
+                        log_geocode.debug("📍 Coordonnées trouvées : %s", result)
                         return result
                 except Exception as e:
-                    print(f"❌ Erreur de géolocalisation pour {query} : {e}")  # ✅ Debug
+                    log_geocode.warning("❌ Erreur de géolocalisation pour %s : %s", query, e)
 
-        print("⚠️ Aucun résultat pour cette adresse")
+        log_geocode.info("⚠️ Aucun résultat pour %s", queries[0])
         return None
 
 
@@ -1576,15 +3868,15 @@ class BookingApp(QMainWindow):
 
         detected = {key: "" for key in column_mapping}
 
-        print(f"        🛠️ Colonnes disponibles : {list(row.keys())}")
+        log_geocode.debug("🛠️ Colonnes disponibles : %s", list(row))
 
         for col in row.keys():
             for key, aliases in column_mapping.items():
                 if col.lower() in aliases or any(alias in col.lower() for alias in aliases):
                     detected[key] = row[col]
-                    print(f"        ✅ Colonne détectée : {col} -> {key} = {row[col]}")
+                    log_geocode.debug("✅ Colonne détectée : %s -> %s = %s", col, key, row[col])
 
-        print(f"        🔍 Colonnes détectées : {detected}")
+        log_geocode.debug("🔍 Colonnes détectées : %s", detected)
         return detected
 
 
@@ -1634,15 +3926,16 @@ class BookingApp(QMainWindow):
 
     def load_custom_font(self):
         font_path = os.path.join(os.path.dirname(__file__), "assets", "InterDisplay-Light.ttf")
+        self.custom_font_family = "Arial"  # Police de secours, utilisée aussi par les onglets
 
         # Vérification de l'existence du fichier
         if not os.path.exists(font_path):
-            print(f"    ❌ Erreur : fichier de police introuvable → {font_path}")
+            log_ui.warning("❌ Fichier de police introuvable → %s", font_path)
             return  # On arrête ici si le fichier n'existe pas
 
         font_id = QFontDatabase.addApplicationFont(font_path)
 
-        print(f"    font_id = {font_id} (type: {type(font_id)})")  # Debugging
+        log_ui.debug("font_id = %s", font_id)
 
         if font_id == -1:
             logging.warning(f"    ⚠️ Erreur lors du chargement de la police : {font_path}")
@@ -1652,7 +3945,7 @@ class BookingApp(QMainWindow):
             if font_families:
                 self.custom_font_family = font_families[0]
                 self.setFont(QFont(self.custom_font_family, 10))
-                print(f"    ✅ Police appliquée : {self.custom_font_family}")
+                log_ui.debug("✅ Police appliquée : %s", self.custom_font_family)
             else:
                 logging.warning("    ⚠️ Aucune famille de police trouvée pour l'ID chargé.")
                 self.setFont(QFont("Arial", 10))  # Police de secours
@@ -1679,25 +3972,30 @@ class BookingApp(QMainWindow):
 
 
     def filter_table(self):
-        search_text = self.search_bar.text().lower()
-        for row in range(self.table.rowCount()):
-            row_match = False
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and search_text in item.text().lower():
-                    row_match = True
-                    break
-            self.table.setRowHidden(row, not row_match)
+        """Filtre les lignes du tableau en fonction du texte saisi (combiné aux autres filtres)."""
+        self.apply_filters()
+
+    def apply_row_visibility(self, visible):
+        """Affiche ou masque les lignes en ne touchant qu'à celles dont l'état change."""
+        changed = [row for row, show in enumerate(visible) if self.table.isRowHidden(row) == show]
+        if not changed:
+            return
+
+        self.table.setUpdatesEnabled(False)
+        try:
+            for row in changed:
+                self.table.setRowHidden(row, not visible[row])
+        finally:
+            self.table.setUpdatesEnabled(True)
 
     def insert_empty_row(self, position=None):
         """Insère une ligne vide à la position spécifiée ou à la fin si None."""
         if position is None or position > self.table.rowCount():
             position = self.table.rowCount()
         self.table.insertRow(position)
+        self.fill_row(position, [""] * self.table.columnCount())  # Bouton "+" et menus déroulants compris
 
-        for col in range(self.table.columnCount()):
-            empty_item = QTableWidgetItem("")
-            self.table.setItem(position, col, empty_item)
+        self.record(RowsCommand("insert", [(position, self.read_row(position))]))
 
     def remove_selected_rows(self):
         """Supprime toutes les lignes sélectionnées."""
@@ -1713,8 +4011,7 @@ class BookingApp(QMainWindow):
         )
 
         if reply == QMessageBox.Yes:
-            for row in selected_rows:
-                self.table.removeRow(row)
+            self.delete_rows(selected_rows)
 
     def get_column_headers(self):
         return [self.table.horizontalHeaderItem(col).text() if self.table.horizontalHeaderItem(col) else f"Colonne {col}"
@@ -1768,12 +4065,17 @@ class BookingApp(QMainWindow):
             lat, lon = map(float, coord_string.split(", "))
             return lat, lon
         except ValueError:
-            print(f"⚠️ Erreur : Impossible de convertir {coord_string} en coordonnées.")
+            log_map.warning("⚠️ Impossible de convertir %s en coordonnées.", coord_string)
             return None
 
     def export_route_to_pdf(self, file_path, route_details):
         """Exporte l'itinéraire en PDF avec détails et coût du carburant."""
         try:
+            from reportlab.lib import colors
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.styles import getSampleStyleSheet
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
             pdf = SimpleDocTemplate(file_path, pagesize=letter)
             elements = []
             styles = getSampleStyleSheet()
@@ -1811,7 +4113,8 @@ class BookingApp(QMainWindow):
             elements.append(fuel_info)
 
             # 💾 Génération du PDF
-            pdf.build(elements)
+            with timed("export_route_pdf"):
+                pdf.build(elements)
             QMessageBox.information(self, "Export PDF", f"Feuille de route exportée avec succès : {file_path}")
 
         except Exception as e:
@@ -1873,13 +4176,6 @@ class BookingApp(QMainWindow):
             logging.error(f"Erreur d'import Excel : {traceback.format_exc()}")
 
 
-    def redo(self):
-        """
-        Rétablit la dernière modification annulée (redo).
-        """
-        logging.info("redo non implémenté")
-        QMessageBox.information(self, "Redo", "Fonction redo non encore implémentée.")
-
     def delete_event(self):
         """
         Supprime l'événement sélectionné dans l'onglet Calendrier.
@@ -1907,6 +4203,7 @@ class BookingApp(QMainWindow):
         try:
             with open(file_path, 'rb') as f:
                 rawdata = f.read(10000)
+            import chardet
             result = chardet.detect(rawdata)
             encoding = result['encoding'] if result['encoding'] else 'utf-8'
 
@@ -1951,10 +4248,6 @@ class BookingApp(QMainWindow):
                     date_item = QTableWidgetItem(str(row.get("Date", "")))
                     self.table.setItem(row_position, 0, date_item)
 
-                    # Ajouter la liste déroulante pour le statut
-                    self.add_status_combobox(row_position)
-                    self.add_formule_combobox(row_position)
-
                     # Ajouter la valeur du cachet
                     cachet_item = QTableWidgetItem(str(row.get("Cachet", "")))
                     self.table.setItem(row_position, 2, cachet_item)
@@ -1964,6 +4257,9 @@ class BookingApp(QMainWindow):
                         value = row.get(col_name, "")
                         item = QTableWidgetItem(str(value).strip() if pd.notnull(value) else "")
                         self.table.setItem(row_position, len(default_headers) + col_index, item)
+
+                    # Statut et Formule par défaut
+                    self.set_default_cells(row_position)
             finally:
                 self.table.setUpdatesEnabled(True)
 
@@ -1984,7 +4280,9 @@ class BookingApp(QMainWindow):
             QMessageBox.warning(self, "Carte", "Aucun contact à afficher.")
             return
 
-        m = folium.Map(location=[46.2276, 2.2137], zoom_start=6, tiles="OpenStreetMap")
+        import folium
+        from folium.plugins import MarkerCluster
+        m = create_base_map()
         marker_cluster = MarkerCluster().add_to(m)
 
         points = []
@@ -2006,7 +4304,7 @@ class BookingApp(QMainWindow):
                     icon=folium.Icon(color="blue", icon="info-sign")
                 ).add_to(marker_cluster)
             else:
-                print(f"⚠️ Échec : Aucune correspondance trouvée pour {address}")
+                log_geocode.info("⚠️ Aucune correspondance trouvée pour %s", address)
 
         # Tracer un itinéraire entre les points
         if len(points) > 1:
@@ -2015,14 +4313,15 @@ class BookingApp(QMainWindow):
         # Affichage sur l'interface
         data = io.BytesIO()
         m.save(data, close_file=False)
+        self.ensure_map()
         self.map_view.setHtml(data.getvalue().decode())
 
     def import_data(self, df):
         """Ajoute un log après l'importation pour vérifier les valeurs réelles."""
-        print(f"📄 Aperçu des données importées :\n{df.head(5)}")  # ✅ LOG pour voir les valeurs réelles
+        log_io.debug("📄 Aperçu des données importées :\n%s", df.head(5))
 
     def some_function(self, data):
-        print(f"✅ Données reçues par some_function: {data} ({type(data)})")
+        log.debug("✅ Données reçues par some_function: %s (%s)", data, type(data))
 
     def clear_map_table(self):
         """Efface le tableau des lieux envoyés vers la carte."""
@@ -2031,7 +4330,7 @@ class BookingApp(QMainWindow):
     def start_geocoding(self):
         """Démarre la géolocalisation sans effacer les contacts déjà affichés."""
         self.show_loading_screen("Géolocalisation en cours...")
-        self.geocode_worker = MapGeocodeWorker(self.contacts, self.geocoder, self)
+        self.geocode_worker = MapGeocodeWorker(self.contacts, self.ensure_geocoder(), self)
         self.geocode_worker.progress.connect(self.update_progress)
         self.geocode_worker.finished.connect(self.add_markers_to_map_and_table)  # ⚠️ Bien vérifier cette ligne
         self.geocode_worker.start()
@@ -2043,7 +4342,7 @@ class BookingApp(QMainWindow):
         """Affiche les noms des colonnes pour s'assurer qu'on récupère les bonnes données."""
         headers = [self.table.horizontalHeaderItem(i).text() if self.table.horizontalHeaderItem(i) else f"Colonne {i}"
                    for i in range(self.table.columnCount())]
-        print(f"🔍 En-têtes détectés: {headers}")
+        log_table.debug("🔍 En-têtes détectés: %s", headers)
         return headers
 
 
@@ -2059,9 +4358,20 @@ class BookingApp(QMainWindow):
         self.tabs.addTab(self.table_tab, "LIEUX")
         self.tabs.addTab(self.map_tab, "CARTE")
         self.tabs.addTab(self.calendar_tab, "AGENDA")
+        self.tabs.addTab(self.stats_tab, "STATS")
         self.search_tab = SearchTab(self)  # Création du nouvel onglet
         self.tabs.addTab(self.search_tab, "DEMANDER A L'UNIVERS")  # Ajout dans les onglets
 
+        # 🗺️ La carte (QtWebEngine, folium) n'est construite qu'à la première ouverture de l'onglet
+        self.tabs.currentChanged.connect(
+            lambda index: self.tabs.widget(index) is self.map_tab and self.ensure_map())
+
+        # 📅 Jours réservés recalculés à l'ouverture de l'agenda (l'index suit les éditions)
+        self.tabs.currentChanged.connect(
+            lambda index: self.tabs.widget(index) is self.calendar_tab and self.highlight_booked_days())
+        self.tabs.currentChanged.connect(
+            lambda index: self.tabs.widget(index) is self.stats_tab and self.refresh_stats())
+
     def create_shortcuts(self):
         QShortcut(QKeySequence("Ctrl+Z"), self, self.undo)
         QShortcut(QKeySequence("Ctrl+Y"), self, self.redo)
@@ -2091,7 +4401,14 @@ class BookingApp(QMainWindow):
         search_layout = QHBoxLayout()
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("🔍 Rechercher...")
-        self.search_bar.textChanged.connect(self.filter_table)
+
+        # ⏱️ Anti-rebond : le filtre part quand la frappe se calme (ou tout de suite sur Entrée)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(config.get("filter_debounce_ms", 200))
+        self.filter_timer.timeout.connect(self.filter_table)
+        self.search_bar.textChanged.connect(self.filter_timer.start)
+        self.search_bar.returnPressed.connect(self.filter_table)
         search_layout.addWidget(self.search_bar)
 
         self.sort_dropdown = QComboBox()
@@ -2107,14 +4424,45 @@ class BookingApp(QMainWindow):
         layout.addLayout(search_layout)
 
         # 🖍️ Table des contacts
-        self.table = QTableWidget()
+        self.table = DraggableTableWidget()
         self.table.setSelectionMode(QTableWidget.ExtendedSelection)
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSortingEnabled(True)
-        self.table.horizontalHeader().setSectionsClickable(True)
-        self.table.horizontalHeader().setSortIndicatorShown(True)
 
-        # ✅ Définition de la hauteur des lignes pour éviter le débordement des boutons
+        # 🏷️ Tri personnalisé : une permutation de l'affichage, jamais une reconstruction des lignes.
+        # Le tri natif de Qt reste désactivé car il renumérote les lignes logiques.
+        self.header_view = SortHeaderView(Qt.Horizontal, self.table)
+        self.table.setHorizontalHeader(self.header_view)
+        self.table.setSortingEnabled(False)
+
+        # 🎨 Statut, Formule et bouton "+" de la Date sont dessinés par un délégué :
+        # aucun widget par ligne, un éditeur n'est créé qu'à l'édition d'une cellule
+        self.item_delegate = BookingItemDelegate(self.header_view.schema, self.table)
+        self.item_delegate.date_requested.connect(self.open_calendar_popup)
+        self.table.setItemDelegate(self.item_delegate)
+        self.table.setMouseTracking(True)  # Survol du bouton "+"
+        self.header_view.setSortIndicatorShown(True)
+        self.header_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.header_view.customContextMenuRequested.connect(self.show_header_menu)
+
+        # 🔎 Index texte des lignes pour la recherche et copie par colonnes pour les filtres,
+        # tenus à jour au fil des éditions
+        self.filter_index = RowTextIndex(self.table)
+        self.column_store = ColumnStore(self.table)
+        self.date_index = DateIndex(self.table, self.header_view.schema)
+        self.booking_stats = BookingStats(self.table, self.header_view.schema)
+        self.filter_criteria = {}
+
+        # ↩️ Historique des éditions faites dans les cellules
+        self.table.itemChanged.connect(self.on_table_edit)
+
+        # 💾 Toute modification du contenu rend la prochaine sauvegarde automatique nécessaire
+        model = self.table.model()
+        model.dataChanged.connect(self.on_table_data_changed)
+        for signal in (model.rowsInserted, model.rowsRemoved, model.columnsInserted,
+                       model.columnsRemoved, model.modelReset):
+            signal.connect(self.bump_revision)
+
+        # ✅ Hauteur des lignes : place pour les listes déroulantes et le bouton "+"
         self.table.verticalHeader().setDefaultSectionSize(30)
 
         # ✅ Mise à jour des colonnes
@@ -2125,15 +4473,6 @@ class BookingApp(QMainWindow):
 
         layout.addWidget(self.table)
 
-        # 🟢 Ajoute les boutons "+" dans la colonne "Date"
-        self.setup_date_column()
-
-        # 🔹 Ajoute la liste déroulante dans la colonne "Statut"
-        self.setup_status_column()
-
-        # 🎵 Ajoute la liste déroulante dans la colonne "Formule"
-        self.setup_formule_column()
-
         # 🔄 Ajuste les colonnes après la configuration
         self.adjust_columns()
 
@@ -2161,41 +4500,7 @@ class BookingApp(QMainWindow):
 
     def get_date_column_index(self):
         """Retourne l'index réel de la colonne 'Date' après l'importation du fichier Excel."""
-        if self.table.columnCount() == 0:  # Vérifie si le tableau est vide
-            print("⚠️ Aucune colonne trouvée dans le tableau !")
-            return None
-
-        for col in range(self.table.columnCount()):  # Parcourt toutes les colonnes
-            header_item = self.table.horizontalHeaderItem(col)  # Récupère le nom de colonne
-            if header_item and header_item.text().strip().lower() == "date":
-                return col  # Retourne l'index dès qu'on trouve "Date"
-
-        print("⚠️ Erreur : Colonne 'Date' introuvable !")  # Debug si absent
-        return None  # Retourne None si "Date" n'existe pas
-
-    def store_row_colors(self):
-        """Stocke les couleurs actuelles des lignes avant un tri."""
-        self.row_colors = {}
-
-        for row in range(self.table.rowCount()):
-            color_data = []
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    color = item.background().color() if item.background() else QColor(Qt.white)
-                    color_data.append((col, color))
-            self.row_colors[row] = color_data
-
-
-    def restore_row_colors(self):
-        """Restaure les couleurs des lignes après un tri."""
-        for row in range(self.table.rowCount()):
-            color = QColor(240, 240, 240) if row % 2 == 0 else QColor(255, 255, 255)
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    item.setBackground(color)
-
+        return self.header_view.schema.index("Date")
 
     def handle_sort_selection(self):
         """Gère la sélection du tri depuis le menu déroulant et appelle la bonne méthode de tri."""
@@ -2204,8 +4509,8 @@ class BookingApp(QMainWindow):
     
         # Associe l'index du menu déroulant aux colonnes correspondantes
         column_mapping = {
-            1: 0,  # Date (A-Z)
-            2: 0,  # Date (Z-A)
+            1: self.get_date_column_index(),  # Date (A-Z)
+            2: self.get_date_column_index(),  # Date (Z-A)
             3: self.get_statut_column_index(),  # Statut (A-Z)
             4: self.get_statut_column_index(),  # Statut (Z-A)
             5: self.get_cachet_column_index(),  # Cachet (A-Z)
@@ -2219,199 +4524,84 @@ class BookingApp(QMainWindow):
             self.table.horizontalHeader().sort_column(column, order)  # ✅ Appelle `sort_column` depuis `SortHeaderView`
 
 
-    def update_status_value(self, row, col, combo_box):
-        """Met à jour le statut sans déclencher de tri automatique et garantit la synchronisation."""
-        if hasattr(self, "prevent_sorting") and self.prevent_sorting:
-            return  
-
-        self.prevent_sorting = True  
-        selected_value = combo_box.currentText().strip()
-
-        item = self.table.item(row, col)
-        if not item:
-            item = QTableWidgetItem()
-            self.table.setItem(row, col, item)
-
-        item.setText(selected_value)  
-
-        print(f"🔄 Statut modifié (Ligne {row}) → {selected_value}")
-
-        if hasattr(self, "restore_row_colors") and callable(self.restore_row_colors):
-            self.restore_row_colors()
-
-        QApplication.processEvents()  
-
-        # Ajout d'un délai pour laisser le temps à la table de se stabiliser
-        QTimer.singleShot(100, lambda: self.header_view.sort_column(col, Qt.AscendingOrder))
-
-        self.prevent_sorting = False  
-  
-
-    def setup_status_column(self):
-        """Ajoute un QComboBox dans la vraie colonne 'Statut' pour chaque ligne après import."""
-        for row in range(self.table.rowCount()):
-            self.add_status_combobox(row)
-
-    def add_status_combobox(self, row):
-        """Ajoute un menu déroulant de statut dans la colonne correspondante."""
-        statut_col = self.get_statut_column_index()
-        if statut_col is None:
-            return  # Ne rien faire si la colonne "Statut" est introuvable
-
-        # ✅ Création du QComboBox avec "Nouveau" comme valeur par défaut
-        combobox = QComboBox()
-        combobox.addItems(["Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-        combobox.setCurrentText("Nouveau")  # ✅ Toujours définir la valeur par défaut ici
-
-        combobox.currentIndexChanged.connect(partial(self.update_status_value, row, statut_col, combobox))
-        self.table.setCellWidget(row, statut_col, combobox)  # ✅ Toujours utiliser setCellWidget
-
-        print(f"✅ QComboBox ajouté à la ligne {row}, colonne {statut_col}")  # ✅ Vérification
+    def on_status_changed(self, row, col):
+        """Un statut a changé : la ligne reprend sa place dans le tri par statut."""
+        if getattr(self, "prevent_sorting", False):
+            return
+        self.prevent_sorting = True
+        try:
+            # 🔃 Le tri ne fait que permuter l'affichage : les éléments restent en place
+            self.header_view.sort_column(col, Qt.AscendingOrder)
+        finally:
+            self.prevent_sorting = False
 
 
     def setup_filters(self):
         """Crée les QComboBox de filtrage et connecte leur signal de changement."""
         self.status_filter = QComboBox()
-        self.status_filter.addItems(["Tous", "Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"])
-        self.status_filter.currentIndexChanged.connect(self.apply_filters)
+        self.status_filter.addItems(["Tous"] + STATUS_CHOICES)
+        self.status_filter.currentTextChanged.connect(
+            lambda text: self.set_filter("statut", None if text == "Tous" else {text}))
 
         self.formule_filter = QComboBox()
-        self.formule_filter.addItems(["Tous", "Solo", "Duo", "Trio", "Full Band"])
-        self.formule_filter.currentIndexChanged.connect(self.apply_filters)
+        self.formule_filter.addItems(["Tous"] + FORMULE_CHOICES)
+        self.formule_filter.currentTextChanged.connect(
+            lambda text: self.set_filter("formule", None if text == "Tous" else {text}))
 
-        # Ajout au layout (exemple : dans une barre d'outils)
         self.toolbar.addWidget(QLabel("    Statut:"))
         self.toolbar.addWidget(self.status_filter)
         self.toolbar.addWidget(QLabel("    Formule:"))
         self.toolbar.addWidget(self.formule_filter)
 
+        # 🔎 Filtres avancés (date, cachet, lieu)
+        filter_action = QAction("🔎 Filtres", self)
+        filter_menu = QMenu(self)
+        filter_menu.addAction("Statut…", self.show_status_filter)
+        filter_menu.addAction("Date…", self.show_date_filter)
+        filter_menu.addAction("Cachet…", self.show_price_filter)
+        filter_menu.addAction("Lieu…", self.show_location_filter)
+        filter_menu.addSeparator()
+        filter_menu.addAction("Réinitialiser les filtres", self.reset_filters)
+        filter_action.setMenu(filter_menu)
+        filter_action.triggered.connect(lambda: filter_menu.exec_(self.cursor().pos()))
+        self.toolbar.addAction(filter_action)
+
+    def set_filter(self, name, value):
+        """Met à jour un critère de filtre (None pour le retirer) puis réapplique tous les filtres."""
+        if value is None:
+            self.filter_criteria.pop(name, None)
+        else:
+            self.filter_criteria[name] = value
+        self.apply_filters()
+
+    def reset_filters(self):
+        """Retire tous les critères et la recherche, puis réaffiche toutes les lignes."""
+        self.filter_criteria.clear()
+        for combo in (getattr(self, "status_filter", None), getattr(self, "formule_filter", None)):
+            if combo is not None:
+                combo.blockSignals(True)
+                combo.setCurrentText("Tous")
+                combo.blockSignals(False)
+        self.search_bar.blockSignals(True)
+        self.search_bar.clear()
+        self.search_bar.blockSignals(False)
+        self.apply_filters()
 
+    @timed_call("filter")
     def apply_filters(self):
-        """Filtre les lignes du tableau en fonction des valeurs sélectionnées dans les QComboBox."""
-        statut_filter = self.status_filter.currentText().strip().lower()
-        statut_col = self.get_statut_column_index()
-
-        if statut_col is None:
-            print("⚠️ Impossible d'appliquer les filtres : colonne 'Statut' introuvable.")
-            return
-
-        statut_order = {
-            "Nouveau": 0,
-            "Mail envoyé": 1,
-            "Échange Tel.": 2,
-            "Full": 3,
-            "Laisse tomber": 4,
-            "Let's Go": 5
-        }
-
-        for row in range(self.table.rowCount()):
-            widget = self.table.cellWidget(row, statut_col)
-            value = widget.currentText().strip().lower() if isinstance(widget, QComboBox) else "Nouveau"
-
-            # ✅ Vérifier si la ligne doit être affichée ou masquée
-            show = (statut_filter == "tous") or (value == statut_filter)
-            self.table.setRowHidden(row, not show)
-
-    def update_row_color(self, row):
-        """Met à jour la couleur de la ligne en fonction du statut sélectionné."""
-        statut_col = self.get_statut_column_index()
-        if statut_col is None:
-            return  # On ne fait rien si la colonne statut est introuvable
-
-        # Récupérer le menu déroulant de la colonne "Statut"
-        combobox = self.table.cellWidget(row, statut_col)
-        if not combobox:
-            return
-
-        statut = combobox.currentText()
-
-        # 🎨 Dictionnaire des couleurs par statut
-        colors = {
-            "Nouveau": ("#f7f7f7", "black"),  # Blanc
-            "Mail envoyé": ("#8ee9f0", "black"),  # Bleu clair
-            "Échange Tel.": ("#e0b4f2", "black"),  # Violet
-            "Full": ("#fd9595", "black"),  # Rouge clair
-            "Laisse tomber": ("#000000", "white"), # Noir avec texte blanc
-            "Let's Go": ("#23db6f", "black"),  # Vert
-        }
-
-        # Appliquer la couleur correspondante
-        if statut in colors:
-            bg_color, text_color = colors[statut]
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    item.setBackground(QColor(bg_color))
-                    item.setForeground(QColor(text_color))
-
-
-    def setup_formule_column(self):
-        """Ajoute une liste déroulante dans la colonne Formule pour chaque ligne existante."""
-        for row in range(self.table.rowCount()):
-            self.add_formule_combobox(row)
-
-    def add_formule_combobox(self, row):
-        """Ajoute un QComboBox dans la colonne 'Formule' de la ligne spécifiée."""
-        col_index = self.get_formule_column_index()
-        if col_index is not None:  # Vérifie que la colonne "Formule" existe
-            combo_box = QComboBox()
-            combo_box.addItems(["Solo", "Duo", "Trio", "Full Band"])
-            self.table.setCellWidget(row, col_index, combo_box)
+        """
+        Applique en une passe la recherche texte et tous les critères actifs
+        (statut, formule, dates, cachet, lieu), évalués en masques sur `column_store`.
+        """
+        self.filter_timer.stop()
+        visible = np.fromiter(self.filter_index.matches(self.search_bar.text()), dtype=bool)
+        if self.filter_criteria:
+            visible &= self.column_store.mask(self.filter_criteria)
+        self.apply_row_visibility(visible.tolist())
 
     def get_formule_column_index(self):
         """Retourne l'index de la colonne 'Formule'."""
-        for col in range(self.table.columnCount()):
-            if self.table.horizontalHeaderItem(col) and self.table.horizontalHeaderItem(col).text() == "Formule":
-                return col
-        return None
-
-
-    def add_date_button(self, row):
-        """Ajoute un bouton '+' qui remplit entièrement la cellule de la colonne 'Date'."""
-        date_col = self.get_date_column_index()
-        if date_col is None:
-            return  # Ne rien faire si la colonne "Date" est introuvable
-
-        # 🔹 Création du bouton "+"
-        button = QPushButton("+")
-        button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Remplissage max
-        button.setStyleSheet("""
-            QPushButton {
-                background-color: #0078d7;
-                color: white;
-                font-size: 16px;
-                font-weight: bold;
-                border: none;  /* Suppression des bordures */
-                padding: 0px;
-            }
-            QPushButton:hover {
-                background-color: #005a9e;
-            }
-        """)
-
-        # 🔄 Ajuster la hauteur de la ligne pour éviter les coupures
-        row_height = max(35, self.table.rowHeight(row))  # Augmenté pour plus de confort
-        self.table.setRowHeight(row, row_height)
-
-        # ✅ Forcer la taille du bouton pour qu'il remplisse bien
-        button.setFixedHeight(row_height - 2)  # Ajustement fin
-        button.setFixedWidth(self.table.columnWidth(date_col) - 2)  # Ajuster à la largeur
-
-        # 📌 Utilisation d'un `QHBoxLayout` pour un centrage optimal
-        layout = QHBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)  # Supprimer les marges
-        layout.setSpacing(0)  # Aucun espacement supplémentaire
-        layout.addWidget(button)
-
-        # ✅ Conteneur pour insérer proprement dans la cellule
-        container = QWidget()
-        container.setLayout(layout)
-
-        button.clicked.connect(lambda: self.open_calendar_popup(row, date_col))
-
-        # 📌 Insérer dans la cellule
-        self.table.setCellWidget(row, date_col, container)
-
+        return self.header_view.schema.index("Formule")
 
 
     def open_calendar_popup(self, row, col):
@@ -2424,8 +4614,8 @@ class BookingApp(QMainWindow):
         layout = QVBoxLayout()
 
         # 🗓️ Création du calendrier
-        self.calendar = QCalendarWidget()
-        self.calendar.setGridVisible(True)
+        self.date_picker = QCalendarWidget()  # Distinct du calendrier de l'onglet Agenda
+        self.date_picker.setGridVisible(True)
 
         # ✅ Bouton "OK" pour valider la date sélectionnée
         ok_button = QPushButton("OK")
@@ -2446,7 +4636,7 @@ class BookingApp(QMainWindow):
         # 💡 Connexion du bouton "OK" pour insérer la date dans la cellule
         ok_button.clicked.connect(lambda: self.set_selected_date(row, col))
 
-        layout.addWidget(self.calendar)
+        layout.addWidget(self.date_picker)
         layout.addWidget(ok_button)
 
         self.calendar_dialog.setLayout(layout)
@@ -2455,15 +4645,16 @@ class BookingApp(QMainWindow):
 
     def set_selected_date(self, row, col):
         """Remplace le bouton '+' par la date sélectionnée, ajuste la hauteur et la largeur de la cellule."""
-        selected_date = self.calendar.selectedDate().toString("dd/MM/yyyy")
+        selected_date = self.date_picker.selectedDate().toString("dd/MM/yyyy")
 
-        # Vérifie si la cellule contient déjà un widget et le supprime
-        if self.table.cellWidget(row, col):
-            self.table.removeCellWidget(row, col)
+        old_item = self.table.item(row, col)
+        old_value = old_item.text() if old_item else ""
 
-        # Ajoute la date sélectionnée dans la cellule
+        # Une date renseignée remplace le bouton "+" dessiné par le délégué
         item = QTableWidgetItem(selected_date)
         self.table.setItem(row, col, item)
+        if old_value != selected_date:
+            self.record(CellEditCommand(row, col, old_value, selected_date))
 
         # 🔄 Ajuster la hauteur de la ligne pour éviter tout chevauchement
         self.table.setRowHeight(row, 30)
@@ -2477,11 +4668,6 @@ class BookingApp(QMainWindow):
         self.calendar_dialog.accept()
 
 
-    def setup_date_column(self):
-        """Ajoute un bouton '+' dans toutes les cellules de la colonne 'Date'."""
-        for row in range(self.table.rowCount()):
-            self.add_date_button(row)
-
     def show_header_menu(self, pos):
         """Affiche un menu contextuel pour trier une colonne."""
         header = self.table.horizontalHeader()
@@ -2495,12 +4681,10 @@ class BookingApp(QMainWindow):
         global_pos = header.viewport().mapToGlobal(pos)
         action = menu.exec_(global_pos)
 
-        if action:
-            self.table.setSortingEnabled(True)  # ✅ Active le tri
-            if action == action_asc:
-                self.table.sortItems(col, Qt.AscendingOrder)
-            elif action == action_desc:
-                self.table.sortItems(col, Qt.DescendingOrder)
+        if action == action_asc:
+            self.header_view.sort_column(col, Qt.AscendingOrder)
+        elif action == action_desc:
+            self.header_view.sort_column(col, Qt.DescendingOrder)
 
     def show_context_menu(self, position):
         menu = QMenu()
@@ -2539,33 +4723,81 @@ class BookingApp(QMainWindow):
         QMessageBox.information(self, "Ajouter à la Feuille de route", "Intégration des données à la feuille de route non encore implémentée.")
 
 
+    def ask_range(self, title, labels, start_widget, end_widget):
+        """
+        Boîte de dialogue « début / fin » partagée par les filtres de date et de cachet.
+
+        :return: "ok", "clear" (bouton Réinitialiser) ou None si annulé.
+        """
+        dialog = QDialog(self)
+        dialog.setWindowTitle(title)
+        layout = QFormLayout(dialog)
+        layout.addRow(labels[0], start_widget)
+        layout.addRow(labels[1], end_widget)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel | QDialogButtonBox.Reset)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        buttons.button(QDialogButtonBox.Reset).clicked.connect(lambda: dialog.done(2))
+        layout.addRow(buttons)
+
+        result = dialog.exec_()
+        return {QDialog.Accepted: "ok", 2: "clear"}.get(result)
+
     def show_date_filter(self):
-        logging.info("show_date_filter non implémenté")
-        QMessageBox.information(self, "Filtre Date", "Filtre par date non encore implémenté.")
+        """Filtre les lignes dont la date tombe dans l'intervalle choisi."""
+        start, end = self.filter_criteria.get("date", (None, None))
+        start_edit, end_edit = QDateEdit(), QDateEdit()
+        for edit in (start_edit, end_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("dd/MM/yyyy")
+        start_edit.setDate(QDate(start) if start else QDate.currentDate())
+        end_edit.setDate(QDate(end) if end else QDate.currentDate().addMonths(3))
+
+        choice = self.ask_range("Filtre Date", ("Du :", "Au :"), start_edit, end_edit)
+        if choice == "ok":
+            self.set_filter("date", (start_edit.date().toPyDate(), end_edit.date().toPyDate()))
+        elif choice == "clear":
+            self.set_filter("date", None)
 
     def show_location_filter(self):
-        logging.info("show_location_filter non implémenté")
-        QMessageBox.information(self, "Filtre Lieu", "Filtre par lieu non encore implémenté.")
+        """Filtre les lignes dont le lieu (ville, adresse, code postal…) contient le texte saisi."""
+        text, ok = QInputDialog.getText(self, "Filtre Lieu", "Ville, adresse ou code postal :",
+                                        text=self.filter_criteria.get("lieu", ""))
+        if ok:
+            self.set_filter("lieu", text.strip() or None)
 
     def show_status_filter(self):
         """Filtre les lignes en fonction du statut sélectionné."""
         statut_filter, ok = QInputDialog.getItem(
             self, "Filtrer par statut", "Choisissez un statut :", 
-            ["Tous", "Nouveau", "Mail envoyé", "Échange Tel.", "Full", "Laisse tomber", "Let's Go"],
+            ["Tous"] + STATUS_CHOICES,
             0, False
         )
 
         if ok:
-            statut_col = self.get_statut_column_index()
-            for row in range(self.table.rowCount()):
-                widget = self.table.cellWidget(row, statut_col)
-                value = widget.currentText().strip() if isinstance(widget, QComboBox) else "Nouveau"
-
-                self.table.setRowHidden(row, statut_filter != "Tous" and value != statut_filter)
+            if hasattr(self, "status_filter"):
+                self.status_filter.setCurrentText(statut_filter)  # Le QComboBox réapplique les filtres
+            else:
+                self.set_filter("statut", None if statut_filter == "Tous" else {statut_filter})
 
     def show_price_filter(self):
-        logging.info("show_price_filter non implémenté")
-        QMessageBox.information(self, "Filtre Cachet", "Filtre par cachet non encore implémenté.")
+        """Filtre les lignes dont le cachet est compris entre un minimum et un maximum."""
+        low, high = self.filter_criteria.get("cachet", (None, None))
+        low_spin, high_spin = QDoubleSpinBox(), QDoubleSpinBox()
+        for spin in (low_spin, high_spin):
+            spin.setRange(0, 1_000_000)
+            spin.setDecimals(0)
+            spin.setSingleStep(100)
+            spin.setSuffix(" €")
+        low_spin.setValue(low or 0)
+        high_spin.setValue(high if high is not None else 10_000)
+
+        choice = self.ask_range("Filtre Cachet", ("Minimum :", "Maximum :"), low_spin, high_spin)
+        if choice == "ok":
+            self.set_filter("cachet", (low_spin.value(), high_spin.value()))
+        elif choice == "clear":
+            self.set_filter("cachet", None)
 
     def add_row(self):
         """Ajoute une nouvelle ligne et applique le tri immédiatement après."""
@@ -2576,25 +4808,22 @@ class BookingApp(QMainWindow):
         date_item = QTableWidgetItem(datetime.now().strftime(config["date_format"]))
         self.table.setItem(current_row, 0, date_item)
 
-        # Ajouter les listes déroulantes pour Statut et Formule
-        self.add_status_combobox(current_row)
-        self.add_formule_combobox(current_row)
+        # Statut et Formule par défaut (affichés en listes déroulantes par le délégué)
+        self.set_default_cells(current_row)
 
         # Ajouter une cellule vide pour Cachet
         cachet_item = QTableWidgetItem("")
         self.table.setItem(current_row, 2, cachet_item)
 
         self.adjust_columns()
-        self.save_state()
+        self.record(RowsCommand("insert", [(current_row, self.read_row(current_row))]))
 
         # ✅ Forcer le tri après ajout
         self.header_view.sort_column(self.get_statut_column_index(), Qt.AscendingOrder)
 
     def delete_row(self):
         """Supprime les lignes sélectionnées et applique le tri après suppression."""
-        selected_rows = sorted(set(index.row() for index in self.table.selectedIndexes()), reverse=True)
-        for row in selected_rows:
-            self.table.removeRow(row)
+        self.delete_rows(index.row() for index in self.table.selectedIndexes())
 
         # ✅ Forcer le tri après suppression
         self.header_view.sort_column(self.get_statut_column_index(), Qt.AscendingOrder)
@@ -2603,55 +4832,14 @@ class BookingApp(QMainWindow):
         self.adjust_columns()
 
     def on_table_edit(self, item):
-        """Gère l'historique des modifications pour les cellules texte et QComboBox."""
-        if not self.undo_redo_in_progress:
-            row, col = item.row(), item.column()
-            key = (row, col)
-
-            if key not in self.last_values:
-                self.last_values[key] = item.text()
-            else:
-                old_value = self.last_values[key]
-                new_value = item.text()
-
-                if old_value != new_value:
-                    self.undo_stack.append((row, col, old_value, new_value))
-                    self.redo_stack.clear()
-
-                self.last_values[key] = new_value
-
-    def on_status_change(self, row, combo_box):
-        """Gère l'historique des modifications pour les changements de statut."""
-        statut_col = self.get_statut_column_index()
-        if statut_col is None:
+        """Enregistre dans l'historique une cellule modifiée dans son éditeur (ancienne → nouvelle valeur)."""
+        if self.undo_redo_in_progress:
             return
-
-        key = (row, statut_col)
-        new_value = combo_box.currentText()
-
-        if key not in self.last_values:
-            self.last_values[key] = new_value
-        else:
-            old_value = self.last_values[key]
-            if old_value != new_value:
-                self.undo_stack.append((row, statut_col, old_value, new_value))
-                self.redo_stack.clear()
-
-            self.last_values[key] = new_value
-
-        # ✅ Appliquer le tri immédiatement après un changement de statut
-        self.header_view.sort_column(statut_col, Qt.AscendingOrder)
-
-    def save_state(self):
-        state = []
-        for row in range(self.table.rowCount()):
-            row_data = []
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "")
-            state.append(row_data)
-        self.undo_stack.append(("table_state", state))
-        self.redo_stack.clear()
+        old_value = self.table.take_edit_origin(item.row(), item.column())
+        if old_value is not None and old_value != item.text():
+            self.record(CellEditCommand(item.row(), item.column(), old_value, item.text()))
+            if item.column() == self.get_statut_column_index():
+                self.on_status_changed(item.row(), item.column())
 
     def create_map_tab(self):
         """Crée l'onglet Carte avec un tableau récapitulatif des lieux exportés et une fenêtre latérale pour les détails d'itinéraire."""
@@ -2661,11 +4849,11 @@ class BookingApp(QMainWindow):
         # 📌 Séparateur pour diviser l'écran en 3/4 carte - 1/4 détails
         splitter = QSplitter(Qt.Horizontal)
 
-        # 🌍 Carte interactive
-        self.map_view = QWebEngineView()
-        self.map_manager = MapManager(self.map_view, parent=self)  # Instanciation du gestionnaire de carte
-        self.map_view.setMinimumWidth(self.width() * 3 // 4)  # 3/4 de la largeur de la fenêtre
-        splitter.addWidget(self.map_view)
+        # 🌍 Carte interactive : emplacement réservé jusqu'au premier affichage de l'onglet (voir ensure_map)
+        self.map_splitter = splitter
+        self.map_placeholder = QLabel("Chargement de la carte…", alignment=Qt.AlignCenter)
+        self.map_placeholder.setMinimumWidth(self.width() * 3 // 4)  # 3/4 de la largeur de la fenêtre
+        splitter.addWidget(self.map_placeholder)
 
         # 📝 Fenêtre latérale des détails d'itinéraire
         self.itinerary_details_widget = QWidget()
@@ -2703,6 +4891,11 @@ class BookingApp(QMainWindow):
         self.optimize_route_btn.clicked.connect(self.create_itinerary)
         map_toolbar.addWidget(self.optimize_route_btn)
 
+        # 🌍 Affichage de toute la base en mode grand volume
+        self.plot_all_btn = QPushButton("🌍 Toute la base")
+        self.plot_all_btn.clicked.connect(self.plot_all_venues)
+        map_toolbar.addWidget(self.plot_all_btn)
+
         # ✅ Ajouter `map_toolbar` une seule fois
         layout.addLayout(map_toolbar)
 
@@ -2741,9 +4934,6 @@ class BookingApp(QMainWindow):
 
         self.map_tab.setLayout(layout)
 
-        # 🌍 Initialisation de la carte
-        self.initialize_map()
-
 
     def delete_selected_map_row(self):
         """Supprime la ligne sélectionnée dans le tableau des marqueurs sur la carte."""
@@ -2761,7 +4951,7 @@ class BookingApp(QMainWindow):
             coordinates = self.map_table.item(row, 3).text() if self.map_table.item(row, 3) else "Non localisé"
             itinerary.append((contact, address, coordinates))
 
-        print("📍 Itinéraire défini :", itinerary)
+        log_route.debug("📍 Itinéraire défini : %s", itinerary)
         return itinerary
 
     def create_calendar_tab(self):
@@ -2793,6 +4983,7 @@ class BookingApp(QMainWindow):
             }
         """)
         self.calendar.clicked.connect(self.on_date_selected)
+        self.calendar.currentPageChanged.connect(self.highlight_booked_days)
         calendar_layout.addWidget(self.calendar)
 
         # Widget contenant les détails de la journée
@@ -2867,20 +5058,62 @@ class BookingApp(QMainWindow):
 
 
     def create_stats_tab(self):
-        """Création de l'onglet Statistiques"""
+        """Création de l'onglet Statistiques (agrégats tenus à jour par `booking_stats`)."""
         self.stats_tab = QWidget()
         layout = QVBoxLayout(self.stats_tab)
-        label = QLabel("Statistiques non implémentées")
-        layout.addWidget(label)
+
+        self.stats_summary = QLabel()
+        self.stats_summary.setFont(QFont(self.custom_font_family, 12))
+        self.stats_summary.setStyleSheet("padding: 8px;")
+        layout.addWidget(self.stats_summary)
+
+        tables_layout = QHBoxLayout()
+        self.stats_tables = {}
+        for key, title in (("by_status", "Statut"), ("by_formule", "Formule"),
+                           ("by_month", "Mois"), ("funnel", "Entonnoir")):
+            table = QTableWidget(0, 2)
+            table.setHorizontalHeaderLabels([title, "Nombre"])
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            table.verticalHeader().setVisible(False)
+            table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            self.stats_tables[key] = table
+            tables_layout.addWidget(table)
+        layout.addLayout(tables_layout)
+
+        # 📊 Rafraîchissement groupé tant que l'onglet est affiché
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setSingleShot(True)
+        self.stats_timer.setInterval(300)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.table.model().dataChanged.connect(self.schedule_stats_refresh)
+        self.table.model().rowsInserted.connect(self.schedule_stats_refresh)
+        self.table.model().rowsRemoved.connect(self.schedule_stats_refresh)
+
+    def schedule_stats_refresh(self, *args):
+        if hasattr(self, "tabs") and self.tabs.currentWidget() is self.stats_tab:
+            self.stats_timer.start()
+
+    def refresh_stats(self):
+        """Affiche les agrégats courants (seules les lignes modifiées depuis l'affichage précédent sont relues)."""
+        stats = self.booking_stats.summary()
+        self.stats_summary.setText(
+            f"<b>{stats['total']}</b> lieux — cachets : <b>{stats['cachet_total']:.2f} €</b> au total, "
+            f"<b>{stats['cachet_average']:.2f} €</b> en moyenne — confirmés (Let's Go) : "
+            f"<b>{stats['confirmed_total']:.2f} €</b> — conversion Nouveau → Let's Go : "
+            f"<b>{stats['conversion']:.1%}</b>"
+        )
+        for key, table in self.stats_tables.items():
+            rows = stats[key]
+            table.setRowCount(len(rows))
+            for row, (label, count) in enumerate(rows):
+                table.setItem(row, 0, QTableWidgetItem(str(label)))
+                table.setItem(row, 1, QTableWidgetItem(str(count)))
 
     def initialize_map(self):
         """Initialise la carte une seule fois."""
+        from folium.plugins import MarkerCluster
         if not hasattr(self, "map"):
-            self.map = folium.Map(
-                location=[46.2276, 2.2137],
-                zoom_start=6,
-                tiles="OpenStreetMap"
-            )
+            self.map = create_base_map()
             self.marker_cluster = MarkerCluster().add_to(self.map)
 
         # Mettre à jour l'affichage de la carte
@@ -2888,6 +5121,7 @@ class BookingApp(QMainWindow):
 
     def add_markers_to_map_and_route(self, results, marker_cluster, m):
         """Ajoute des marqueurs à la carte en évitant les erreurs de coordonnées invalides."""
+        import folium
         for contact, address, status, coordinates in results:
             if coordinates != "Non trouvé":
                 try:
@@ -2899,14 +5133,16 @@ class BookingApp(QMainWindow):
                 except ValueError:
                     logging.error(f"⚠️ Coordonnées invalides pour {address}: {coordinates}")
             else:
-                print(f"❌ Aucune correspondance trouvée pour {address}, aucun marqueur ajouté.")
+                log_geocode.info("❌ Aucune correspondance trouvée pour %s, aucun marqueur ajouté.", address)
 
         data = io.BytesIO()
         m.save(data, close_file=False)
+        self.ensure_map()
         self.map_view.setHtml(data.getvalue().decode())
 
     def update_map(self):
         """Met à jour l'affichage de la carte sans la réinitialiser."""
+        self.ensure_map()
         self.map_manager.update_map()
 
 
@@ -2922,17 +5158,19 @@ class BookingApp(QMainWindow):
         sorted_contacts = sorted(contacts, key=lambda x: (x[1], x[2]))
 
         # Affichage du résultat
-        print("📍 Itinéraire optimisé :", [c[0] for c in sorted_contacts])
+        log_route.debug("📍 Itinéraire optimisé : %s", sorted_contacts)
 
         # Afficher l'itinéraire sur la carte
         self.display_route_on_map(sorted_contacts)
 
     def display_route_on_map(self, sorted_contacts):
         """Ajoute les contacts à la carte sans écraser les anciens."""
-        
+        import folium
+        from folium.plugins import MarkerCluster
+
         # Ne recrée PAS une nouvelle carte chaque fois !
         if not hasattr(self, "map"):
-            self.map = folium.Map(location=[sorted_contacts[0][1], sorted_contacts[0][2]], zoom_start=8)
+            self.map = create_base_map(location=(sorted_contacts[0][1], sorted_contacts[0][2]), zoom_start=8)
             self.marker_cluster = MarkerCluster().add_to(self.map)
 
         coordinates_list = []
@@ -2951,22 +5189,31 @@ class BookingApp(QMainWindow):
         # Mettre à jour l'affichage
         data = io.BytesIO()
         self.map.save(data, close_file=False)
+        self.ensure_map()
         self.map_view.setHtml(data.getvalue().decode())
 
-        print("✅ Tous les marqueurs ont été ajoutés sur la carte.")
+        log_map.debug("✅ Tous les marqueurs ont été ajoutés sur la carte.")
 
 
     def on_date_selected(self, date):
         self.events_list.clear()
-        selected_date = date.toString(config["date_format"])
-
-        for row in range(self.table.rowCount()):
-            date_item = self.table.item(row, 0)
-            if date_item and date_item.text() == selected_date:
-                event_text = self.format_event_text(row)
-                item = QListWidgetItem(event_text)
-                item.setData(Qt.UserRole, row)
-                self.events_list.addItem(item)
+        for row in self.date_index.rows_on(date.toPyDate()):
+            event_text = self.format_event_text(row)
+            item = QListWidgetItem(event_text)
+            item.setData(Qt.UserRole, row)
+            self.events_list.addItem(item)
+
+    def highlight_booked_days(self, *args):
+        """Met en évidence les jours réservés du mois affiché dans l'agenda."""
+        if not hasattr(self, "calendar_tab"):
+            return
+        self.calendar.setDateTextFormat(QDate(), QTextCharFormat())  # Efface les mois précédents
+        for day, count in self.date_index.month(self.calendar.yearShown(), self.calendar.monthShown()):
+            booked = QTextCharFormat()
+            booked.setBackground(QColor("#8ee9f0"))
+            booked.setFontWeight(QFont.Bold)
+            booked.setToolTip(f"{count} réservation(s)")
+            self.calendar.setDateTextFormat(QDate(day.year, day.month, day.day), booked)
 
     def format_event_text(self, row):
         lieu = self.table.item(row, 1).text() if self.table.item(row, 1) else ""
@@ -2990,6 +5237,11 @@ class BookingApp(QMainWindow):
             return
 
         try:
+            import qrcode
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+
             doc = SimpleDocTemplate(
                 file_name,
                 pagesize=letter,
@@ -3052,7 +5304,8 @@ class BookingApp(QMainWindow):
             try:
                 story.append(Paragraph("QR Code de validation:", normal_style))
                 story.append(Image(qr_path, width=100, height=100))
-                doc.build(story)
+                with timed("export_route_sheet"):
+                    doc.build(story)
             finally:
                 if os.path.exists(qr_path):
                     os.remove(qr_path)
@@ -3072,27 +5325,41 @@ class BookingApp(QMainWindow):
             self.export_excel(file_path)
 
     def export_excel(self, file_path=None):
-        """Exporter les données au format Excel."""
+        """Exporter les données au format Excel (en arrière-plan, Statut et Formule compris)."""
         if not file_path:
             file_path, _ = QFileDialog.getSaveFileName(self, "Exporter en Excel", "", "Fichiers Excel (*.xlsx)")
             if not file_path:
                 return
 
-        wb = Workbook()
-        ws = wb.active
-        headers = [self.table.horizontalHeaderItem(col).text() if self.table.horizontalHeaderItem(col) else f"Colonne {col}" for col in range(self.table.columnCount())]
-        ws.append(headers)
-        
-        for row in range(self.table.rowCount()):
-            ws.append([self.table.item(row, col).text() if self.table.item(row, col) else "" for col in range(self.table.columnCount())])
-        
-        wb.save(file_path)
-        QMessageBox.information(self, "Export Excel", "Export en Excel réussi !")
+        if getattr(self, "excel_export_thread", None) is not None and self.excel_export_thread.isRunning():
+            QMessageBox.information(self, "Export Excel", "Un export Excel est déjà en cours.")
+            return
+
+        headers, rows, _ = self.table_snapshot()
+        thread = ExcelExportThread(file_path, headers, rows)
+
+        # ⏳ Progression non modale : la fenêtre reste utilisable pendant l'export
+        progress = QProgressDialog("Export Excel en cours…", "Annuler", 0, 100, self)
+        progress.setWindowTitle("Export Excel")
+        progress.setModal(False)
+        progress.setMinimumDuration(500)
+        progress.canceled.connect(thread.requestInterruption)
+        thread.progress.connect(progress.setValue)
+        thread.finished_export.connect(
+            lambda path: QMessageBox.information(self, "Export Excel", "Export en Excel réussi !"))
+        thread.failed.connect(
+            lambda message: QMessageBox.critical(self, "Erreur", f"Erreur lors de l'export Excel : {message}"))
+        thread.finished.connect(progress.close)
+
+        self.excel_export_thread = thread
+        thread.start()
 
     def export_csv(self, file_path):
         """Exporter les données au format CSV."""
-        df = pd.DataFrame([[self.table.item(row, col).text() if self.table.item(row, col) else "" for col in range(self.table.columnCount())] for row in range(self.table.rowCount())])
-        df.to_csv(file_path, index=False, header=[self.table.horizontalHeaderItem(col).text() for col in range(self.table.columnCount())])
+        with timed("export_csv"):
+            headers, rows, _ = self.table_snapshot()
+            df = pd.DataFrame(rows, columns=range(len(headers)))
+            df.to_csv(file_path, index=False, header=headers)
         QMessageBox.information(self, "Export CSV", "Export en CSV réussi !")
 
     def export_pdf(self):
@@ -3100,17 +5367,20 @@ class BookingApp(QMainWindow):
         file_path, _ = QFileDialog.getSaveFileName(self, "Exporter en PDF", "", "Fichiers PDF (*.pdf)")
         if not file_path:
             return
-        
-        pdf = canvas.Canvas(file_path)
-        pdf.drawString(100, 800, "Export des réservations")
-        y = 780
-        
-        for row in range(self.table.rowCount()):
-            line = " | ".join(self.table.item(row, col).text() if self.table.item(row, col) else "" for col in range(self.table.columnCount()))
-            pdf.drawString(100, y, line)
-            y -= 20
-        
-        pdf.save()
+
+        from reportlab.pdfgen import canvas
+        with timed("export_pdf"):
+            pdf = canvas.Canvas(file_path)
+            pdf.drawString(100, 800, "Export des réservations")
+            y = 780
+
+            _, rows, _ = self.table_snapshot()
+            for values in rows:
+                line = " | ".join(values)
+                pdf.drawString(100, y, line)
+                y -= 20
+
+            pdf.save()
         QMessageBox.information(self, "Export PDF", "Export en PDF réussi !")
 
     def export_calendar(self):
@@ -3126,21 +5396,22 @@ class BookingApp(QMainWindow):
             try:
                 from icalendar import Calendar, Event
 
-                cal = Calendar()
+                with timed("export_calendar"):
+                    cal = Calendar()
 
-                headers = [self.table.horizontalHeaderItem(col).text() for col in range(self.table.columnCount())]
-                for row in range(self.table.rowCount()):
-                    event = Event()
-                    for col, header in enumerate(headers):
-                        value = self.get_cell_text(row, col)
-                        if header == "Date":
-                            event.add('dtstart', datetime.strptime(value, config["date_format"]))
-                        else:
-                            event.add(header.lower(), value)
-                    cal.add_component(event)
+                    headers = [self.table.horizontalHeaderItem(col).text() for col in range(self.table.columnCount())]
+                    for row in range(self.table.rowCount()):
+                        event = Event()
+                        for col, header in enumerate(headers):
+                            value = self.get_cell_text(row, col)
+                            if header == "Date":
+                                event.add('dtstart', datetime.strptime(value, config["date_format"]))
+                            else:
+                                event.add(header.lower(), value)
+                        cal.add_component(event)
 
-                with open(file_name, 'wb') as f:
-                    f.write(cal.to_ical())
+                    with open(file_name, 'wb') as f:
+                        f.write(cal.to_ical())
 
                 QMessageBox.information(self, "Succès", "Export iCalendar réussi!")
 
@@ -3153,9 +5424,15 @@ class BookingApp(QMainWindow):
         item = self.table.item(row, col)
         return item.text() if item else ""
 
+    def visual_rows(self):
+        """Lignes logiques dans l'ordre affiché (le tri ne fait que permuter l'en-tête vertical)."""
+        vertical = self.table.verticalHeader()
+        return [vertical.logicalIndex(visual) for visual in range(self.table.rowCount())]
+
     def get_selected_rows(self):
-        """Récupère les indices des lignes sélectionnées"""
-        return sorted(set(item.row() for item in self.table.selectedItems()))
+        """Récupère les indices des lignes sélectionnées, dans l'ordre affiché"""
+        vertical = self.table.verticalHeader()
+        return sorted(set(index.row() for index in self.table.selectedIndexes()), key=vertical.visualIndex)
 
     def new_file(self):
         """Créer un nouveau fichier de réservation."""
@@ -3166,32 +5443,107 @@ class BookingApp(QMainWindow):
         QMessageBox.information(self, "Nouveau fichier", "Un nouveau fichier a été créé.")
 
     def open_file(self):
-        """Ouvre un fichier existant"""
+        """Ouvre un projet BALOON ou un fichier JSON existant"""
         file_name, _ = QFileDialog.getOpenFileName(
-            self, "Ouvrir un fichier", "", "Fichiers JSON (*.json);;Tous les fichiers (*)"
+            self, "Ouvrir un fichier", "",
+            f"Projets BALOON (*{PROJECT_EXTENSION});;Fichiers JSON (*.json);;Tous les fichiers (*)"
         )
         if file_name:
             try:
-                with open(file_name, 'r') as f:
-                    data = json.load(f)
-                    self.load_table_data(data)
-                    self.current_file = file_name
-                    logging.info(f"Fichier ouvert: {file_name}")
+                if file_name.lower().endswith(PROJECT_EXTENSION):
+                    self.load_project(file_name)
+                else:
+                    with open(file_name, 'r') as f:
+                        data = json.load(f)
+                        self.load_table_data(data)
+                self.current_file = file_name
+                self.mark_saved()
+                self.start_journal()
+                log_io.info("Fichier ouvert: %s", file_name)
             except Exception as e:
                 QMessageBox.critical(self, "Erreur", f"Erreur lors de l'ouverture du fichier : {str(e)}")
                 logging.error(f"Erreur ouverture fichier: {str(e)}")
 
+    def load_project(self, path):
+        """Charge un projet BALOON : tableau (Statut/Formule compris), puis carte et itinéraire."""
+        headers, rows, state = read_project(path)
+        self.history.clear()
+        self.load_rows(headers, rows)
+        self.restore_project_state(state)
+
+    def load_rows(self, headers, rows):
+        """Remplit le tableau d'un bloc : une seule insertion de lignes, puis valeurs et widgets."""
+        self.table.setUpdatesEnabled(False)
+        try:
+            self.table.setRowCount(0)
+            self.table.setColumnCount(len(headers))
+            self.table.setHorizontalHeaderLabels(headers)
+            self.table.setRowCount(len(rows))
+            for row, values in enumerate(rows):
+                self.fill_row(row, values)
+        finally:
+            self.table.setUpdatesEnabled(True)
+
+    def project_state(self):
+        """État de la carte et de l'itinéraire enregistré avec le projet (JSON)."""
+        map_contacts = []
+        if hasattr(self, "map_table"):
+            for row in range(self.map_table.rowCount()):
+                map_contacts.append([
+                    self.map_table.item(row, col).text() if self.map_table.item(row, col) else ""
+                    for col in range(self.map_table.columnCount())
+                ])
+        return {
+            "map_contacts": map_contacts,
+            "route_points": [list(point) for point in self.route_points],
+            "route_legs": [list(leg) if leg else None for leg in self.route_legs],
+        }
+
+    def restore_project_state(self, state):
+        """Rétablit la liste des lieux exportés, les étapes et le tracé de l'itinéraire."""
+        if hasattr(self, "map_table"):
+            contacts = state.get("map_contacts") or []
+            self.map_table.setRowCount(len(contacts))
+            for row, values in enumerate(contacts):
+                for col, value in enumerate(values):
+                    self.map_table.setItem(row, col, QTableWidgetItem(value))
+
+        points = [tuple(point) for point in state.get("route_points") or []]
+        legs = [tuple(leg) if leg else None for leg in state.get("route_legs") or []]
+        self.route_points, self.route_legs = points, legs
+        if len(points) < 2 or not any(legs):
+            return
+
+        self.ensure_map()
+        icons = {0: "🎤", len(points) - 1: "🏁"}
+        for i, (lat, lon) in enumerate(points):
+            self.map_manager.add_marker(f"{icons.get(i, '📍')} Étape {i+1}", lat, lon, "Itinéraire", refresh=False)
+        self.map_manager.show_route(self.map_manager.map, [leg[0] for leg in legs if leg])
+        self.refresh_itinerary_details()
+        self.update_map_display()
+
     def save_file(self):
-        """Enregistrer le fichier actuel."""
+        """Enregistrer le fichier actuel. Retourne True si le fichier a été écrit."""
         if not self.current_file:
-            self.current_file, _ = QFileDialog.getSaveFileName(self, "Enregistrer sous", "", "Fichiers CSV (*.csv);;Fichiers Excel (*.xlsx)")
+            self.current_file, _ = QFileDialog.getSaveFileName(
+                self, "Enregistrer sous", "",
+                f"Projet BALOON (*{PROJECT_EXTENSION});;Fichiers CSV (*.csv);;Fichiers Excel (*.xlsx)")
         
         if self.current_file:
-            if self.current_file.endswith(".csv"):
-                self.export_csv(self.current_file)
-            elif self.current_file.endswith(".xlsx"):
-                self.export_excel(self.current_file)
+            # Même écriture que la sauvegarde automatique : atomique, Statut/Formule compris
+            headers, rows, _ = self.table_snapshot()
+            try:
+                data = serialize_table(self.current_file, headers, rows, self.project_state())
+                write_file_atomic(self.current_file, data)
+            except Exception as e:
+                log_io.error("Erreur d'enregistrement (%s) : %s", self.current_file, e)
+                QMessageBox.critical(self, "Erreur", f"Erreur lors de l'enregistrement : {e}")
+                return False
+            self.mark_saved(hashlib.sha1(data).hexdigest())
+            self.start_journal()
             QMessageBox.information(self, "Enregistrement", "Fichier enregistré avec succès !")
+            return True
+        return False
 
     def load_table_data(self, data):
         """Charge les données dans la table"""
@@ -3203,36 +5555,21 @@ class BookingApp(QMainWindow):
                 self.table.setItem(row, col, QTableWidgetItem(value))
 
     def get_table_data(self):
-        """Récupère les données de la table sous forme de liste de dictionnaires."""
-        data = []
-        for row in range(self.table.rowCount()):
-            row_data = []
-
-            for col in range(self.table.columnCount()):
-                if col == 1:  # Colonne "Statut"
-                    widget = self.table.cellWidget(row, col)
-                    value = widget.currentText() if widget else ""
-                elif col == 3:  # ✅ Colonne "Formule"
-                    widget = self.table.cellWidget(row, col)
-                    value = widget.currentText() if widget else ""
-                else:
-                    value = self.get_cell_text(row, col)
-
-                row_data.append(value)
-
-            data.append(row_data)
-        return data
+        """Récupère les données de la table (listes de valeurs), dans l'ordre affiché."""
+        return self.column_store.rows(self.visual_rows())
 
+    def get_row_data(self, row):
+        """Valeurs d'une ligne logique (Statut et Formule compris)."""
+        return self.column_store.rows([row])[0]
 
     def get_selected_events(self):
         """Récupère les événements sélectionnés"""
-        selected_rows = self.get_selected_rows()
-        return [self.get_table_data()[row] for row in selected_rows]
+        return self.column_store.rows(self.get_selected_rows())
 
     def show_itinerary_details(self, route_details):
         """Met à jour la fenêtre latérale avec les détails du trajet."""
 
-        print("🔍 Mise à jour des détails de l'itinéraire...")  # Debug
+        log_route.debug("🔍 Mise à jour des détails de l'itinéraire...")
 
         # 🔄 Efface bien les anciens détails pour éviter les doublons
         while self.itinerary_details_layout.count() > 0:
@@ -3248,7 +5585,7 @@ class BookingApp(QMainWindow):
 
         # 🔹 Vérifier si des étapes existent
         if not route_details or len(route_details) < 2:
-            print("⚠️ Aucune donnée d'itinéraire à afficher !")  # Debug
+            log_route.debug("⚠️ Aucune donnée d'itinéraire à afficher !")
             return
 
         # 📝 Ajout du titre
@@ -3262,7 +5599,7 @@ class BookingApp(QMainWindow):
             formatted_duration = self.format_duration(float(step['duration']))  # ✅ Conversion du temps
 
             text = f"🚗 {step['from']} ➝ {step['to']} : {formatted_duration} ({step['distance']} km)"
-            print(f"Ajout du label : {text}")  # Debug
+            log_route.debug("Ajout du label : %s", text)
 
             label = QLabel(text)
 
@@ -3303,63 +5640,140 @@ class BookingApp(QMainWindow):
         return f"{mins}min"
 
     def create_itinerary(self):
-        """Génère un itinéraire et affiche un overlay de chargement sur la carte."""
+        """Lance le calcul de l'itinéraire en arrière-plan ; un second clic annule le calcul en cours."""
+        if self.route_worker is not None and self.route_worker.isRunning():
+            self.cancel_itinerary()
+            return
+
         itinerary = self.get_itinerary()
         if len(itinerary) < 2:
             QMessageBox.warning(self, "Itinéraire", "Il faut au moins deux lieux pour créer un itinéraire.")
             return
 
-        # 💬 Affichage de l'overlay de chargement sur la carte
-        self.show_loading_on_map()
-
-        # Réinitialisation de la barre de progression
-        self.progress_bar.setValue(0)
-        self.progress_bar.setVisible(True)
-        QApplication.processEvents()
-
         # Extraire les coordonnées
         points = [self.get_coordinates(row[2]) for row in itinerary if row[2] != "Non localisé"]
+        points = [point for point in points if point]
         if len(points) < 2:
             QMessageBox.warning(self, "Itinéraire", "Impossible d'obtenir les coordonnées des lieux.")
-            self.progress_bar.setVisible(False)
-            self.hide_loading_on_map()
             return
 
-        # 🔥 Définition des icônes pour les étapes
-        icons = {0: "🎤", len(points) - 1: "🏁"}
+        # 💬 Affichage de l'overlay de chargement sur la carte
+        self.ensure_map()
+        self.show_loading_on_map()
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
 
-        # Ajout des points sur la carte + mise à jour de la barre de progression
-        total_steps = len(points)
+        # 🔥 Définition des icônes pour les étapes (un seul rendu de la carte, à la fin du calcul)
+        self.clear_route_markers()
+        icons = {0: "🎤", len(points) - 1: "🏁"}
         for i, (lat, lon) in enumerate(points):
             icon = icons.get(i, "📍")
-            self.map_manager.add_marker(f"{icon} Étape {i+1}", lat, lon, "Itinéraire")
-
-            # Mise à jour de la barre de progression
-            self.progress_bar.setValue(int((i + 1) / total_steps * 100))
-            QApplication.processEvents()
-
-        # ✅ Vérifier que `self.map_manager` existe bien avant d’appeler `add_route_to_map`
-        if hasattr(self, "map_manager") and hasattr(self.map_manager, "add_route_to_map"):
-            self.map_manager.add_route_to_map(self.map_manager.map, points)
-        else:
-            logging.error("❌ Erreur : `map_manager` ou `add_route_to_map` est introuvable !")
-
-        # Calculer les temps de trajet et coûts de carburant
-        route_details = self.calculate_route_details(points)
+            self.route_markers.append(
+                self.map_manager.add_marker(f"{icon} Étape {i+1}", lat, lon, "Itinéraire", refresh=False))
+
+        # 🚗 Calcul des tronçons en parallèle ; le panneau latéral se remplit au fil de l'eau
+        self.route_points = points
+        self.route_legs = [None] * (len(points) - 1)
+        self.route_worker = RouteWorker(self.map_manager, points,
+                                        max_workers=config.get("routing", {}).get("max_workers", 4))
+        self.route_worker.leg_ready.connect(partial(self.on_route_leg_ready, self.route_worker))
+        self.route_worker.progress.connect(self.progress_bar.setValue)
+        self.route_worker.finished_route.connect(partial(self.on_route_finished, self.route_worker))
+        self.route_worker.start()
+        self.optimize_route_btn.setText("Annuler l'itinéraire")
+
+    def on_route_leg_ready(self, worker, index, leg):
+        """Reçoit un tronçon calculé et programme le rafraîchissement du panneau latéral."""
+        if worker is not self.route_worker:
+            return  # Résultat d'un calcul annulé
+        self.route_legs[index] = leg
+        if not self.itinerary_refresh_timer.isActive():
+            self.itinerary_refresh_timer.start()
+
+    def refresh_itinerary_details(self):
+        """Affiche les tronçons déjà calculés (appelé au plus toutes les 100 ms pendant le calcul)."""
+        self.show_itinerary_details(self.build_route_details(self.route_legs))
+
+    def on_route_finished(self, worker, legs):
+        """Trace l'itinéraire complet une fois tous les tronçons reçus."""
+        if worker is not self.route_worker:
+            return
+        self.retire_route_worker()
+        self.route_legs = legs
+        self.itinerary_refresh_timer.stop()
+        self.refresh_itinerary_details()
 
-        # Afficher les détails dans la fenêtre latérale
-        self.show_itinerary_details(route_details)
+        self.map_manager.show_route(self.map_manager.map, [leg[0] for leg in legs if leg])
 
         # 🔄 Masquage de l'overlay une fois terminé
         self.hide_loading_on_map()
-
-        # Masquer la barre de progression après 1 seconde
+        self.optimize_route_btn.setText("Créer Itinéraire")
         self.progress_bar.setValue(100)
         QTimer.singleShot(1000, lambda: self.progress_bar.setVisible(False))
 
         # 🔄 Mettre à jour la carte après avoir ajouté l'itinéraire
         self.update_map_display()
 
+        # 🧱 Précharger les tuiles autour de la tournée pour la consulter hors connexion
+        self.prefetch_tiles_for_points(self.route_points)
+
+    def retire_route_worker(self):
+        """
+        Détache le calcul d'itinéraire courant. Une référence est gardée jusqu'à la fin réelle
+        du thread (détruire un QThread en cours d'exécution fait planter l'application).
+        """
+        worker, self.route_worker = self.route_worker, None
+        if worker is not None:
+            self.retired_route_workers.add(worker)
+            worker.finished.connect(lambda: self.retired_route_workers.discard(worker))
+            if worker.isFinished():
+                self.retired_route_workers.discard(worker)
+        return worker
+
+    def clear_route_markers(self):
+        """Retire de la carte les marqueurs d'étapes de l'itinéraire précédent ou annulé."""
+        if self.map_manager is None:
+            return  # Pas de carte : aucun marqueur à retirer
+        for marker in self.route_markers:
+            self.map_manager.remove_layer(self.map_manager.map, marker)
+        self.route_markers = []
+
+    def cancel_itinerary(self):
+        """Annule le calcul d'itinéraire en cours sans bloquer l'interface."""
+        worker = self.retire_route_worker()
+        if worker is not None:
+            worker.requestInterruption()  # Ses résultats tardifs seront ignorés
+        self.clear_route_markers()
+        self.itinerary_refresh_timer.stop()
+        self.hide_loading_on_map()
+        self.optimize_route_btn.setText("Créer Itinéraire")
+        self.progress_bar.setVisible(False)
+        self.statusBar().showMessage("Calcul de l'itinéraire annulé.", 5000)
+
+    def prefetch_tiles_for_points(self, points, margin=0.1):
+        """Lance le préchargement des tuiles sur l'emprise des points, élargie de `margin` de chaque côté."""
+        if not points:
+            return
+        if self.tile_prefetch_thread and self.tile_prefetch_thread.isRunning():
+            self.tile_prefetch_thread.requestInterruption()
+            self.tile_prefetch_thread.wait()
+
+        lats = [p[0] for p in points]
+        lons = [p[1] for p in points]
+        pad_lat = max((max(lats) - min(lats)) * margin, 0.05)
+        pad_lon = max((max(lons) - min(lons)) * margin, 0.05)
+        bbox = (min(lats) - pad_lat, min(lons) - pad_lon, max(lats) + pad_lat, max(lons) + pad_lon)
+
+        min_zoom, max_zoom = config.get("tile_prefetch_zooms", [5, 12])
+        self.tile_prefetch_thread = TilePrefetchThread(
+            self.tile_cache, bbox, range(min_zoom, max_zoom + 1),
+            max_tiles=config.get("tile_prefetch_max", 1500)
+        )
+        self.tile_prefetch_thread.finished_prefetch.connect(
+            lambda count: log_map.info("🧱 %d tuiles préchargées pour la tournée.", count)
+        )
+        self.tile_prefetch_thread.start()
+
     def show_loading_on_map(self):
         """Ajoute un overlay semi-transparent avec un message de chargement sur la carte."""
         overlay_script = """
@@ -3382,26 +5796,41 @@ class BookingApp(QMainWindow):
                 document.body.appendChild(loadingOverlay);
             }
         """
+        self.ensure_map()
         self.map_view.page().runJavaScript(overlay_script)
 
     def hide_loading_on_map(self):
         """Supprime l'overlay de chargement."""
         remove_script = "document.getElementById('loading-overlay')?.remove();"
+        if self.map_view is None:
+            return  # Pas de carte : aucun overlay à retirer
         self.map_view.page().runJavaScript(remove_script)
 
 
     def calculate_route_details(self, points):
         """Calcule les distances, durées et coût du carburant pour le trajet."""
+        self.ensure_map()
+        legs = []
+        for i in range(len(points) - 1):
+            geometry, duration, distance = self.map_manager.get_route(points[i], points[i + 1])  # ✅ Appel correct via MapManager
+            legs.append((geometry, duration, distance) if geometry else None)
+        return self.build_route_details(legs)
+
+    def build_route_details(self, legs):
+        """
+        Construit les étapes (distance, durée) et l'estimation du coût du carburant.
+
+        :param legs: Tronçons dans l'ordre de la tournée, (geometry, duration, distance) ou None si pas encore calculé.
+        :return: Liste des étapes suivie d'un dictionnaire des coûts de carburant.
+        """
         total_distance = 0
         total_duration = 0
         details = []
 
-        for i in range(len(points) - 1):
-            start, end = points[i], points[i + 1]
-            geometry, duration, distance = self.map_manager.get_route(start, end)  # ✅ Appel correct via MapManager
-
-            if not geometry:
+        for i, leg in enumerate(legs):
+            if not leg:
                 continue
+            _, duration, distance = leg
 
             total_distance += distance / 1000  # Conversion mètres ➝ km
             total_duration += duration / 60  # Conversion secondes ➝ minutes
@@ -3440,16 +5869,41 @@ class BookingApp(QMainWindow):
         QMessageBox.critical(self, "Erreur", message)
         logging.error(message)
 
+    def stop_background_threads(self, timeout=5000):
+        """
+        Interrompt les calculs en arrière-plan (itinéraire, export, préchargement, géocodage) et
+        attend leur fin : un QThread détruit en cours d'exécution fait planter l'application.
+        """
+        interruptible = [self.route_worker, *self.retired_route_workers, self.tile_prefetch_thread,
+                         getattr(self, "excel_export_thread", None), getattr(self, "geocode_worker", None),
+                         getattr(self, "excel_thread", None)]
+        for thread in interruptible:
+            if thread is not None:
+                thread.requestInterruption()
+        # L'autosauvegarde n'est pas interrompue : on laisse finir une écriture en cours
+        for thread in interruptible + [self.autosave_thread]:
+            if thread is not None:
+                thread.wait(timeout)
+
     def closeEvent(self, event):
-        """Gestionnaire d'événement de fermeture de l'application"""
+        """
+        Gestionnaire d'événement de fermeture de l'application. Le journal des éditions n'est
+        supprimé qu'une fois le travail enregistré ou explicitement abandonné.
+        """
         if self.check_unsaved_changes():
+            self.stop_background_threads()
+            self.close_journal()
             event.accept()
         else:
             event.ignore()
 
     def check_unsaved_changes(self):
-        """Vérifie s'il y a des changements non sauvegardés"""
-        if self.undo_stack:
+        """
+        Vérifie s'il y a des changements non sauvegardés (travail récupéré d'un journal compris).
+        Retourne True si la fermeture peut continuer : rien à enregistrer, enregistrement réussi
+        ou abandon confirmé.
+        """
+        if self.revision != self.saved_revision:
             reply = QMessageBox.question(
                 self,
                 'Changements non sauvegardés',
@@ -3459,8 +5913,7 @@ class BookingApp(QMainWindow):
             )
 
             if reply == QMessageBox.Save:
-                self.save_file()
-                return True
+                return self.save_file()  # Enregistrement annulé ou en échec : on ne ferme pas
             elif reply == QMessageBox.Cancel:
                 return False
         return True
@@ -3483,6 +5936,7 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    register_tile_scheme()
     app = QApplication(sys.argv)
 
     # Charger la feuille de style (si elle existe)
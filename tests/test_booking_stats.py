@@ -0,0 +1,52 @@
+"""Entonnoir de BookingStats : chaque étape contient les suivantes, les effectifs ne croissent jamais."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("PyQt5.QtWebEngineWidgets", exc_type=ImportError)  # Requis par booking_app
+
+from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem  # noqa: E402
+
+from booking_app import STATUS_CHOICES, BookingStats, TableSchema  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def make_stats(statuses):
+    table = QTableWidget(len(statuses), 2)
+    table.setHorizontalHeaderLabels(["Nom", "Statut"])
+    for row, status in enumerate(statuses):
+        table.setItem(row, 0, QTableWidgetItem(f"Lieu {row}"))
+        table.setItem(row, 1, QTableWidgetItem(status))
+    return table, BookingStats(table, TableSchema(table))
+
+
+def test_funnel_stages_are_nested():
+    stages = [statuses for _, statuses in BookingStats.FUNNEL]
+    for stage, next_stage in zip(stages, stages[1:]):
+        assert stage >= next_stage
+
+
+@pytest.mark.parametrize("statuses", [
+    STATUS_CHOICES,
+    ["Nouveau"] * 3 + ["Let's Go"] * 5,
+    ["Mail envoyé", "Laisse tomber", "Full", "Let's Go", "Let's Go"],
+    ["Échange Tel."] * 2 + ["Let's Go"] * 4,
+])
+def test_funnel_counts_never_increase(app, statuses):
+    table, stats = make_stats(statuses)
+    counts = [count for _, count in stats.summary()["funnel"]]
+    assert counts[0] == len(statuses)
+    assert counts == sorted(counts, reverse=True)
+
+    # Édition incrémentale : le passage d'une ligne à « Let's Go » garde l'entonnoir monotone
+    table.item(0, 1).setText("Let's Go")
+    counts = [count for _, count in stats.summary()["funnel"]]
+    assert counts == sorted(counts, reverse=True)